@@ -2,32 +2,73 @@ from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import uvicorn
-from app.routes import search, health, ingest, chat
+from app.routes import search, health, ingest, chat, documents
 from app.services.vector_store import VectorStoreService
 from app.services.web_search import WebSearchService
+from app.services.ingest_jobs import IngestJobStore, IngestJobQueue
+from app.services.semantic_cache import SemanticAnswerCache
+from app.services.azure_openai_service import AzureOpenAIService
+from app.services.reranker import CrossEncoderReranker
+from app.services.chat_sessions import ChatSessionStore
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from config import RERANK_ENABLED, CHAT_SESSIONS_ENABLED
 
 # Global services
 vector_service = None
 web_search_service = None
+ingest_job_store = None
+ingest_job_queue = None
+semantic_cache = None
+azure_openai_service = None
+reranker = None
+chat_session_store = None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    global vector_service, web_search_service
+    global vector_service, web_search_service, ingest_job_store, ingest_job_queue, semantic_cache
+    global azure_openai_service, reranker, chat_session_store
     vector_service = VectorStoreService()
     web_search_service = WebSearchService()
+    ingest_job_store = IngestJobStore()
+    ingest_job_queue = IngestJobQueue(vector_service, ingest_job_store)
+    semantic_cache = SemanticAnswerCache(vector_service.embedding_service)
+    azure_openai_service = AzureOpenAIService(executor=vector_service.executor)
+    if RERANK_ENABLED:
+        reranker = CrossEncoderReranker(executor=vector_service.executor)
+    if CHAT_SESSIONS_ENABLED:
+        chat_session_store = ChatSessionStore(executor=vector_service.executor)
     
     # Initialize services
     await vector_service.initialize()
+    if reranker:
+        try:
+            reranker.load()
+        except Exception as e:
+            # Search still works without reranking
+            print(f"Error loading reranker, reranking disabled: {e}")
+            reranker = None
     await web_search_service.initialize()
+    await ingest_job_queue.start()
     
     yield
     
     # Shutdown
+    if ingest_job_queue:
+        await ingest_job_queue.close()
+    if ingest_job_store:
+        ingest_job_store.close()
+    if chat_session_store:
+        # Spills sessions on the vector service's executor, so it closes first
+        await chat_session_store.close()
     if vector_service:
         await vector_service.close()
     if web_search_service:
         await web_search_service.close()
+    if azure_openai_service:
+        await azure_openai_service.close()
 
 app = FastAPI(
     title="RAG Retrieval System",
@@ -50,6 +91,7 @@ app.include_router(health.router, prefix="/api", tags=["health"])
 app.include_router(search.router, prefix="/api", tags=["search"])
 app.include_router(ingest.router, prefix="/api", tags=["ingest"])
 app.include_router(chat.router, prefix="/api", tags=["chat"])
+app.include_router(documents.router, prefix="/api", tags=["documents"])
 
 @app.get("/")
 async def root():
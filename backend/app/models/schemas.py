@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime
 
 class Document(BaseModel):
@@ -9,11 +9,21 @@ class Document(BaseModel):
     source: str
     created_at: datetime
 
+class SearchFilters(BaseModel):
+    category: Optional[List[str]] = None  # Match any of these categories
+    source: Optional[List[str]] = None  # Match any of these sources
+    created_after: Optional[datetime] = None  # Inclusive
+    created_before: Optional[datetime] = None  # Inclusive
+
 class SearchRequest(BaseModel):
     query: str
     limit: int = 5
     threshold: float = 0.7
     use_web_fallback: bool = True
+    collapse_chunks: bool = True  # One result per document instead of per chunk
+    search_mode: Optional[Literal["vector", "hybrid", "lexical"]] = None  # Defaults to SEARCH_DEFAULT_MODE
+    filters: Optional[SearchFilters] = None  # Blank query + filters lists the newest matching documents
+    rerank: Optional[bool] = None  # Cross-encoder reranking; on by default when RERANK_ENABLED
 
 class SearchResult(BaseModel):
     document: Document
@@ -26,15 +36,53 @@ class SearchResponse(BaseModel):
     total_found: int
     used_web_fallback: bool
     web_results: Optional[List[Dict[str, Any]]] = None
+    partial: bool = False  # True when the latency budget cut retrieval short
+
+class BatchSearchRequest(BaseModel):
+    searches: List[SearchRequest]
+
+class BatchSearchResult(BaseModel):
+    response: Optional[SearchResponse] = None  # None when this search failed
+    elapsed_ms: float  # From batch start until this search finished
+    cached: bool = False
+    error: Optional[str] = None
+
+class BatchSearchResponse(BaseModel):
+    results: List[BatchSearchResult]  # Same order as the request's searches
+    total_elapsed_ms: float
 
 class IngestRequest(BaseModel):
     documents: List[Dict[str, Any]]
     collection_name: Optional[str] = "healthcare_docs"
+    background: bool = False  # Queue as a background job and return immediately
 
 class IngestResponse(BaseModel):
     success: bool
     message: str
     documents_ingested: int
+    documents_inserted: int = 0
+    documents_updated: int = 0
+    documents_skipped: int = 0
+    job_id: Optional[str] = None  # Set for background ingests
+
+class IngestJobStatus(BaseModel):
+    job_id: str
+    kind: str  # "stream" or "background"
+    status: str  # "queued", "running", "completed", "failed"
+    collection_name: Optional[str] = None
+    total_documents: Optional[int] = None
+    documents_received: int = 0
+    documents_inserted: int = 0
+    documents_updated: int = 0
+    documents_skipped: int = 0
+    documents_failed: int = 0
+    errors: List[str] = []
+    created_at: str
+    updated_at: str
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    throughput_docs_per_sec: Optional[float] = None
+    eta_seconds: Optional[float] = None
 
 # Chat-related schemas
 class ChatMessage(BaseModel):
@@ -49,6 +97,10 @@ class ChatRequest(BaseModel):
     use_web_fallback: bool = True
     stream: bool = False
     images: Optional[List[str]] = None  # Base64 encoded images
+    use_semantic_cache: Optional[bool] = None  # Defaults to SEMANTIC_CACHE_ENABLED
+    filters: Optional[SearchFilters] = None  # Restricts the retrieval step
+    compact_context: Optional[bool] = None  # Context references instead of full documents; defaults to CHAT_COMPACT_CONTEXT
+    session_id: Optional[str] = None  # Server-side conversation to continue, or "new" to start one (replaces chat_history)
 
 class ChatResponse(BaseModel):
     query: str
@@ -57,6 +109,10 @@ class ChatResponse(BaseModel):
     used_web_fallback: bool
     images: List[str] = []
     total_context_found: int
+    semantic_cache_hit: bool = False
+    llm_queue_ms: Optional[float] = None  # Wait for LLM admission control
+    llm_endpoint: Optional[str] = None  # Name of the Azure OpenAI endpoint that answered
+    session_id: Optional[str] = None  # Pass back as session_id to continue the conversation
     timestamp: str = datetime.now().isoformat()
 
 class ChatStreamEvent(BaseModel):
@@ -4,10 +4,16 @@ from app.models.schemas import ChatRequest, ChatResponse
 from app.services.vector_store import VectorStoreService
 from app.services.web_search import WebSearchService
 from app.services.rag_service import RAGService
-from app.services.azure_openai_service import AzureOpenAIService
-import json
-import asyncio
-from typing import AsyncGenerator
+from app.services.azure_openai_service import AzureOpenAIService, GenerationErrorText
+from app.services.semantic_cache import SemanticAnswerCache
+from app.services.reranker import CrossEncoderReranker
+from app.services.sse import coalesce, event_frame, stream_stats, chat_stream_fanout
+from app.services.chat_sessions import NEW_SESSION_ID, ChatSession, ChatSessionStore
+import os
+import sys
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import SEMANTIC_CACHE_ENABLED, CHAT_CONTEXT_LIMIT, CHAT_CONTEXT_THRESHOLD, CHAT_COMPACT_CONTEXT, CHAT_STREAM_FANOUT_ENABLED
 
 router = APIRouter()
 
@@ -24,7 +30,102 @@ def get_web_search_service() -> WebSearchService:
     return web_search_service
 
 def get_azure_openai_service() -> AzureOpenAIService:
-    return AzureOpenAIService()
+    from app.main import azure_openai_service
+    if not azure_openai_service:
+        raise HTTPException(status_code=500, detail="Azure OpenAI service not initialized")
+    return azure_openai_service
+
+def get_semantic_cache() -> Optional[SemanticAnswerCache]:
+    from app.main import semantic_cache
+    return semantic_cache
+
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    from app.main import reranker
+    return reranker
+
+def get_chat_session_store() -> Optional[ChatSessionStore]:
+    from app.main import chat_session_store
+    return chat_session_store
+
+async def resolve_session(
+    request: ChatRequest,
+    session_store: Optional[ChatSessionStore]
+) -> Tuple[Optional[ChatSession], bool, list]:
+    """
+    The request's chat session and the history to answer with, as
+    (session, created, chat_history). Sessions are opt-in: requests without a
+    session_id stay stateless and answer from chat_history. Otherwise the
+    history comes from the session named by session_id, or a new session is
+    started for NEW_SESSION_ID (or an expired or unknown session_id).
+    """
+    if session_store is None or not request.session_id:
+        return None, False, request.chat_history
+    session_id = None if request.session_id == NEW_SESSION_ID else request.session_id
+    session, created = await session_store.get_or_create(session_id)
+    return session, created, session.history()
+
+async def record_turn(
+    session_store: Optional[ChatSessionStore],
+    session: Optional[ChatSession],
+    query: str,
+    answer: str,
+    failed: bool = False
+):
+    """Add a question and its answer to the session (failed answers are not kept)"""
+    if session is not None and not failed:
+        await session_store.append_turn(session, query, answer)
+
+def resolve_semantic_cache(
+    request: ChatRequest,
+    semantic_cache: Optional[SemanticAnswerCache],
+    chat_history: Optional[list] = None
+) -> Optional[SemanticAnswerCache]:
+    """
+    The semantic cache applies only when enabled (per request or by default)
+    and the answer depends on nothing but the query and retrieved context
+    """
+    enabled = request.use_semantic_cache if request.use_semantic_cache is not None else SEMANTIC_CACHE_ENABLED
+    if not enabled or chat_history or request.images:
+        return None
+    return semantic_cache
+
+def build_context_documents(search_response) -> List[Dict[str, Any]]:
+    """Context documents for the prompt from a search response"""
+    return [
+        {
+            "id": result.document.id,
+            "content": result.document.content,
+            "metadata": result.document.metadata,
+            "similarity_score": result.similarity_score,
+            "source": result.source
+        }
+        for result in search_response.results
+    ]
+
+def context_references(context_documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Compact stand-ins for context documents: IDs, titles and scores only.
+    Vector store documents can be fetched in full from /api/documents/{id};
+    web results carry their URL instead.
+    """
+    references = []
+    for doc in context_documents:
+        metadata = doc.get("metadata", {})
+        reference = {
+            "id": doc.get("id"),
+            "title": metadata.get("title"),
+            "similarity_score": doc.get("similarity_score"),
+            "source": doc.get("source")
+        }
+        if "rerank_score" in metadata:
+            reference["rerank_score"] = metadata["rerank_score"]
+        if metadata.get("url"):
+            reference["url"] = metadata["url"]
+        references.append(reference)
+    return references
+
+def resolve_compact_context(request: ChatRequest) -> bool:
+    return request.compact_context if request.compact_context is not None else CHAT_COMPACT_CONTEXT
 
 async def generate_chat_stream(
     query: str,
@@ -32,86 +133,154 @@ async def generate_chat_stream(
     openai_service: AzureOpenAIService,
     chat_history: list = None,
     use_web_fallback: bool = True,
-    images: list = None
+    images: list = None,
+    semantic_cache: Optional[SemanticAnswerCache] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    compact_context: bool = False,
+    session_store: Optional[ChatSessionStore] = None,
+    session: Optional[ChatSession] = None,
+    session_created: bool = False
 ) -> AsyncGenerator[str, None]:
     """
-    Generate a streaming chat response using RAG + Azure OpenAI
+    Generate a streaming chat response using RAG + Azure OpenAI.
+    With a semantic cache, a cached answer to a near-identical question over
+    the same context is replayed as a stream instead of calling the LLM.
+    With a session, the completed answer is added to its history.
+    Tokens are coalesced into content frames of up to CHAT_STREAM_FLUSH_CHARS
+    characters, each sent at most CHAT_STREAM_FLUSH_MS after its first token.
     """
     try:
         # Step 1: Search for relevant documents using RAG
         search_response = await rag_service.search(
             query=query,
-            limit=5,
-            threshold=0.3,  # Lowered threshold to capture more relevant documents
-            use_web_fallback=use_web_fallback
+            limit=CHAT_CONTEXT_LIMIT,
+            threshold=CHAT_CONTEXT_THRESHOLD,
+            use_web_fallback=use_web_fallback,
+            filters=filters
         )
         
         # Step 2: Extract context documents
-        context_documents = []
-        for result in search_response.results:
-            context_documents.append({
-                "content": result.document.content,
-                "metadata": result.document.metadata,
-                "similarity_score": result.similarity_score,
-                "source": result.source
-            })
-        
-        # Step 3: Send initial metadata
+        context_documents = build_context_documents(search_response)
+        
+        # Step 3: Look for a cached answer and send initial metadata
+        query_embedding = None
+        cached_answer = None
+        if semantic_cache:
+            query_embedding = await semantic_cache.embed(query)
+            cached_answer = semantic_cache.lookup(query_embedding, context_documents)
+        
+        # Assemble the prompt within the token budget and start generating.
+        # Identical questions without history or images over the same context
+        # share one in-flight LLM stream
+        prepared = None
+        answer_stream = None
+        shared_stream = False
+        if not cached_answer:
+            images = await openai_service.preprocess_images(images)
+            prepared = openai_service.prepare_messages(query, context_documents, chat_history, images)
+            
+            def open_answer_stream():
+                return openai_service.generate_response(
+                    query=query,
+                    context_documents=context_documents,
+                    chat_history=chat_history,
+                    images=images,
+                    prepared=prepared
+                )
+            
+            if CHAT_STREAM_FANOUT_ENABLED and not chat_history and not images:
+                fanout_key = (" ".join(query.split()), SemanticAnswerCache.context_key(context_documents))
+                answer_stream, shared_stream = chat_stream_fanout.subscribe(fanout_key, open_answer_stream)
+            else:
+                answer_stream = open_answer_stream()
+        
         metadata = {
-            "type": "metadata",
-            "data": {
-                "context_documents_count": len(context_documents),
-                "used_web_fallback": search_response.used_web_fallback,
-                "total_found": search_response.total_found
-            }
+            "context_documents_count": len(context_documents),
+            "used_web_fallback": search_response.used_web_fallback,
+            "total_found": search_response.total_found,
+            "semantic_cache_hit": cached_answer is not None,
+            "shared_stream": shared_stream
         }
-        yield f"data: {json.dumps(metadata)}\n\n"
+        if session is not None:
+            metadata["session_id"] = session.session_id
+            metadata["session_created"] = session_created
+        if compact_context:
+            metadata["context_documents"] = context_references(context_documents)
+        if prepared:
+            metadata["prompt_tokens"] = prepared["token_breakdown"]
+        if cached_answer:
+            metadata["cached_query"] = cached_answer["cached_query"]
+            metadata["cache_similarity"] = cached_answer["similarity"]
+        yield event_frame("metadata", metadata)
         
         # Step 4: Stream the AI response
-        yield f"data: {json.dumps({'type': 'start', 'data': 'Generating response...'})}\n\n"
+        yield event_frame("start", "Generating response...")
         
-        async for chunk in openai_service.generate_response(
-            query=query,
-            context_documents=context_documents,
-            chat_history=chat_history,
-            images=images
-        ):
-            chunk_data = {
-                "type": "content",
-                "data": chunk
-            }
-            yield f"data: {json.dumps(chunk_data)}\n\n"
-            await asyncio.sleep(0.01)  # Small delay to prevent overwhelming
-        
-        # Step 5: Send completion signal
-        completion_data = {
-            "type": "complete",
-            "data": {
-                "context_documents": context_documents,
-                "used_web_fallback": search_response.used_web_fallback
-            }
-        }
-        yield f"data: {json.dumps(completion_data)}\n\n"
+        content_frames = 0
+        content_chunks = 0
+        bytes_sent = 0
+        failed = False
+        if cached_answer:
+            async def replay():
+                for chunk in semantic_cache.replay_chunks(cached_answer["answer"]):
+                    yield chunk
+            
+            # A cached answer is framed exactly like a live one
+            answer_stream = replay()
+        
+        answer_parts = []
+        
+        async def tokens():
+            nonlocal content_chunks, failed
+            async for chunk in answer_stream:
+                content_chunks += 1
+                if isinstance(chunk, GenerationErrorText):
+                    # The LLM call failed, possibly after part of the answer
+                    failed = True
+                yield chunk
+        
+        async for text in coalesce(tokens()):
+            answer_parts.append(text)
+            frame = event_frame("content", text)
+            content_frames += 1
+            bytes_sent += len(frame)
+            yield frame
+        
+        answer = "".join(answer_parts)
+        if semantic_cache and not cached_answer and not shared_stream and not failed:
+            semantic_cache.store(query, query_embedding, context_documents, answer)
+        stream_stats.record(content_frames, content_chunks, bytes_sent)
+        await record_turn(session_store, session, query, answer, failed)
+        
+        # Step 5: Send completion signal (compact responses already sent references)
+        completion = {"used_web_fallback": search_response.used_web_fallback}
+        if prepared and "llm_queue_ms" in prepared:
+            # LLM admission wait and the endpoint that answered (absent for shared streams)
+            completion["llm_queue_ms"] = prepared["llm_queue_ms"]
+            completion["llm_endpoint"] = prepared["llm_endpoint"]
+        if not compact_context:
+            completion["context_documents"] = context_documents
+        yield event_frame("complete", completion)
         
     except Exception as e:
-        error_data = {
-            "type": "error",
-            "data": {"error": str(e)}
-        }
-        yield f"data: {json.dumps(error_data)}\n\n"
+        yield event_frame("error", {"error": str(e)})
 
 @router.post("/chat/stream")
 async def stream_chat(
     request: ChatRequest,
     vector_service: VectorStoreService = Depends(get_vector_service),
     web_search_service: WebSearchService = Depends(get_web_search_service),
-    openai_service: AzureOpenAIService = Depends(get_azure_openai_service)
+    openai_service: AzureOpenAIService = Depends(get_azure_openai_service),
+    semantic_cache: Optional[SemanticAnswerCache] = Depends(get_semantic_cache),
+    reranker: Optional[CrossEncoderReranker] = Depends(get_reranker),
+    session_store: Optional[ChatSessionStore] = Depends(get_chat_session_store)
 ):
     """
     Stream a chat response using RAG + Azure OpenAI
     """
     try:
-        rag_service = RAGService(vector_service, web_search_service)
+        rag_service = RAGService(vector_service, web_search_service, reranker)
+        session, session_created, chat_history = await resolve_session(request, session_store)
         
         # Create streaming response
         async def event_generator():
@@ -119,9 +288,15 @@ async def stream_chat(
                 query=request.query,
                 rag_service=rag_service,
                 openai_service=openai_service,
-                chat_history=request.chat_history,
+                chat_history=chat_history,
                 use_web_fallback=request.use_web_fallback,
-                images=request.images
+                images=request.images,
+                semantic_cache=resolve_semantic_cache(request, semantic_cache, chat_history),
+                filters=request.filters.model_dump(exclude_none=True) if request.filters else None,
+                compact_context=resolve_compact_context(request),
+                session_store=session_store,
+                session=session,
+                session_created=session_created
             ):
                 yield chunk
         
@@ -143,38 +318,58 @@ async def chat(
     request: ChatRequest,
     vector_service: VectorStoreService = Depends(get_vector_service),
     web_search_service: WebSearchService = Depends(get_web_search_service),
-    openai_service: AzureOpenAIService = Depends(get_azure_openai_service)
+    openai_service: AzureOpenAIService = Depends(get_azure_openai_service),
+    semantic_cache: Optional[SemanticAnswerCache] = Depends(get_semantic_cache),
+    reranker: Optional[CrossEncoderReranker] = Depends(get_reranker),
+    session_store: Optional[ChatSessionStore] = Depends(get_chat_session_store)
 ):
     """
     Non-streaming chat endpoint for testing
     """
     try:
-        rag_service = RAGService(vector_service, web_search_service)
+        rag_service = RAGService(vector_service, web_search_service, reranker)
+        session, _, chat_history = await resolve_session(request, session_store)
         
         # Search for relevant documents
         search_response = await rag_service.search(
             query=request.query,
-            limit=5,
-            threshold=0.3,  # Lowered threshold to capture more relevant documents
-            use_web_fallback=request.use_web_fallback
+            limit=CHAT_CONTEXT_LIMIT,
+            threshold=CHAT_CONTEXT_THRESHOLD,
+            use_web_fallback=request.use_web_fallback,
+            filters=request.filters.model_dump(exclude_none=True) if request.filters else None
         )
         
         # Extract context documents
-        context_documents = []
-        for result in search_response.results:
-            context_documents.append({
-                "content": result.document.content,
-                "metadata": result.document.metadata,
-                "similarity_score": result.similarity_score,
-                "source": result.source
-            })
-        
-        # Generate response
-        response_text = await openai_service.generate_non_streaming_response(
-            query=request.query,
-            context_documents=context_documents,
-            chat_history=request.chat_history,
-            images=request.images
+        context_documents = build_context_documents(search_response)
+        
+        # Reuse a cached answer for a near-identical question over the same context
+        cache = resolve_semantic_cache(request, semantic_cache, chat_history)
+        cached_answer = None
+        if cache:
+            query_embedding = await cache.embed(request.query)
+            cached_answer = cache.lookup(query_embedding, context_documents)
+        
+        prepared = None
+        if cached_answer:
+            response_text = cached_answer["answer"]
+        else:
+            # Generate response
+            images = await openai_service.preprocess_images(request.images)
+            prepared = openai_service.prepare_messages(
+                request.query, context_documents, chat_history, images
+            )
+            response_text = await openai_service.generate_non_streaming_response(
+                query=request.query,
+                context_documents=context_documents,
+                chat_history=chat_history,
+                images=images,
+                prepared=prepared
+            )
+            if cache and not isinstance(response_text, GenerationErrorText):
+                cache.store(request.query, query_embedding, context_documents, response_text)
+        await record_turn(
+            session_store, session, request.query, response_text,
+            failed=isinstance(response_text, GenerationErrorText)
         )
         
         # Extract images if any
@@ -183,10 +378,14 @@ async def chat(
         return ChatResponse(
             query=request.query,
             response=response_text,
-            context_documents=context_documents,
+            context_documents=context_references(context_documents) if resolve_compact_context(request) else context_documents,
             used_web_fallback=search_response.used_web_fallback,
             images=images,
-            total_context_found=len(context_documents)
+            total_context_found=len(context_documents),
+            semantic_cache_hit=cached_answer is not None,
+            llm_queue_ms=prepared.get("llm_queue_ms") if prepared else None,
+            llm_endpoint=prepared.get("llm_endpoint") if prepared else None,
+            session_id=session.session_id if session else None
         )
         
     except Exception as e:
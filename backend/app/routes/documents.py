@@ -0,0 +1,53 @@
+from fastapi import APIRouter, HTTPException, Depends, Header, Response
+from app.models.schemas import Document
+from app.services.vector_store import VectorStoreService
+from typing import Any, Dict, Optional
+import hashlib
+import json
+
+router = APIRouter()
+
+def get_vector_service() -> VectorStoreService:
+    from app.main import vector_service
+    if not vector_service:
+        raise HTTPException(status_code=500, detail="Vector service not initialized")
+    return vector_service
+
+def document_etag(document: Dict[str, Any]) -> str:
+    """Strong ETag from the stored metadata, which includes the content hash"""
+    digest = hashlib.sha256(json.dumps(document["metadata"], sort_keys=True, default=str).encode("utf-8"))
+    return f'"{digest.hexdigest()[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+@router.get("/documents/{doc_id}", response_model=Document)
+async def get_document(
+    doc_id: str,
+    response: Response,
+    if_none_match: Optional[str] = Header(default=None),
+    vector_service: VectorStoreService = Depends(get_vector_service)
+):
+    """
+    Get a stored document by ID, reassembled from its chunks.
+    Supports conditional GET: a matching If-None-Match returns 304.
+    """
+    try:
+        document = await vector_service.get_document(doc_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Document lookup failed: {str(e)}")
+    if document is None:
+        raise HTTPException(status_code=404, detail=f"Document not found: {doc_id}")
+    
+    etag = document_etag(document)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return document
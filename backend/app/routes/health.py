@@ -1,5 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
+from typing import Any, Dict
+from app.services.rag_service import search_cache, search_flights
+from app.services.sse import stream_stats, chat_stream_fanout
 
 router = APIRouter()
 
@@ -15,3 +18,26 @@ async def health_check():
         message="RAG Retrieval System is running"
     )
 
+@router.get("/metrics")
+async def get_metrics() -> Dict[str, Any]:
+    """Runtime metrics (executor queue depth, wait times, batching)"""
+    from app.main import vector_service, web_search_service, semantic_cache, reranker, azure_openai_service
+    from app.main import chat_session_store
+    if not vector_service:
+        raise HTTPException(status_code=500, detail="Vector service not initialized")
+    return {
+        "vector_store": vector_service.get_metrics(),
+        "search_cache": search_cache.get_stats(),
+        "web_search": web_search_service.get_metrics() if web_search_service else None,
+        "semantic_cache": semantic_cache.get_stats() if semantic_cache else None,
+        "reranker": reranker.get_stats() if reranker else None,
+        "llm_endpoints": azure_openai_service.pool.get_stats() if azure_openai_service else None,
+        "image_preprocessing": azure_openai_service.image_preprocessor.get_stats() if azure_openai_service else None,
+        "chat_sessions": chat_session_store.get_stats() if chat_session_store else None,
+        "chat_stream": stream_stats.get_stats(),
+        "single_flight": {
+            "search": search_flights.get_stats(),
+            "chat_stream": chat_stream_fanout.get_stats()
+        }
+    }
+
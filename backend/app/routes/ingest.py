@@ -1,6 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends
-from app.models.schemas import IngestRequest, IngestResponse
+from fastapi import APIRouter, HTTPException, Depends, Request
+from typing import Optional
+from app.models.schemas import IngestRequest, IngestResponse, IngestJobStatus
 from app.services.vector_store import VectorStoreService
+from app.services.ingest_jobs import IngestJobStore, IngestJobQueue
+from app.services.bulk_ingest import BulkIngestService
+from app.services.executor import QUERY_LANE, INGEST_LANE
 
 router = APIRouter()
 
@@ -10,36 +14,113 @@ def get_vector_service() -> VectorStoreService:
         raise HTTPException(status_code=500, detail="Vector service not initialized")
     return vector_service
 
+def get_ingest_job_store() -> IngestJobStore:
+    from app.main import ingest_job_store
+    if not ingest_job_store:
+        raise HTTPException(status_code=500, detail="Ingest job store not initialized")
+    return ingest_job_store
+
+def get_ingest_job_queue() -> IngestJobQueue:
+    from app.main import ingest_job_queue
+    if not ingest_job_queue:
+        raise HTTPException(status_code=500, detail="Ingest job queue not initialized")
+    return ingest_job_queue
+
 @router.post("/ingest", response_model=IngestResponse)
 async def ingest_documents(
     request: IngestRequest,
-    vector_service: VectorStoreService = Depends(get_vector_service)
+    vector_service: VectorStoreService = Depends(get_vector_service),
+    job_queue: IngestJobQueue = Depends(get_ingest_job_queue)
 ):
     """
-    Ingest new documents into the vector store
+    Ingest new documents into the vector store.
+    With background=true the documents are queued as a job and the response
+    returns immediately with its job_id.
     """
     try:
-        ingested_count = await vector_service.add_documents(
+        if request.background:
+            job = await job_queue.submit(request.documents, collection_name=request.collection_name)
+            return IngestResponse(
+                success=True,
+                message=f"Queued {len(request.documents)} documents for background ingestion",
+                documents_ingested=0,
+                job_id=job["job_id"]
+            )
+        
+        counts = await vector_service.add_documents(
             documents=request.documents,
             collection_name=request.collection_name
         )
+        ingested_count = counts["inserted"] + counts["updated"]
         
         return IngestResponse(
             success=True,
-            message=f"Successfully ingested {ingested_count} documents",
-            documents_ingested=ingested_count
+            message=(
+                f"Successfully ingested {ingested_count} documents "
+                f"({counts['inserted']} inserted, {counts['updated']} updated, {counts['skipped']} skipped)"
+            ),
+            documents_ingested=ingested_count,
+            documents_inserted=counts["inserted"],
+            documents_updated=counts["updated"],
+            documents_skipped=counts["skipped"]
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
 
+@router.post("/ingest/stream", response_model=IngestJobStatus)
+async def ingest_documents_stream(
+    request: Request,
+    collection_name: Optional[str] = None,
+    job_id: Optional[str] = None,
+    vector_service: VectorStoreService = Depends(get_vector_service),
+    job_store: IngestJobStore = Depends(get_ingest_job_store)
+):
+    """
+    Bulk-ingest newline-delimited JSON documents, one document per line.
+    The body may be gzip-compressed. Documents are embedded and written in
+    fixed-size batches as the body streams in; progress can be followed on
+    /api/ingest/status?job_id=<job_id> while the upload is running.
+    """
+    content_encoding = request.headers.get("content-encoding", "").lower()
+    content_type = request.headers.get("content-type", "").lower()
+    compressed = True if "gzip" in content_encoding or "gzip" in content_type else None
+    
+    try:
+        job = await vector_service.executor.run(
+            INGEST_LANE, job_store.create_job, collection_name=collection_name, job_id=job_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    bulk_ingest = BulkIngestService(vector_service, job_store)
+    return await bulk_ingest.ingest_ndjson(
+        job["job_id"],
+        request.stream(),
+        compressed=compressed,
+        collection_name=collection_name
+    )
+
 @router.get("/ingest/status")
 async def get_ingestion_status(
-    vector_service: VectorStoreService = Depends(get_vector_service)
+    job_id: Optional[str] = None,
+    jobs_limit: int = 20,
+    vector_service: VectorStoreService = Depends(get_vector_service),
+    job_store: IngestJobStore = Depends(get_ingest_job_store)
 ):
-    """Get the current status of document ingestion"""
+    """
+    Get the current status of document ingestion with the most recent jobs,
+    or of a single ingest job when job_id is given
+    """
+    if job_id:
+        # Status reads are interactive, so they skip the (possibly busy) ingest lane
+        job = await vector_service.executor.run(QUERY_LANE, job_store.get_job, job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail=f"Ingest job {job_id} not found")
+        return job
+    
     try:
         status = await vector_service.get_collection_status()
+        status["jobs"] = await vector_service.executor.run(QUERY_LANE, job_store.list_jobs, limit=jobs_limit)
         return status
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get status: {str(e)}")
-
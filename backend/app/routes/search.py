@@ -1,8 +1,21 @@
 from fastapi import APIRouter, HTTPException, Depends
-from app.models.schemas import SearchRequest, SearchResponse
+from app.models.schemas import (
+    SearchRequest,
+    SearchResponse,
+    BatchSearchRequest,
+    BatchSearchResponse,
+    BatchSearchResult
+)
 from app.services.vector_store import VectorStoreService
 from app.services.web_search import WebSearchService
 from app.services.rag_service import RAGService
+from app.services.reranker import CrossEncoderReranker
+from typing import Optional
+import time
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import SEARCH_BATCH_MAX_QUERIES
 
 router = APIRouter()
 
@@ -18,28 +31,69 @@ def get_web_search_service() -> WebSearchService:
         raise HTTPException(status_code=500, detail="Web search service not initialized")
     return web_search_service
 
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    from app.main import reranker
+    return reranker
+
 @router.post("/search", response_model=SearchResponse)
 async def search_documents(
     request: SearchRequest,
     vector_service: VectorStoreService = Depends(get_vector_service),
-    web_search_service: WebSearchService = Depends(get_web_search_service)
+    web_search_service: WebSearchService = Depends(get_web_search_service),
+    reranker: Optional[CrossEncoderReranker] = Depends(get_reranker)
 ):
     """
     Search for relevant documents using RAG architecture.
     Falls back to web search if no relevant documents are found.
     """
     try:
-        rag_service = RAGService(vector_service, web_search_service)
+        rag_service = RAGService(vector_service, web_search_service, reranker)
         response = await rag_service.search(
             query=request.query,
             limit=request.limit,
             threshold=request.threshold,
-            use_web_fallback=request.use_web_fallback
+            use_web_fallback=request.use_web_fallback,
+            collapse_chunks=request.collapse_chunks,
+            search_mode=request.search_mode,
+            filters=request.filters.model_dump(exclude_none=True) if request.filters else None,
+            rerank=request.rerank
         )
         return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_documents_batch(
+    request: BatchSearchRequest,
+    vector_service: VectorStoreService = Depends(get_vector_service),
+    web_search_service: WebSearchService = Depends(get_web_search_service),
+    reranker: Optional[CrossEncoderReranker] = Depends(get_reranker)
+):
+    """
+    Run many searches in one request. Queries are embedded in a single batch
+    and sent to the vector store together; results come back in request order
+    with per-search timing.
+    """
+    if len(request.searches) > SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many searches in one batch (max {SEARCH_BATCH_MAX_QUERIES})"
+        )
+    
+    started = time.perf_counter()
+    rag_service = RAGService(vector_service, web_search_service, reranker)
+    outcomes = await rag_service.search_batch([
+        {
+            **search.model_dump(exclude={"filters"}),
+            "filters": search.filters.model_dump(exclude_none=True) if search.filters else None
+        }
+        for search in request.searches
+    ])
+    return BatchSearchResponse(
+        results=[BatchSearchResult(**outcome) for outcome in outcomes],
+        total_elapsed_ms=round((time.perf_counter() - started) * 1000, 2)
+    )
+
 @router.get("/search/suggestions")
 async def get_search_suggestions():
     """Get search suggestions for common healthcare queries"""
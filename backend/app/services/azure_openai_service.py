@@ -1,7 +1,10 @@
 import asyncio
 import json
-from typing import AsyncGenerator, List, Dict, Any, Optional
-from openai import AsyncAzureOpenAI
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator, AsyncIterator, List, Dict, Any, Optional, Tuple
+from openai import AsyncAzureOpenAI, APIConnectionError, APIStatusError, InternalServerError, RateLimitError
+import httpx
 import os
 from dotenv import load_dotenv
 import sys
@@ -11,175 +14,355 @@ from config import (
     AZURE_OPENAI_ENDPOINT,
     AZURE_OPENAI_API_VERSION,
     AZURE_OPENAI_MODEL_NAME,
-    AZURE_OPENAI_DEPLOYMENT
+    AZURE_OPENAI_DEPLOYMENT,
+    AZURE_OPENAI_MAX_CONNECTIONS,
+    AZURE_OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+    AZURE_OPENAI_KEEPALIVE_EXPIRY,
+    AZURE_OPENAI_CONNECT_TIMEOUT,
+    AZURE_OPENAI_READ_TIMEOUT,
+    AZURE_OPENAI_HTTP2,
+    LLM_MAX_RETRIES
 )
 
+from app.services.prompt_builder import PromptBuilder, TokenCounter
+from app.services.llm_admission import PRIORITY_INTERACTIVE, PRIORITY_BATCH
+from app.services.llm_endpoints import EndpointPool, LLMEndpoint, endpoint_settings
+from app.services.image_processing import ImagePreprocessor, image_data_url
+from app.services.executor import BlockingExecutor
+
 load_dotenv()
 
+class GenerationErrorText(str):
+    """
+    Error message sent in place of (or after part of) an answer when the LLM
+    call fails. It is shown to the user like any text, but callers check for
+    this type so failed answers are never cached or kept in chat history.
+    """
+
+SYSTEM_INSTRUCTIONS = """You are a helpful healthcare AI assistant. You have access to relevant healthcare documents and information. 
+        
+Please provide accurate, helpful responses based on the context provided. If the context doesn't contain enough information to answer the question, say so clearly.
+
+If the user provides images, analyze them and provide relevant healthcare information based on what you see in the images.
+
+Guidelines:
+- Be accurate and evidence-based
+- Use clear, accessible language
+- Include relevant details from the context
+- If you're uncertain about medical advice, recommend consulting healthcare professionals
+- Always prioritize patient safety
+- When analyzing images, describe what you see and provide relevant healthcare insights
+
+Context Documents:
+"""
+
+# Completion length requested for chat answers
+MAX_RESPONSE_TOKENS = 1000
+
+NO_CONTEXT_TEXT = "\nNo specific context documents available. Please answer based on your general knowledge.\n"
+
 class AzureOpenAIService:
-    def __init__(self):
-        # Azure OpenAI configuration
+    def __init__(self, executor: Optional[BlockingExecutor] = None):
+        # Azure OpenAI configuration (the first pool endpoint is the primary)
         self.api_key = AZURE_OPENAI_API_KEY
         self.api_version = AZURE_OPENAI_API_VERSION
         self.endpoint = AZURE_OPENAI_ENDPOINT
         self.model_name = AZURE_OPENAI_MODEL_NAME
         self.deployment = AZURE_OPENAI_DEPLOYMENT
+        self.prompt_builder = PromptBuilder(TokenCounter(self.model_name))
+        self.image_preprocessor = ImagePreprocessor(executor=executor)
         
-        # Initialize Azure OpenAI client
-        self.client = AsyncAzureOpenAI(
-            api_key=self.api_key,
-            api_version=self.api_version,
-            azure_endpoint=self.endpoint
+        # One Azure OpenAI client per pool endpoint, all on a shared pooled,
+        # keep-alive HTTP client. The service is created once at startup and
+        # shared by all requests.
+        self.http_client = self._build_http_client()
+        self.pool = EndpointPool([
+            LLMEndpoint(setting, AsyncAzureOpenAI(
+                api_key=setting["api_key"],
+                api_version=setting["api_version"],
+                azure_endpoint=setting["endpoint"],
+                http_client=self.http_client,
+                # Retries go back through admission control (see _completion)
+                max_retries=0
+            ))
+            for setting in endpoint_settings()
+        ])
+        self.endpoint = self.pool.endpoints[0].endpoint
+        self.deployment = self.pool.endpoints[0].deployment
+    
+    def _build_http_client(self) -> httpx.AsyncClient:
+        """Build the shared connection pool used for every Azure OpenAI call"""
+        http2 = AZURE_OPENAI_HTTP2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("h2 is not installed, using HTTP/1.1 for Azure OpenAI")
+                http2 = False
+        
+        return httpx.AsyncClient(
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=AZURE_OPENAI_MAX_CONNECTIONS,
+                max_keepalive_connections=AZURE_OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=AZURE_OPENAI_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(AZURE_OPENAI_READ_TIMEOUT, connect=AZURE_OPENAI_CONNECT_TIMEOUT)
         )
     
+    async def close(self):
+        """Close the shared HTTP connection pool"""
+        await self.http_client.aclose()
+    
+    @asynccontextmanager
+    async def _completion(
+        self,
+        priority: int,
+        messages: List[Dict[str, Any]],
+        tokens: int,
+        **kwargs
+    ) -> AsyncIterator[Tuple[Any, float, LLMEndpoint]]:
+        """
+        Create a chat completion on the best pool endpoint once admitted there,
+        holding its concurrency slot until the block exits (for streams, until
+        the last token is read). Yields (response, total queue wait in ms,
+        endpoint).
+        
+        Streams are read up to their first token before being handed over, so
+        a failure before then is retried on another endpoint without the
+        caller seeing it. Rate-limited calls shrink that endpoint's admission
+        limit and pause it for the Retry-After period; connection errors and
+        5xx responses count against its circuit breaker. Either way the call
+        fails over, up to LLM_MAX_RETRIES times.
+        """
+        queue_ms = 0.0
+        tried: List[LLMEndpoint] = []
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            endpoint = self.pool.choose(tried)
+            if tried and endpoint is not tried[-1]:
+                self.pool.failovers += 1
+            try:
+                ticket = await endpoint.admission.acquire(priority, tokens)
+            except BaseException:
+                # Not admitted (LLMOverloadedError) or cancelled while queued: the
+                # request was never sent, so give back any half-open probe
+                endpoint.breaker.abandon()
+                raise
+            queue_ms += ticket.queue_ms
+            endpoint.requests += 1
+            started_at = time.perf_counter()
+            try:
+                response = await endpoint.client.chat.completions.create(
+                    model=endpoint.deployment,
+                    messages=messages,
+                    **kwargs
+                )
+                if kwargs.get("stream"):
+                    response = await self._start_stream(response)
+                    endpoint.record_ttft((time.perf_counter() - started_at) * 1000)
+            except RateLimitError as e:
+                # The endpoint is up, just out of quota
+                endpoint.breaker.record_success()
+                endpoint.admission.record_rate_limited(self._retry_after(e))
+                endpoint.admission.release()
+                tried.append(endpoint)
+                if attempt == LLM_MAX_RETRIES:
+                    raise
+                continue
+            except (APIConnectionError, InternalServerError, httpx.TransportError):
+                endpoint.failures += 1
+                endpoint.breaker.record_failure()
+                endpoint.admission.release()
+                tried.append(endpoint)
+                if attempt == LLM_MAX_RETRIES:
+                    raise
+                continue
+            except BaseException as e:
+                if isinstance(e, APIStatusError):
+                    # Rejected request (4xx): nothing wrong with the endpoint
+                    endpoint.breaker.record_success()
+                else:
+                    endpoint.breaker.abandon()
+                endpoint.admission.release()
+                raise
+            
+            endpoint.breaker.record_success()
+            try:
+                yield response, queue_ms, endpoint
+                endpoint.admission.record_success()
+            finally:
+                endpoint.admission.release()
+            return
+    
+    @staticmethod
+    async def _start_stream(stream: Any) -> AsyncGenerator[Any, None]:
+        """
+        Read a completion stream up to its first content chunk and return a
+        stream replaying it from the start
+        """
+        iterator = stream.__aiter__()
+        buffered = []
+        try:
+            async for chunk in iterator:
+                buffered.append(chunk)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    break
+        except BaseException:
+            await stream.close()
+            raise
+        
+        async def replay():
+            try:
+                for chunk in buffered:
+                    yield chunk
+                async for chunk in iterator:
+                    yield chunk
+            finally:
+                await stream.close()
+        
+        return replay()
+    
+    @staticmethod
+    def _retry_after(error: RateLimitError) -> Optional[float]:
+        """Seconds to wait from a 429's retry-after-ms or retry-after header"""
+        headers = error.response.headers if error.response is not None else {}
+        try:
+            if headers.get("retry-after-ms"):
+                return float(headers["retry-after-ms"]) / 1000
+            if headers.get("retry-after"):
+                return float(headers["retry-after"])
+        except ValueError:
+            pass
+        return None
+    
     async def generate_response(
         self, 
         query: str, 
         context_documents: List[Dict[str, Any]], 
         chat_history: Optional[List[Dict[str, str]]] = None,
-        images: Optional[List[str]] = None
+        images: Optional[List[str]] = None,
+        prepared: Optional[Dict[str, Any]] = None
     ) -> AsyncGenerator[str, None]:
         """
-        Generate a streaming response using Azure OpenAI with RAG context and images
+        Generate a streaming response using Azure OpenAI with RAG context and images.
+        Pass the result of prepare_messages as prepared to reuse it; the time
+        spent waiting for admission is recorded in it as "llm_queue_ms".
         """
         try:
-            # Prepare system prompt with context
-            system_prompt = self._build_system_prompt(context_documents)
-            
-            # Prepare messages
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Add chat history if provided
-            if chat_history:
-                # Convert ChatMessage objects to the format expected by OpenAI
-                for msg in chat_history[-10:]:  # Keep last 10 messages for context
-                    if hasattr(msg, 'role') and hasattr(msg, 'content'):
-                        messages.append({"role": msg.role, "content": msg.content})
-                    elif isinstance(msg, dict) and 'role' in msg and 'content' in msg:
-                        messages.append({"role": msg['role'], "content": msg['content']})
+            # Prepare messages within the prompt token budget
+            if prepared is None:
+                images = await self.preprocess_images(images)
+                prepared = self.prepare_messages(query, context_documents, chat_history, images)
+            messages = prepared["messages"]
+            tokens = prepared["token_breakdown"]["total"] + MAX_RESPONSE_TOKENS
             
-            # Add current query with images if provided
-            if images and len(images) > 0:
-                # Build content array with text and images
-                content = [{"type": "text", "text": query}]
-                for image in images:
-                    # Remove data:image/...;base64, prefix if present
-                    clean_image = image.split(',')[-1] if ',' in image else image
-                    content.append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{clean_image}"
-                        }
-                    })
-                messages.append({"role": "user", "content": content})
-            else:
-                messages.append({"role": "user", "content": query})
-            
-            # Generate streaming response
-            stream = await self.client.chat.completions.create(
-                model=self.deployment,
-                messages=messages,
+            # Generate streaming response (interactive priority)
+            async with self._completion(
+                PRIORITY_INTERACTIVE,
+                messages,
+                tokens,
                 stream=True,
                 temperature=0.7,
-                max_tokens=1000
-            )
-            
-            # Yield tokens as they come
-            async for chunk in stream:
-                if chunk.choices and len(chunk.choices) > 0 and chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
+                max_tokens=MAX_RESPONSE_TOKENS
+            ) as (stream, queue_ms, endpoint):
+                prepared["llm_queue_ms"] = queue_ms
+                prepared["llm_endpoint"] = endpoint.name
+                
+                # Yield tokens as they come
+                async for chunk in stream:
+                    if chunk.choices and len(chunk.choices) > 0 and chunk.choices[0].delta.content is not None:
+                        yield chunk.choices[0].delta.content
                     
         except Exception as e:
-            yield f"Error generating response: {str(e)}"
+            yield GenerationErrorText(f"Error generating response: {str(e)}")
     
-    def _build_system_prompt(self, context_documents: List[Dict[str, Any]]) -> str:
-        """Build system prompt with retrieved context"""
-        base_prompt = """You are a helpful healthcare AI assistant. You have access to relevant healthcare documents and information. 
-        
-Please provide accurate, helpful responses based on the context provided. If the context doesn't contain enough information to answer the question, say so clearly.
-
-If the user provides images, analyze them and provide relevant healthcare information based on what you see in the images.
-
-Guidelines:
-- Be accurate and evidence-based
-- Use clear, accessible language
-- Include relevant details from the context
-- If you're uncertain about medical advice, recommend consulting healthcare professionals
-- Always prioritize patient safety
-- When analyzing images, describe what you see and provide relevant healthcare insights
-
-Context Documents:
-"""
-        
-        if context_documents:
-            for i, doc in enumerate(context_documents, 1):
-                title = doc.get("metadata", {}).get("title", f"Document {i}")
-                content = doc.get("content", "")
-                source = doc.get("metadata", {}).get("source", "Unknown")
-                
-                base_prompt += f"\n--- Document {i}: {title} ---\n"
-                base_prompt += f"Source: {source}\n"
-                base_prompt += f"Content: {content}\n"
-        else:
-            base_prompt += "\nNo specific context documents available. Please answer based on your general knowledge.\n"
-        
-        return base_prompt
+    async def preprocess_images(self, images: Optional[List[str]]) -> Optional[List[str]]:
+        """Downscaled, recompressed data URLs for user-supplied images (see ImagePreprocessor)"""
+        return await self.image_preprocessor.prepare(images)
+    
+    def prepare_messages(
+        self,
+        query: str,
+        context_documents: List[Dict[str, Any]],
+        chat_history: Optional[List[Dict[str, str]]] = None,
+        images: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the chat messages within the prompt token budget.
+        Returns {"messages", "token_breakdown"}. Pass images through
+        preprocess_images first to send them downscaled.
+        """
+        prompt = self.prompt_builder.build(
+            instructions=SYSTEM_INSTRUCTIONS,
+            query=query,
+            context_documents=context_documents,
+            chat_history=chat_history,
+            image_count=len(images) if images else 0,
+            format_document=self._format_document,
+            empty_context=NO_CONTEXT_TEXT
+        )
+        messages = [{"role": "system", "content": prompt["system_prompt"]}]
+        messages.extend(prompt["history"])
+        messages.append(self._build_user_message(query, images))
+        return {"messages": messages, "token_breakdown": prompt["token_breakdown"]}
+    
+    @staticmethod
+    def _format_document(number: int, doc: Dict[str, Any], content: str) -> str:
+        title = doc.get("metadata", {}).get("title", f"Document {number}")
+        source = doc.get("metadata", {}).get("source", "Unknown")
+        return f"\n--- Document {number}: {title} ---\nSource: {source}\nContent: {content}\n"
+    
+    @staticmethod
+    def _build_user_message(query: str, images: Optional[List[str]] = None) -> Dict[str, Any]:
+        """The user's message, with images attached if provided"""
+        if images and len(images) > 0:
+            # Build content array with text and images
+            content = [{"type": "text", "text": query}]
+            for image in images:
+                # Labelled with the image's actual MIME type
+                content.append({
+                    "type": "image_url",
+                    "image_url": {
+                        "url": image_data_url(image)
+                    }
+                })
+            return {"role": "user", "content": content}
+        return {"role": "user", "content": query}
     
     async def generate_non_streaming_response(
         self, 
         query: str, 
         context_documents: List[Dict[str, Any]], 
         chat_history: Optional[List[Dict[str, str]]] = None,
-        images: Optional[List[str]] = None
+        images: Optional[List[str]] = None,
+        prepared: Optional[Dict[str, Any]] = None
     ) -> str:
         """
-        Generate a non-streaming response for testing purposes
+        Generate a non-streaming response for testing purposes.
+        Admitted at batch priority, behind streaming requests.
         """
         try:
-            # Prepare system prompt with context
-            system_prompt = self._build_system_prompt(context_documents)
-            
-            # Prepare messages
-            messages = [{"role": "system", "content": system_prompt}]
-            
-            # Add chat history if provided
-            if chat_history:
-                # Convert ChatMessage objects to the format expected by OpenAI
-                for msg in chat_history[-10:]:  # Keep last 10 messages for context
-                    if hasattr(msg, 'role') and hasattr(msg, 'content'):
-                        messages.append({"role": msg.role, "content": msg.content})
-                    elif isinstance(msg, dict) and 'role' in msg and 'content' in msg:
-                        messages.append({"role": msg['role'], "content": msg['content']})
-            
-            # Add current query with images if provided
-            if images and len(images) > 0:
-                # Build content array with text and images
-                content = [{"type": "text", "text": query}]
-                for image in images:
-                    # Remove data:image/...;base64, prefix if present
-                    clean_image = image.split(',')[-1] if ',' in image else image
-                    content.append({
-                        "type": "image_url",
-                        "image_url": {
-                            "url": f"data:image/jpeg;base64,{clean_image}"
-                        }
-                    })
-                messages.append({"role": "user", "content": content})
-            else:
-                messages.append({"role": "user", "content": query})
+            # Prepare messages within the prompt token budget
+            if prepared is None:
+                images = await self.preprocess_images(images)
+                prepared = self.prepare_messages(query, context_documents, chat_history, images)
+            messages = prepared["messages"]
+            tokens = prepared["token_breakdown"]["total"] + MAX_RESPONSE_TOKENS
             
             # Generate response
-            response = await self.client.chat.completions.create(
-                model=self.deployment,
-                messages=messages,
+            async with self._completion(
+                PRIORITY_BATCH,
+                messages,
+                tokens,
                 temperature=0.7,
-                max_tokens=1000
-            )
-            
-            return response.choices[0].message.content
+                max_tokens=MAX_RESPONSE_TOKENS
+            ) as (response, queue_ms, endpoint):
+                prepared["llm_queue_ms"] = queue_ms
+                prepared["llm_endpoint"] = endpoint.name
+                return response.choices[0].message.content
             
         except Exception as e:
-            return f"Error generating response: {str(e)}"
+            return GenerationErrorText(f"Error generating response: {str(e)}")
     
     async def extract_images_from_response(self, response_text: str) -> List[str]:
         """
@@ -203,18 +386,15 @@ Context Documents:
     async def test_connection(self) -> Dict[str, Any]:
         """Test the Azure OpenAI connection"""
         try:
-            response = await self.client.chat.completions.create(
-                model=self.deployment,
-                messages=[{"role": "user", "content": "Hello, this is a test message."}],
-                max_tokens=10
-            )
-            
-            return {
-                "status": "success",
-                "model": self.deployment,
-                "endpoint": self.endpoint,
-                "test_response": response.choices[0].message.content
-            }
+            messages = [{"role": "user", "content": "Hello, this is a test message."}]
+            async with self._completion(PRIORITY_BATCH, messages, 20, max_tokens=10) as (response, queue_ms, endpoint):
+                return {
+                    "status": "success",
+                    "model": endpoint.deployment,
+                    "endpoint": endpoint.endpoint,
+                    "test_response": response.choices[0].message.content,
+                    "queue_ms": queue_ms
+                }
         except Exception as e:
             return {
                 "status": "error",
@@ -0,0 +1,130 @@
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import json
+import zlib
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import INGEST_BATCH_SIZE, INGEST_STREAM_MAX_LINE_BYTES
+from app.services.vector_store import VectorStoreService
+from app.services.ingest_jobs import IngestJobStore
+from app.services.executor import INGEST_LANE
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+class BulkIngestService:
+    """
+    Streams newline-delimited JSON documents into the vector store.
+
+    The body is decompressed and parsed incrementally and written in fixed-size
+    batches. The next bytes are only read once the current batch is embedded
+    and stored, so a fast client is slowed down to the ingest rate instead of
+    being buffered in memory.
+    """
+
+    def __init__(
+        self,
+        vector_service: VectorStoreService,
+        job_store: IngestJobStore,
+        batch_size: int = INGEST_BATCH_SIZE,
+        max_line_bytes: int = INGEST_STREAM_MAX_LINE_BYTES
+    ):
+        self.vector_service = vector_service
+        self.job_store = job_store
+        self.batch_size = max(batch_size, 1)
+        self.max_line_bytes = max_line_bytes
+
+    async def ingest_ndjson(
+        self,
+        job_id: str,
+        body: AsyncIterator[bytes],
+        compressed: Optional[bool] = None,
+        collection_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Ingest an NDJSON byte stream under an existing job. If compressed is
+        None, gzip is detected from the stream's magic bytes.
+        """
+        batch: List[Dict[str, Any]] = []
+        try:
+            line_number = 0
+            async for line in self._iter_lines(body, compressed):
+                line_number += 1
+                if not line.strip():
+                    continue
+
+                try:
+                    document = json.loads(line)
+                    if not isinstance(document, dict) or not isinstance(document.get("content"), str):
+                        raise ValueError("expected an object with a string 'content' field")
+                except ValueError as e:
+                    await self._store(self.job_store.record_failure, job_id, f"Line {line_number}: {e}")
+                    continue
+
+                batch.append(document)
+                if len(batch) >= self.batch_size:
+                    await self._write_batch(job_id, batch, collection_name)
+                    batch = []
+
+            if batch:
+                await self._write_batch(job_id, batch, collection_name)
+            await self._store(self.job_store.finish, job_id)
+        except Exception as e:
+            await self._store(self.job_store.finish, job_id, error=str(e))
+
+        return await self._store(self.job_store.get_job, job_id)
+
+    async def _write_batch(self, job_id: str, batch: List[Dict[str, Any]], collection_name: Optional[str]):
+        try:
+            counts = await self.vector_service.add_documents(batch, collection_name=collection_name)
+            await self._store(self.job_store.record_batch, job_id, len(batch), counts)
+        except Exception as e:
+            await self._store(self.job_store.record_failure, job_id, f"Batch failed: {e}", count=len(batch))
+
+    async def _store(self, fn, *args, **kwargs):
+        """Run a job store call (a SQLite read or commit) on the ingest lane"""
+        return await self.vector_service.executor.run(INGEST_LANE, fn, *args, **kwargs)
+
+    async def _iter_lines(self, body: AsyncIterator[bytes], compressed: Optional[bool]) -> AsyncIterator[bytes]:
+        decompressor = None
+        buffer = b""
+        first_chunk = True
+
+        async for chunk in body:
+            if not chunk:
+                continue
+            if first_chunk:
+                first_chunk = False
+                if compressed or (compressed is None and chunk.startswith(GZIP_MAGIC)):
+                    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+            pending = chunk
+            while pending:
+                if decompressor is not None:
+                    # Cap output per call so a small compressed body cannot expand unbounded
+                    data = decompressor.decompress(pending, self.max_line_bytes)
+                    pending = decompressor.unconsumed_tail
+                    if decompressor.eof and decompressor.unused_data:
+                        # Concatenated gzip members (e.g. cat a.gz b.gz): decode the next one
+                        pending = decompressor.unused_data
+                        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                else:
+                    data, pending = pending, b""
+
+                lines, buffer = self._split_lines(buffer + data)
+                for line in lines:
+                    yield line
+
+        if decompressor is not None:
+            lines, buffer = self._split_lines(buffer + decompressor.flush())
+            for line in lines:
+                yield line
+        if buffer:
+            yield buffer
+
+    def _split_lines(self, buffer: bytes) -> Tuple[List[bytes], bytes]:
+        """Split complete lines off the buffer, returning them and the partial tail"""
+        lines = buffer.split(b"\n")
+        remaining = lines.pop()
+        if len(remaining) > self.max_line_bytes:
+            raise ValueError(f"NDJSON line exceeds {self.max_line_bytes} bytes")
+        return lines, remaining
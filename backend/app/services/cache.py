@@ -0,0 +1,220 @@
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+import asyncio
+import json
+import os
+import time
+
+class TTLCache:
+    """
+    In-memory LRU cache with per-entry TTL and a cap on total entry size.
+
+    Entry sizes are supplied by the caller (e.g. serialized length), so the
+    memory cap is approximate. An optional version lets callers drop every
+    entry at once when the underlying data changes.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 300, max_bytes: Optional[int] = None):
+        self.max_entries = max(max_entries, 1)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.version: Any = None
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._total_bytes = 0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, size: int = 0):
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (value, time.monotonic() + self.ttl_seconds, size)
+        self._total_bytes += size
+
+        # Evict least recently used entries until both caps are respected
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._total_bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def sync_version(self, version: Any):
+        """Clear the cache if the data it was built from has changed"""
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self.clear()
+            self.version = version
+
+    def clear(self):
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def _remove(self, key: Hashable):
+        _, _, size = self._entries.pop(key)
+        self._total_bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "approximate_bytes": self._total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+
+class StaleWhileRevalidateCache:
+    """
+    LRU cache for slow upstream lookups with stale-while-revalidate.
+
+    Entries younger than fresh_seconds are served directly. Entries up to
+    stale_seconds older than that are still served immediately, while a single
+    background refresh fetches a new value. Entries can be persisted to a JSON
+    file so they survive restarts; keys must be strings and values JSON-serializable.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        fresh_seconds: float = 3600,
+        stale_seconds: float = 86400,
+        persist_path: Optional[str] = None
+    ):
+        self.max_entries = max(max_entries, 1)
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.persist_path = persist_path or None
+        # key -> (value, fetched_at wall-clock time, so ages survive restarts)
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+        # Metrics
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_failures = 0
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.time() - fetched_at
+            if age < self.fresh_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            if age < self.fresh_seconds + self.stale_seconds:
+                self._entries.move_to_end(key)
+                self.stale_hits += 1
+                self._revalidate(key, fetch)
+                return value
+            del self._entries[key]
+
+        self.misses += 1
+        value = await fetch()
+        self.set(key, value)
+        return value
+
+    def set(self, key: str, value: Any):
+        # Empty results are usually upstream failures, so they are not kept
+        if not value:
+            return
+        self._entries[key] = (value, time.time())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _revalidate(self, key: str, fetch: Callable[[], Awaitable[Any]]):
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                self.set(key, await fetch())
+                self.refreshes += 1
+            except Exception as e:
+                self.refresh_failures += 1
+                print(f"Background refresh failed for {key}: {e}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
+
+    def load(self):
+        """Load persisted entries, dropping any that are past their stale window"""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, 'r') as f:
+                entries = json.load(f)
+            cutoff = time.time() - self.fresh_seconds - self.stale_seconds
+            for key, value, fetched_at in entries:
+                if fetched_at > cutoff:
+                    self._entries[key] = (value, fetched_at)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        except Exception as e:
+            print(f"Error loading cache from {self.persist_path}: {e}")
+
+    def save(self):
+        """Persist entries atomically (write to a temp file, then rename)"""
+        if not self.persist_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.persist_path)), exist_ok=True)
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump([[key, value, fetched_at] for key, (value, fetched_at) in self._entries.items()], f)
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            print(f"Error saving cache to {self.persist_path}: {e}")
+
+    async def close(self):
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        await asyncio.gather(*self._refreshing.values(), return_exceptions=True)
+        self.save()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.stale_hits) / lookups if lookups else 0,
+            "background_refreshes": self.refreshes,
+            "refresh_failures": self.refresh_failures,
+            "refreshing": len(self._refreshing)
+        }
@@ -0,0 +1,310 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import (
+    CHAT_SESSION_MAX_SESSIONS,
+    CHAT_SESSION_TTL_SECONDS,
+    CHAT_SESSION_DB_PATH,
+    CHAT_SESSION_MAX_MESSAGES,
+    CHAT_SESSION_SUMMARY_TOKENS
+)
+from app.services.prompt_builder import SUMMARY_HEADER, TokenCounter, summary_line
+from app.services.executor import BlockingExecutor, QUERY_LANE
+from app.services.single_flight import SingleFlight
+
+# session_id a client sends to start a session
+NEW_SESSION_ID = "new"
+
+class ChatSession:
+    """One conversation: its newest messages plus a rolling summary of older ones"""
+
+    def __init__(
+        self,
+        session_id: str,
+        messages: Optional[List[Dict[str, str]]] = None,
+        summary_lines: Optional[List[str]] = None,
+        created_at: Optional[float] = None,
+        last_active: Optional[float] = None
+    ):
+        now = time.time()
+        self.session_id = session_id
+        self.messages = messages or []
+        self.summary_lines = summary_lines or []
+        self.created_at = created_at or now
+        self.last_active = last_active or now
+
+    def history(self) -> List[Dict[str, str]]:
+        """Chat history for the prompt builder, the summary of older messages first"""
+        if not self.summary_lines:
+            return list(self.messages)
+        summary = {"role": "system", "content": SUMMARY_HEADER + "\n".join(self.summary_lines)}
+        return [summary] + self.messages
+
+    def to_payload(self) -> str:
+        return json.dumps({"messages": self.messages, "summary_lines": self.summary_lines})
+
+
+class ChatSessionStore:
+    """
+    Server-side chat history, so clients send only the new message each turn.
+
+    Sessions live in memory in LRU order. A session idle for ttl_seconds
+    expires; beyond max_sessions the least recently used are evicted, and
+    spilled to SQLite when db_path is set so they can be resumed later (all
+    sessions are also spilled on shutdown). Each session keeps its newest
+    max_messages messages verbatim and folds older ones into an extractive
+    summary of at most summary_tokens tokens, newest lines kept.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = CHAT_SESSION_MAX_SESSIONS,
+        ttl_seconds: float = CHAT_SESSION_TTL_SECONDS,
+        db_path: str = CHAT_SESSION_DB_PATH,
+        max_messages: int = CHAT_SESSION_MAX_MESSAGES,
+        summary_tokens: int = CHAT_SESSION_SUMMARY_TOKENS,
+        counter: Optional[TokenCounter] = None,
+        executor: Optional[BlockingExecutor] = None
+    ):
+        self.max_sessions = max(max_sessions, 1)
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max(max_messages, 2)
+        self.summary_tokens = summary_tokens
+        self.counter = counter or TokenCounter()
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        # Evicted sessions whose SQLite write has not finished yet
+        self._spilling: Dict[str, ChatSession] = {}
+        self._restores = SingleFlight()
+        self.executor = executor
+        self.spilled_sessions = 0
+
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            if db_path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            with self._lock, self._conn:
+                self._conn.execute("""
+                    CREATE TABLE IF NOT EXISTS chat_sessions (
+                        session_id TEXT PRIMARY KEY,
+                        payload TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_active REAL NOT NULL
+                    )
+                """)
+                self._conn.execute(
+                    "DELETE FROM chat_sessions WHERE last_active < ?", (time.time() - ttl_seconds,)
+                )
+                self.spilled_sessions = self._conn.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+
+        # Metrics
+        self.created = 0
+        self.resumed = 0
+        self.expired = 0
+        self.evicted = 0
+        self.restored = 0
+        self.turns = 0
+        self.summarized_messages = 0
+
+    async def get_or_create(self, session_id: Optional[str] = None) -> Tuple[ChatSession, bool]:
+        """
+        The session with session_id, or a new session (with a new ID) when none
+        is given or it has expired. Returns (session, created).
+        """
+        session = await self.get(session_id) if session_id else None
+        if session is not None:
+            self.resumed += 1
+            return session, False
+        session = ChatSession(uuid.uuid4().hex)
+        await self._put(session)
+        self.created += 1
+        return session, True
+
+    async def get(self, session_id: str) -> Optional[ChatSession]:
+        now = time.time()
+        # A session being spilled is still the current copy
+        session = self._sessions.get(session_id) or self._spilling.get(session_id)
+        if session is None:
+            # Concurrent turns of one spilled session restore it once
+            session, _ = await self._restores.do(session_id, lambda: self._restore(session_id))
+            if session is None:
+                return None
+        elif self._is_expired(session, now):
+            self._sessions.pop(session_id, None)
+            self.expired += 1
+            return None
+        session.last_active = now
+        await self._put(session)
+        return session
+
+    async def append_turn(self, session: ChatSession, user_content: str, assistant_content: str):
+        """Record a question and its answer, folding overflow into the summary"""
+        session.messages.append({"role": "user", "content": user_content})
+        session.messages.append({"role": "assistant", "content": assistant_content})
+        session.last_active = time.time()
+        self.turns += 1
+
+        overflow = len(session.messages) - self.max_messages
+        if overflow > 0:
+            folded, session.messages = session.messages[:overflow], session.messages[overflow:]
+            session.summary_lines.extend(summary_line(message) for message in folded)
+            self.summarized_messages += len(folded)
+            self._trim_summary(session)
+
+        # The session may have been evicted while its answer was generated
+        await self._put(session)
+
+    def _trim_summary(self, session: ChatSession):
+        """Drop the oldest summary lines until the summary fits summary_tokens"""
+        lines = session.summary_lines
+        while lines and self.counter.count(SUMMARY_HEADER + "\n".join(lines)) > self.summary_tokens:
+            if len(lines) == 1:
+                budget = self.summary_tokens - self.counter.count(SUMMARY_HEADER)
+                lines[0] = self.counter.truncate(lines[0], budget)
+                if not lines[0]:
+                    lines.pop()
+                break
+            lines.pop(0)
+
+    def _is_expired(self, session: ChatSession, now: float) -> bool:
+        return now - session.last_active > self.ttl_seconds
+
+    async def _put(self, session: ChatSession):
+        """Make session the most recently used, evicting (and spilling) past max_sessions"""
+        self._sessions[session.session_id] = session
+        self._sessions.move_to_end(session.session_id)
+        now = time.time()
+        evicted = []
+        # Least recently used first, so expired sessions are at the front
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                if self._is_expired(oldest, now):
+                    self.expired += 1
+                else:
+                    self.evicted += 1
+                    evicted.append(oldest)
+            elif self._is_expired(oldest, now):
+                self._sessions.popitem(last=False)
+                self.expired += 1
+            else:
+                break
+
+        for evicted_session in evicted:
+            await self._spill(evicted_session)
+
+    async def _spill(self, session: ChatSession):
+        if self._conn is None:
+            return
+        self._spilling[session.session_id] = session
+        try:
+            added = await self._run(
+                self._write_session, session.session_id, session.to_payload(), session.created_at, session.last_active
+            )
+            self.spilled_sessions += added
+            if session.session_id in self._sessions:
+                # Used again while it was being written: memory holds the current copy
+                if await self._run(self._delete_session, session.session_id):
+                    self.spilled_sessions -= 1
+        except sqlite3.Error as e:
+            print(f"Error spilling chat session {session.session_id}: {e}")
+        finally:
+            if self._spilling.get(session.session_id) is session:
+                del self._spilling[session.session_id]
+
+    async def _restore(self, session_id: str) -> Optional[ChatSession]:
+        """Load a spilled session back into memory (removing it from SQLite)"""
+        if self._conn is None:
+            return None
+        try:
+            row = await self._run(self._take_session, session_id)
+        except sqlite3.Error as e:
+            print(f"Error restoring chat session {session_id}: {e}")
+            return None
+        if row is None:
+            return None
+
+        self.spilled_sessions -= 1
+        payload, created_at, last_active = row
+        session = ChatSession(session_id, created_at=created_at, last_active=last_active, **json.loads(payload))
+        if self._is_expired(session, time.time()):
+            self.expired += 1
+            return None
+        self.restored += 1
+        return session
+
+    async def _run(self, fn, *args):
+        """SQLite work runs on the executor's query lane (or a worker thread), off the event loop"""
+        if self.executor is not None:
+            return await self.executor.run(QUERY_LANE, fn, *args)
+        return await asyncio.to_thread(fn, *args)
+
+    def _write_session(self, session_id: str, payload: str, created_at: float, last_active: float) -> bool:
+        """Store a session; True when it was not already stored"""
+        with self._lock, self._conn:
+            existing = self._conn.execute(
+                "SELECT 1 FROM chat_sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO chat_sessions (session_id, payload, created_at, last_active)
+                VALUES (?, ?, ?, ?)
+                """,
+                (session_id, payload, created_at, last_active)
+            )
+        return existing is None
+
+    def _take_session(self, session_id: str) -> Optional[Tuple[str, float, float]]:
+        """Read and delete a stored session"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT payload, created_at, last_active FROM chat_sessions WHERE session_id = ?",
+                (session_id,)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute("DELETE FROM chat_sessions WHERE session_id = ?", (session_id,))
+        return row
+
+    def _delete_session(self, session_id: str) -> bool:
+        with self._lock, self._conn:
+            return self._conn.execute(
+                "DELETE FROM chat_sessions WHERE session_id = ?", (session_id,)
+            ).rowcount > 0
+
+    async def close(self):
+        """Spill every live session so conversations survive a restart"""
+        if self._conn is None:
+            return
+        now = time.time()
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            if not self._is_expired(session, now):
+                await self._spill(session)
+        with self._lock:
+            self._conn.close()
+        self._conn = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "sessions_in_memory": len(self._sessions),
+            "sessions_spilled": self.spilled_sessions if self._conn is not None else None,
+            "created": self.created,
+            "resumed": self.resumed,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "restored": self.restored,
+            "turns": self.turns,
+            "summarized_messages": self.summarized_messages
+        }
@@ -0,0 +1,118 @@
+from typing import Callable, List, Optional, Tuple
+import re
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS
+
+# Sentence boundary: terminal punctuation followed by whitespace
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+WORD = re.compile(r'\S+')
+TOKEN = re.compile(r'\w+|[^\w\s]')
+
+def approximate_token_count(text: str) -> int:
+    """Word/punctuation count, used when no model tokenizer is available"""
+    return len(TOKEN.findall(text))
+
+class DocumentChunker:
+    """
+    Splits long documents into overlapping, sentence-aligned windows that fit
+    the embedding model's token limit.
+
+    Chunks are exact character spans of the source text, so a parent document
+    can be reassembled from its chunks' offsets.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = CHUNK_MAX_TOKENS,
+        overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+        count_tokens: Optional[Callable[[str], int]] = None
+    ):
+        self.max_tokens = max(max_tokens, 1)
+        self.overlap_tokens = min(max(overlap_tokens, 0), self.max_tokens // 2)
+        self.count_tokens = count_tokens or approximate_token_count
+
+    def chunk(self, text: str) -> List[Tuple[int, int]]:
+        """Return (start, end) character spans of the chunks for a text"""
+        if not text.strip():
+            return [(0, len(text))]
+        if self.count_tokens(text) <= self.max_tokens:
+            return [(0, len(text))]
+
+        units = self._split_units(text)
+        unit_tokens = [self.count_tokens(text[start:end]) for start, end in units]
+
+        chunks = []
+        first = 0
+        while first < len(units):
+            # Grow the window sentence by sentence until the budget is reached
+            last = first
+            total = unit_tokens[first]
+            while last + 1 < len(units) and total + unit_tokens[last + 1] <= self.max_tokens:
+                last += 1
+                total += unit_tokens[last]
+
+            chunks.append((units[first][0], units[last][1]))
+            if last + 1 >= len(units):
+                break
+
+            # Start the next window with trailing sentences worth up to overlap_tokens
+            next_first = last + 1
+            overlap = 0
+            while next_first - 1 > first and overlap + unit_tokens[next_first - 1] <= self.overlap_tokens:
+                next_first -= 1
+                overlap += unit_tokens[next_first]
+            first = next_first
+
+        return chunks
+
+    def _split_units(self, text: str) -> List[Tuple[int, int]]:
+        """Sentence spans, with sentences over the token budget split into word windows"""
+        units = []
+        start = 0
+        for match in SENTENCE_BOUNDARY.finditer(text):
+            units.extend(self._fit_sentence(text, start, match.start()))
+            start = match.end()
+        units.extend(self._fit_sentence(text, start, len(text)))
+        return units
+
+    def _fit_sentence(self, text: str, start: int, end: int) -> List[Tuple[int, int]]:
+        # Trim surrounding whitespace so spans start and end on content
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start >= end:
+            return []
+        if self.count_tokens(text[start:end]) <= self.max_tokens:
+            return [(start, end)]
+
+        # Overlong sentence: fall back to word windows within the budget
+        words = [(m.start() + start, m.end() + start) for m in WORD.finditer(text[start:end])]
+        pieces = []
+        piece_start, piece_end = words[0]
+        piece_tokens = self.count_tokens(text[piece_start:piece_end])
+        for word_start, word_end in words[1:]:
+            word_tokens = self.count_tokens(text[word_start:word_end])
+            if piece_tokens + word_tokens > self.max_tokens:
+                pieces.append((piece_start, piece_end))
+                piece_start = word_start
+                piece_tokens = 0
+            piece_end = word_end
+            piece_tokens += word_tokens
+        pieces.append((piece_start, piece_end))
+        return pieces
+
+def reassemble(chunks: List[Tuple[int, str]]) -> str:
+    """
+    Rebuild a document from (start_offset, text) chunks, dropping the overlap.
+    Whitespace between non-overlapping chunks is restored as spaces.
+    """
+    text = ""
+    for start, chunk_text in sorted(chunks, key=lambda c: c[0]):
+        if start > len(text):
+            text += " " * (start - len(text)) + chunk_text
+        else:
+            text += chunk_text[len(text) - start:]
+    return text
@@ -0,0 +1,68 @@
+from typing import Any, Dict
+import time
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Stops calling an upstream after repeated consecutive failures.
+
+    After failure_threshold failures in a row the breaker opens and calls are
+    rejected. Once reset_seconds have passed a single probe call is let
+    through: success closes the breaker again, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_seconds: float = 60):
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+
+        # Metrics
+        self.times_opened = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead; reserves the probe slot when half-open"""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = HALF_OPEN
+            self._probing = False
+
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._probing = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.times_opened += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+
+    def abandon(self):
+        """A call that was let through ended without telling success from failure"""
+        self._probing = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected
+        }
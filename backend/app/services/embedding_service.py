@@ -0,0 +1,187 @@
+from sentence_transformers import SentenceTransformer
+from collections import OrderedDict
+from typing import List, Tuple, Optional
+import numpy as np
+import asyncio
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import (
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_MICROBATCH_WINDOW_MS,
+    EMBEDDING_MICROBATCH_MAX_SIZE,
+    EMBEDDING_QUERY_CACHE_SIZE
+)
+from app.services.executor import BlockingExecutor, QUERY_LANE, INGEST_LANE
+from app.services.chunking import approximate_token_count
+
+class EmbeddingService:
+    """Single embedding engine shared by document ingestion and query search"""
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        microbatch_window_ms: float = EMBEDDING_MICROBATCH_WINDOW_MS,
+        microbatch_max_size: int = EMBEDDING_MICROBATCH_MAX_SIZE,
+        query_cache_size: int = EMBEDDING_QUERY_CACHE_SIZE,
+        executor: Optional[BlockingExecutor] = None
+    ):
+        self.model_name = model_name
+        self.executor = executor
+        self.batch_size = batch_size
+        self.model = None
+        self.query_batcher = QueryMicroBatcher(
+            self,
+            window_ms=microbatch_window_ms,
+            max_batch_size=microbatch_max_size
+        )
+        # Recent query embeddings in LRU order
+        self.query_cache_size = max(query_cache_size, 0)
+        self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
+
+    def load(self):
+        """Load the sentence transformer model"""
+        if self.model is None:
+            self.model = SentenceTransformer(self.model_name)
+
+    def count_tokens(self, text: str) -> int:
+        """Count tokens with the model's own tokenizer, approximating if unavailable"""
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            return approximate_token_count(text)
+        return len(tokenizer.tokenize(text))
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """Encode texts in configurable batches into normalized float32 vectors"""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        embeddings = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return embeddings.astype(np.float32, copy=False)
+
+    async def encode_on(self, lane: str, texts: List[str]) -> np.ndarray:
+        """Encode texts on an executor lane, or inline if no executor is configured"""
+        if self.executor is None:
+            return self.encode(texts)
+        return await self.executor.run(lane, self.encode, texts)
+
+    async def encode_documents(self, texts: List[str]) -> List[List[float]]:
+        """Encode a list of documents for ingestion"""
+        embeddings = await self.encode_on(INGEST_LANE, texts)
+        return embeddings.tolist()
+
+    async def encode_query(self, text: str) -> List[float]:
+        """Encode a single query, coalescing with other concurrent queries"""
+        cached = self._query_cache.get(text)
+        if cached is not None:
+            self._query_cache.move_to_end(text)
+            self.query_cache_hits += 1
+            return list(cached)
+
+        self.query_cache_misses += 1
+        embedding = await self.query_batcher.submit(text)
+        if self.query_cache_size:
+            self._query_cache[text] = embedding
+            self._query_cache.move_to_end(text)
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+        return list(embedding)
+
+    def get_query_cache_stats(self) -> dict:
+        lookups = self.query_cache_hits + self.query_cache_misses
+        return {
+            "entries": len(self._query_cache),
+            "hits": self.query_cache_hits,
+            "misses": self.query_cache_misses,
+            "hit_rate": self.query_cache_hits / lookups if lookups else 0
+        }
+
+
+class QueryMicroBatcher:
+    """
+    Coalesces queries submitted within a short window into one encode() call.
+
+    The first query to arrive opens a window; every query submitted before the
+    window closes (or until the batch is full) is encoded in the same call.
+    """
+
+    def __init__(self, embedding_service: EmbeddingService, window_ms: float = 5, max_batch_size: int = 32):
+        self.embedding_service = embedding_service
+        self.window_seconds = max(window_ms, 0) / 1000
+        self.max_batch_size = max(max_batch_size, 1)
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks = set()
+        self.batches_encoded = 0
+        self.queries_encoded = 0
+
+    async def submit(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._schedule_flush(loop, immediate=True)
+        elif self._flush_handle is None:
+            self._schedule_flush(loop)
+
+        return await future
+
+    def _schedule_flush(self, loop: asyncio.AbstractEventLoop, immediate: bool = False):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch = None
+        if immediate:
+            batch, self._pending = self._pending, []
+        else:
+            self._flush_handle = loop.call_later(self.window_seconds, self._on_window_closed, loop)
+
+        if batch:
+            self._start_flush(loop, batch)
+
+    def _on_window_closed(self, loop: asyncio.AbstractEventLoop):
+        self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self._start_flush(loop, batch)
+
+    def _start_flush(self, loop: asyncio.AbstractEventLoop, batch: List[Tuple[str, asyncio.Future]]):
+        # Keep a reference so the task is not garbage collected mid-flight
+        task = loop.create_task(self._flush(batch))
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]):
+        # Identical queries in the same window are encoded only once
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            embeddings = await self.embedding_service.encode_on(QUERY_LANE, unique_texts)
+            by_text = {text: embeddings[i].tolist() for i, text in enumerate(unique_texts)}
+            for text, future in batch:
+                if not future.done():
+                    future.set_result(by_text[text])
+            self.batches_encoded += 1
+            self.queries_encoded += len(batch)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def get_stats(self) -> dict:
+        return {
+            "batches_encoded": self.batches_encoded,
+            "queries_encoded": self.queries_encoded,
+            "average_batch_size": self.queries_encoded / self.batches_encoded if self.batches_encoded else 0
+        }
@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+import asyncio
+import functools
+import time
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import (
+    EXECUTOR_QUERY_WORKERS,
+    EXECUTOR_INGEST_WORKERS,
+    EXECUTOR_QUERY_MAX_PENDING,
+    EXECUTOR_INGEST_MAX_PENDING
+)
+
+QUERY_LANE = "query"
+INGEST_LANE = "ingest"
+
+class ExecutorLane:
+    """A dedicated thread pool with bounded admission and wait-time metrics"""
+
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        self.name = name
+        self.max_workers = max(max_workers, 1)
+        self.max_pending = max(max_pending, self.max_workers)
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{name}-lane")
+        self._admission = None
+
+        # Metrics
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.total_run_ms = 0.0
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        # Created lazily so it binds to the running event loop
+        if self._admission is None:
+            self._admission = asyncio.Semaphore(self.max_pending)
+
+        submitted_at = time.perf_counter()
+        self.submitted += 1
+
+        async with self._admission:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(self._timed_call, fn, submitted_at, *args, **kwargs)
+            try:
+                result = await loop.run_in_executor(self.pool, call)
+                self.completed += 1
+                return result
+            except Exception:
+                self.failed += 1
+                raise
+
+    def _timed_call(self, fn: Callable, submitted_at: float, *args, **kwargs) -> Any:
+        started_at = time.perf_counter()
+        wait_ms = (started_at - submitted_at) * 1000
+        self.started += 1
+        self.total_wait_ms += wait_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self.total_run_ms += (time.perf_counter() - started_at) * 1000
+
+    def get_metrics(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "queue_depth": self.submitted - self.started,
+            "in_flight": self.started - finished,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "average_wait_ms": self.total_wait_ms / self.started if self.started else 0,
+            "max_wait_ms": self.max_wait_ms,
+            "average_run_ms": self.total_run_ms / finished if finished else 0
+        }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class BlockingExecutor:
+    """
+    Runs blocking Chroma and embedding calls off the event loop.
+
+    Work is split into a query lane and an ingest lane, each with its own
+    thread pool, so bulk ingestion cannot starve interactive searches.
+    """
+
+    def __init__(
+        self,
+        query_workers: int = EXECUTOR_QUERY_WORKERS,
+        ingest_workers: int = EXECUTOR_INGEST_WORKERS,
+        query_max_pending: int = EXECUTOR_QUERY_MAX_PENDING,
+        ingest_max_pending: int = EXECUTOR_INGEST_MAX_PENDING
+    ):
+        self.lanes = {
+            QUERY_LANE: ExecutorLane(QUERY_LANE, query_workers, query_max_pending),
+            INGEST_LANE: ExecutorLane(INGEST_LANE, ingest_workers, ingest_max_pending)
+        }
+
+    async def run(self, lane: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run a blocking callable on the given lane and await its result"""
+        return await self.lanes[lane].run(fn, *args, **kwargs)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {name: lane.get_metrics() for name, lane in self.lanes.items()}
+
+    def shutdown(self):
+        for lane in self.lanes.values():
+            lane.shutdown()
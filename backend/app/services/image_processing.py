@@ -0,0 +1,185 @@
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import base64
+import binascii
+import hashlib
+import io
+import time
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import (
+    IMAGE_PREPROCESS_ENABLED,
+    IMAGE_MAX_DIMENSION,
+    IMAGE_JPEG_QUALITY,
+    IMAGE_CACHE_MAX_ENTRIES,
+    IMAGE_CACHE_TTL_SECONDS,
+    IMAGE_CACHE_MAX_BYTES
+)
+from app.services.cache import TTLCache
+from app.services.executor import BlockingExecutor, QUERY_LANE
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# Leading bytes identifying the image formats the model accepts
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+def split_data_url(image: str) -> Tuple[Optional[str], str]:
+    """(declared MIME type or None, base64 payload) for a data URL or bare base64"""
+    if image.startswith("data:") and "," in image:
+        header, payload = image.split(",", 1)
+        return header[5:].split(";")[0] or None, payload
+    return None, image
+
+def sniff_mime_type(data: bytes) -> Optional[str]:
+    for signature, mime_type in SIGNATURES:
+        if data.startswith(signature):
+            return mime_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+def image_data_url(image: str) -> str:
+    """
+    Data URL for a user-supplied image with its actual MIME type, read from
+    the image's leading bytes (falling back to the declared type, then JPEG)
+    """
+    declared, payload = split_data_url(image)
+    try:
+        head = base64.b64decode(payload[:24] + "=" * (-len(payload[:24]) % 4))
+    except (binascii.Error, ValueError):
+        head = b""
+    mime_type = sniff_mime_type(head) or declared or "image/jpeg"
+    return f"data:{mime_type};base64,{payload}"
+
+def preprocess_image(payload: str, max_dimension: int, jpeg_quality: int) -> Tuple[str, Dict[str, Any]]:
+    """
+    Decode a base64 image, downscale it to fit max_dimension and re-encode it
+    (PNG when it has transparency, otherwise JPEG). Returns (data URL, info).
+    The original is kept when it is already within bounds and smaller than
+    the re-encoded version.
+    """
+    data = base64.b64decode(payload)
+    info: Dict[str, Any] = {"original_bytes": len(data), "resized": False}
+    with Image.open(io.BytesIO(data)) as image:
+        # Phone photos are often stored sideways with an EXIF rotation
+        image = ImageOps.exif_transpose(image)
+        info["original_size"] = image.size
+        if max(image.size) > max_dimension:
+            image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+            info["resized"] = True
+        info["size"] = image.size
+
+        output = io.BytesIO()
+        if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+            mime_type = "image/png"
+            image.save(output, format="PNG", optimize=True)
+        else:
+            mime_type = "image/jpeg"
+            image.convert("RGB").save(output, format="JPEG", quality=jpeg_quality, optimize=True)
+        encoded = output.getvalue()
+
+    original_type = sniff_mime_type(data)
+    if not info["resized"] and original_type and len(data) <= len(encoded):
+        mime_type, encoded = original_type, data
+    info["bytes"] = len(encoded)
+    return f"data:{mime_type};base64,{base64.b64encode(encoded).decode('ascii')}", info
+
+
+class ImagePreprocessor:
+    """
+    Shrinks chat images before they are sent to the model.
+
+    Images are downscaled to IMAGE_MAX_DIMENSION and recompressed on the
+    executor's query lane (or a worker thread) so decoding never blocks the
+    event loop. Results are cached by a hash of the original, so an image
+    sent again in a conversation is processed once. Without Pillow, or for
+    images it cannot decode, the original is sent with its detected MIME type.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = IMAGE_PREPROCESS_ENABLED,
+        max_dimension: int = IMAGE_MAX_DIMENSION,
+        jpeg_quality: int = IMAGE_JPEG_QUALITY,
+        executor: Optional[BlockingExecutor] = None
+    ):
+        self.enabled = enabled and Image is not None
+        self.max_dimension = max_dimension
+        self.jpeg_quality = jpeg_quality
+        self.executor = executor
+        self.cache = TTLCache(
+            max_entries=IMAGE_CACHE_MAX_ENTRIES,
+            ttl_seconds=IMAGE_CACHE_TTL_SECONDS,
+            max_bytes=IMAGE_CACHE_MAX_BYTES
+        )
+
+        # Metrics
+        self.processed = 0
+        self.resized = 0
+        self.failed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.total_ms = 0.0
+
+    async def prepare(self, images: Optional[List[str]]) -> Optional[List[str]]:
+        """Data URLs ready to send, in the same order as images"""
+        if not images:
+            return images
+        return list(await asyncio.gather(*(self._prepare_one(image) for image in images)))
+
+    async def _prepare_one(self, image: str) -> str:
+        if not self.enabled:
+            return image_data_url(image)
+
+        _, payload = split_data_url(image)
+        key = hashlib.sha256(payload.encode("ascii", "ignore")).hexdigest()
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        started_at = time.perf_counter()
+        try:
+            if self.executor is not None:
+                data_url, info = await self.executor.run(
+                    QUERY_LANE, preprocess_image, payload, self.max_dimension, self.jpeg_quality
+                )
+            else:
+                data_url, info = await asyncio.to_thread(
+                    preprocess_image, payload, self.max_dimension, self.jpeg_quality
+                )
+        except Exception as e:
+            self.failed += 1
+            print(f"Error preprocessing image, sending it unchanged: {e}")
+            return image_data_url(image)
+        finally:
+            self.total_ms += (time.perf_counter() - started_at) * 1000
+
+        self.processed += 1
+        self.resized += info["resized"]
+        self.bytes_in += info["original_bytes"]
+        self.bytes_out += info["bytes"]
+        self.cache.set(key, data_url, size=len(data_url))
+        return data_url
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "pillow_installed": Image is not None,
+            "max_dimension": self.max_dimension,
+            "processed": self.processed,
+            "resized": self.resized,
+            "failed": self.failed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "average_ms": self.total_ms / (self.processed + self.failed) if self.processed + self.failed else 0,
+            "cache": self.cache.get_stats()
+        }
@@ -0,0 +1,361 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import asyncio
+import json
+import sqlite3
+import threading
+import uuid
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import INGEST_JOB_DB_PATH, INGEST_JOB_WORKERS, INGEST_BATCH_SIZE
+from app.services.executor import INGEST_LANE
+from app.services.vector_store import VectorStoreService
+
+# Only the first few per-document errors are kept on a job
+MAX_JOB_ERRORS = 20
+
+JOB_COLUMNS = [
+    "job_id", "kind", "status", "collection_name", "total_documents", "checkpoint",
+    "documents_received", "documents_inserted", "documents_updated", "documents_skipped",
+    "documents_failed", "errors", "created_at", "updated_at", "started_at", "finished_at",
+    "run_started_at", "run_start_received"
+]
+
+class IngestJobStore:
+    """
+    SQLite-backed record of ingest jobs and their progress.
+
+    Background jobs also spool their documents here; each committed batch
+    advances the job's checkpoint and drops the spooled documents in the same
+    transaction, so a restarted process resumes from the last committed batch.
+    """
+
+    def __init__(self, db_path: str = INGEST_JOB_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS ingest_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    collection_name TEXT,
+                    total_documents INTEGER,
+                    checkpoint INTEGER NOT NULL DEFAULT 0,
+                    documents_received INTEGER NOT NULL DEFAULT 0,
+                    documents_inserted INTEGER NOT NULL DEFAULT 0,
+                    documents_updated INTEGER NOT NULL DEFAULT 0,
+                    documents_skipped INTEGER NOT NULL DEFAULT 0,
+                    documents_failed INTEGER NOT NULL DEFAULT 0,
+                    errors TEXT NOT NULL DEFAULT '[]',
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    run_started_at TEXT,
+                    run_start_received INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS ingest_job_documents (
+                    job_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    payload TEXT NOT NULL,
+                    PRIMARY KEY (job_id, seq)
+                )
+            """)
+
+    def create_job(
+        self,
+        collection_name: Optional[str] = None,
+        job_id: Optional[str] = None,
+        kind: str = "stream",
+        documents: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Create a job. Stream jobs start running immediately; background jobs are
+        created "queued" with their documents spooled for the worker pool.
+        """
+        job_id = job_id or str(uuid.uuid4())
+        now = datetime.now().isoformat()
+        status = "running" if kind == "stream" else "queued"
+
+        with self._lock, self._conn:
+            existing = self._conn.execute(
+                "SELECT status FROM ingest_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+            if existing and existing["status"] in ("queued", "running"):
+                raise ValueError(f"Ingest job {job_id} is already {existing['status']}")
+
+            self._conn.execute("DELETE FROM ingest_jobs WHERE job_id = ?", (job_id,))
+            self._conn.execute("DELETE FROM ingest_job_documents WHERE job_id = ?", (job_id,))
+            self._conn.execute(
+                """
+                INSERT INTO ingest_jobs (
+                    job_id, kind, status, collection_name, total_documents,
+                    created_at, updated_at, started_at, run_started_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job_id, kind, status, collection_name,
+                    len(documents) if documents is not None else None,
+                    now, now,
+                    now if status == "running" else None,
+                    now if status == "running" else None
+                )
+            )
+            if documents:
+                self._conn.executemany(
+                    "INSERT INTO ingest_job_documents (job_id, seq, payload) VALUES (?, ?, ?)",
+                    ((job_id, seq, json.dumps(doc)) for seq, doc in enumerate(documents))
+                )
+
+        return self.get_job(job_id)
+
+    def mark_running(self, job_id: str):
+        """Start (or resume) a queued job, resetting its throughput window"""
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                UPDATE ingest_jobs
+                SET status = 'running', started_at = COALESCE(started_at, ?),
+                    run_started_at = ?, run_start_received = documents_received, updated_at = ?
+                WHERE job_id = ?
+                """,
+                (now, now, now, job_id)
+            )
+
+    def next_batch(self, job_id: str, batch_size: int) -> List[Dict[str, Any]]:
+        """Spooled documents after the job's checkpoint, in order"""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT d.payload FROM ingest_job_documents d
+                JOIN ingest_jobs j ON j.job_id = d.job_id
+                WHERE d.job_id = ? AND d.seq >= j.checkpoint
+                ORDER BY d.seq LIMIT ?
+                """,
+                (job_id, batch_size)
+            ).fetchall()
+        return [json.loads(row["payload"]) for row in rows]
+
+    def record_batch(self, job_id: str, received: int, counts: Dict[str, int]):
+        """Record a committed batch and advance the checkpoint past it"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                UPDATE ingest_jobs
+                SET documents_received = documents_received + ?,
+                    documents_inserted = documents_inserted + ?,
+                    documents_updated = documents_updated + ?,
+                    documents_skipped = documents_skipped + ?,
+                    checkpoint = checkpoint + ?,
+                    updated_at = ?
+                WHERE job_id = ?
+                """,
+                (
+                    received,
+                    counts.get("inserted", 0),
+                    counts.get("updated", 0),
+                    counts.get("skipped", 0),
+                    received,
+                    datetime.now().isoformat(),
+                    job_id
+                )
+            )
+            self._drop_committed_documents(job_id)
+
+    def record_failure(self, job_id: str, error: str, count: int = 1, advance: bool = False):
+        """Record documents that could not be ingested, optionally moving past them"""
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT errors FROM ingest_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            errors = json.loads(row["errors"])
+            if len(errors) < MAX_JOB_ERRORS:
+                errors.append(error)
+            self._conn.execute(
+                """
+                UPDATE ingest_jobs
+                SET documents_failed = documents_failed + ?, errors = ?,
+                    checkpoint = checkpoint + ?, updated_at = ?
+                WHERE job_id = ?
+                """,
+                (count, json.dumps(errors), count if advance else 0, datetime.now().isoformat(), job_id)
+            )
+            if advance:
+                self._drop_committed_documents(job_id)
+
+    def _drop_committed_documents(self, job_id: str):
+        self._conn.execute(
+            """
+            DELETE FROM ingest_job_documents
+            WHERE job_id = ? AND seq < (SELECT checkpoint FROM ingest_jobs WHERE job_id = ?)
+            """,
+            (job_id, job_id)
+        )
+
+    def finish(self, job_id: str, error: Optional[str] = None):
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT errors FROM ingest_jobs WHERE job_id = ?", (job_id,)).fetchone()
+            errors = json.loads(row["errors"])
+            if error and len(errors) < MAX_JOB_ERRORS:
+                errors.append(error)
+            now = datetime.now().isoformat()
+            self._conn.execute(
+                "UPDATE ingest_jobs SET status = ?, errors = ?, finished_at = ?, updated_at = ? WHERE job_id = ?",
+                ("failed" if error else "completed", json.dumps(errors), now, now, job_id)
+            )
+            self._conn.execute("DELETE FROM ingest_job_documents WHERE job_id = ?", (job_id,))
+
+    def recover_jobs(self) -> List[str]:
+        """
+        Called at startup. Background jobs left queued or running are returned
+        for resumption; interrupted stream jobs cannot be resumed (their request
+        body is gone) and are marked failed.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, kind FROM ingest_jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        resumable = []
+        for row in rows:
+            if row["kind"] == "background":
+                resumable.append(row["job_id"])
+            else:
+                self.finish(row["job_id"], error="Interrupted by server restart")
+        return resumable
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM ingest_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return self._format_job(row) if row else None
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(JOB_COLUMNS)} FROM ingest_jobs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._format_job(row) for row in rows]
+
+    def _format_job(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["errors"] = json.loads(job["errors"])
+
+        # Throughput over the current run (since the last start or resume)
+        throughput = None
+        eta_seconds = None
+        if job["run_started_at"]:
+            end = datetime.fromisoformat(job["finished_at"]) if job["finished_at"] else datetime.now()
+            elapsed = (end - datetime.fromisoformat(job["run_started_at"])).total_seconds()
+            processed = job["documents_received"] - job["run_start_received"]
+            if elapsed > 0:
+                throughput = processed / elapsed
+        if job["status"] == "running" and throughput and job["total_documents"] is not None:
+            remaining = job["total_documents"] - job["checkpoint"]
+            eta_seconds = max(remaining, 0) / throughput
+
+        job["throughput_docs_per_sec"] = round(throughput, 2) if throughput is not None else None
+        job["eta_seconds"] = round(eta_seconds, 1) if eta_seconds is not None else None
+        del job["checkpoint"], job["run_started_at"], job["run_start_received"]
+        return job
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class IngestJobQueue:
+    """In-process worker pool that runs background ingest jobs in checkpointed batches"""
+
+    def __init__(
+        self,
+        vector_service: VectorStoreService,
+        job_store: IngestJobStore,
+        workers: int = INGEST_JOB_WORKERS,
+        batch_size: int = INGEST_BATCH_SIZE
+    ):
+        self.vector_service = vector_service
+        self.job_store = job_store
+        self.worker_count = max(workers, 1)
+        self.batch_size = max(batch_size, 1)
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+
+    async def start(self):
+        """Start the workers and requeue jobs interrupted by a restart"""
+        self.queue = asyncio.Queue()
+        resumable = await self.vector_service.executor.run(INGEST_LANE, self.job_store.recover_jobs)
+        for job_id in resumable:
+            print(f"Resuming ingest job {job_id}")
+            self.queue.put_nowait(job_id)
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def submit(
+        self,
+        documents: List[Dict[str, Any]],
+        collection_name: Optional[str] = None,
+        job_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Spool documents into a new background job and queue it"""
+        job = await self._store(
+            self.job_store.create_job,
+            collection_name=collection_name,
+            job_id=job_id,
+            kind="background",
+            documents=documents
+        )
+        self.queue.put_nowait(job["job_id"])
+        return job
+
+    async def _worker(self):
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self._run_job(job_id)
+            except Exception as e:
+                await self._store(self.job_store.finish, job_id, error=str(e))
+            finally:
+                self.queue.task_done()
+
+    async def _run_job(self, job_id: str):
+        job = await self._store(self.job_store.get_job, job_id)
+        if not job:
+            return
+
+        await self._store(self.job_store.mark_running, job_id)
+        while True:
+            batch = await self._store(self.job_store.next_batch, job_id, self.batch_size)
+            if not batch:
+                break
+            try:
+                counts = await self.vector_service.add_documents(batch, collection_name=job["collection_name"])
+                await self._store(self.job_store.record_batch, job_id, len(batch), counts)
+            except Exception as e:
+                await self._store(
+                    self.job_store.record_failure, job_id, f"Batch failed: {e}", count=len(batch), advance=True
+                )
+
+        await self._store(self.job_store.finish, job_id)
+
+    async def _store(self, fn, *args, **kwargs):
+        """Job store calls commit to SQLite, so they run on the ingest lane"""
+        return await self.vector_service.executor.run(INGEST_LANE, fn, *args, **kwargs)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "workers": self.worker_count,
+            "queued_jobs": self.queue.qsize() if self.queue else 0
+        }
+
+    async def close(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
@@ -0,0 +1,171 @@
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import heapq
+import math
+import re
+import threading
+
+TERM = re.compile(r'\w+')
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word terms; punctuation splits terms (e.g. "COVID-19" -> covid, 19)"""
+    return TERM.findall(text.lower())
+
+class LexicalIndex:
+    """
+    In-memory BM25 inverted index over stored vectors (chunks).
+
+    Each vector is indexed on its content plus its document's "keywords"
+    metadata, and keeps its content and metadata so lexical results can be
+    returned without touching the vector store.
+
+    Writes may run on a worker thread: terms are computed outside the lock
+    and applied under it, so searches see the index before or after a write,
+    never partway through.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        # term -> {vector_id: term frequency}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        # vector_id -> (length in terms, content, metadata, unique terms)
+        self._vectors: Dict[str, Tuple[int, str, Dict[str, Any], List[str]]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.searches = 0
+
+    def __len__(self) -> int:
+        return len(self._vectors)
+
+    def add(self, ids: List[str], contents: List[str], metadatas: List[Dict[str, Any]]):
+        """Index (or re-index) vectors"""
+        self.replace([], ids, contents, metadatas)
+
+    def remove(self, ids: List[str]):
+        with self._lock:
+            for vector_id in ids:
+                self._remove_one(vector_id)
+
+    def replace(
+        self,
+        remove_ids: List[str],
+        ids: List[str],
+        contents: List[str],
+        metadatas: List[Dict[str, Any]]
+    ):
+        """Remove remove_ids and index (or re-index) vectors, as one write"""
+        entries = []
+        for vector_id, content, metadata in zip(ids, contents, metadatas):
+            terms = tokenize(content) + tokenize(str(metadata.get("keywords", "")))
+            entries.append((vector_id, content, metadata, len(terms), Counter(terms)))
+
+        with self._lock:
+            for vector_id in remove_ids:
+                self._remove_one(vector_id)
+            for vector_id, content, metadata, length, frequencies in entries:
+                self._remove_one(vector_id)
+                for term, frequency in frequencies.items():
+                    self._postings.setdefault(term, {})[vector_id] = frequency
+                self._vectors[vector_id] = (length, content, metadata, list(frequencies))
+                self._total_length += length
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Apply metadata-only changes, re-indexing since keywords may have changed"""
+        contents, known_ids, known_metadatas = [], [], []
+        with self._lock:
+            for vector_id, metadata in zip(ids, metadatas):
+                if vector_id in self._vectors:
+                    known_ids.append(vector_id)
+                    contents.append(self._vectors[vector_id][1])
+                    known_metadatas.append(metadata)
+        self.add(known_ids, contents, known_metadatas)
+
+    def _remove_one(self, vector_id: str):
+        entry = self._vectors.pop(vector_id, None)
+        if entry is None:
+            return
+        length, _, _, terms = entry
+        self._total_length -= length
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(vector_id, None)
+                if not postings:
+                    del self._postings[term]
+
+    def has_all_terms(self, query: str) -> bool:
+        """Whether every query term occurs somewhere in the index"""
+        terms = tokenize(query)
+        with self._lock:
+            return bool(terms) and all(term in self._postings for term in terms)
+
+    def _idf(self, term: str) -> float:
+        document_frequency = len(self._postings.get(term, ()))
+        return math.log(1 + (len(self._vectors) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    def search(
+        self,
+        query: str,
+        limit: int,
+        threshold: float = 0.0,
+        predicate: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        BM25 search returning vector hits ranked by score, optionally restricted
+        to vectors whose metadata satisfies predicate.
+
+        "score" is normalized to 0-1 as the share of the query's term weight a
+        vector matches (a single occurrence of every query term in an
+        average-length vector scores 1), so it can share a threshold with
+        vector similarity.
+        """
+        self.searches += 1
+        terms = set(tokenize(query))
+        with self._lock:
+            if not terms or not self._vectors:
+                return []
+
+            average_length = self._total_length / len(self._vectors) or 1
+            idfs = {term: self._idf(term) for term in terms}
+            max_score = sum(idfs.values())
+
+            scores: Dict[str, float] = {}
+            for term in terms:
+                for vector_id, frequency in self._postings.get(term, {}).items():
+                    length = self._vectors[vector_id][0]
+                    norm = self.k1 * (1 - self.b + self.b * length / average_length)
+                    scores[vector_id] = scores.get(vector_id, 0.0) + idfs[term] * frequency * (self.k1 + 1) / (frequency + norm)
+
+            if predicate is not None:
+                scores = {
+                    vector_id: score for vector_id, score in scores.items()
+                    if predicate(self._vectors[vector_id][2])
+                }
+
+            hits = []
+            for vector_id, score in heapq.nlargest(limit, scores.items(), key=lambda item: item[1]):
+                normalized = min(score / max_score, 1.0) if max_score > 0 else 0.0
+                if normalized < threshold:
+                    continue
+                _, content, metadata, _ = self._vectors[vector_id]
+                hits.append({
+                    "id": vector_id,
+                    "content": content,
+                    "metadata": metadata,
+                    "score": normalized,
+                    "bm25": score
+                })
+            return hits
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "vectors": len(self._vectors),
+                "terms": len(self._postings),
+                "average_length": self._total_length / len(self._vectors) if self._vectors else 0,
+                "searches": self.searches
+            }
+
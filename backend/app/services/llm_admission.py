@@ -0,0 +1,207 @@
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import time
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import (
+    LLM_MAX_CONCURRENCY,
+    LLM_MIN_CONCURRENCY,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_MAX_QUEUE,
+    LLM_QUEUE_TIMEOUT_SECONDS,
+    LLM_DEFAULT_RETRY_AFTER_SECONDS
+)
+
+# Lower values are admitted first
+PRIORITY_INTERACTIVE = 0  # Streaming chat
+PRIORITY_BATCH = 1  # /api/chat, connection tests
+
+TOKEN_WINDOW_SECONDS = 60.0
+
+class LLMOverloadedError(Exception):
+    """The request could not be admitted (queue full or queue wait timed out)"""
+
+
+class AdmissionTicket:
+    """One admitted LLM call"""
+
+    def __init__(self, priority: int, tokens: int):
+        self.priority = priority
+        self.tokens = tokens
+        self.queue_ms = 0.0
+
+
+class LLMAdmissionController:
+    """
+    Shared admission control for LLM calls.
+
+    Calls wait in a priority queue (interactive ahead of batch, FIFO within a
+    priority) until there is a free concurrency slot and room in the
+    tokens-per-minute budget. Concurrency adapts AIMD-style: it is halved on a
+    rate-limit response, which also pauses admission for the Retry-After
+    period, and grows by one after a full window of successful calls.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        min_concurrency: int = LLM_MIN_CONCURRENCY,
+        tokens_per_minute: int = LLM_TOKENS_PER_MINUTE,
+        max_queue: int = LLM_MAX_QUEUE,
+        queue_timeout_seconds: float = LLM_QUEUE_TIMEOUT_SECONDS,
+        default_retry_after_seconds: float = LLM_DEFAULT_RETRY_AFTER_SECONDS
+    ):
+        self.max_concurrency = max(max_concurrency, 1)
+        self.min_concurrency = min(max(min_concurrency, 1), self.max_concurrency)
+        self.tokens_per_minute = tokens_per_minute
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.default_retry_after_seconds = default_retry_after_seconds
+
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._successes = 0
+        self._last_decrease = 0.0
+        # (priority, sequence, tokens, future)
+        self._queue: List[Tuple[int, int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        # (admitted_at, tokens) within the last TOKEN_WINDOW_SECONDS
+        self._token_log: Deque[Tuple[float, int]] = deque()
+        self._tokens_in_window = 0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+        # Metrics
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.rate_limited = 0
+        self.total_queue_ms = 0.0
+        self.max_queue_ms = 0.0
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE, tokens: int = 0) -> AdmissionTicket:
+        ticket = AdmissionTicket(priority, tokens)
+        if len(self._queue) >= self.max_queue:
+            self.rejected += 1
+            raise LLMOverloadedError(f"LLM queue is full ({len(self._queue)} waiting)")
+
+        queued_at = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._sequence), tokens, future))
+        self._dispatch()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout_seconds or None)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Admitted just as the wait ended: give the slot back
+                self.release()
+            else:
+                future.cancel()
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise LLMOverloadedError(f"Timed out after {self.queue_timeout_seconds}s waiting for the LLM")
+            raise
+
+        ticket.queue_ms = (time.perf_counter() - queued_at) * 1000
+        self.admitted += 1
+        self.total_queue_ms += ticket.queue_ms
+        self.max_queue_ms = max(self.max_queue_ms, ticket.queue_ms)
+        return ticket
+
+    def release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def record_success(self):
+        """Additive increase: one more slot after `limit` consecutive successes"""
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.max_concurrency:
+            self.limit += 1
+            self._successes = 0
+            self._dispatch()
+
+    def record_rate_limited(self, retry_after_seconds: Optional[float] = None):
+        """Multiplicative decrease and a pause of Retry-After seconds"""
+        self.rate_limited += 1
+        self._successes = 0
+        now = time.monotonic()
+        retry_after = retry_after_seconds if retry_after_seconds is not None else self.default_retry_after_seconds
+        self.paused_until = max(self.paused_until, now + retry_after)
+        # Calls already in flight when the limit was hit report 429s together:
+        # shrink once per pause rather than once per response
+        if now - self._last_decrease >= retry_after:
+            self.limit = max(self.min_concurrency, self.limit // 2)
+            self._last_decrease = now
+
+    def load(self) -> float:
+        """In-flight and queued calls per slot, plus the share of the token budget spent"""
+        queued = sum(1 for _, _, _, future in self._queue if not future.cancelled())
+        load = (self.in_flight + queued) / max(self.limit, 1)
+        if self.tokens_per_minute > 0:
+            self._expire_tokens(time.monotonic())
+            load += self._tokens_in_window / self.tokens_per_minute
+        return load
+
+    def paused_for(self) -> float:
+        """Seconds until a rate-limit pause ends (0 when not paused)"""
+        return max(self.paused_until - time.monotonic(), 0)
+
+    def _dispatch(self):
+        """Admit queued calls while slots, token budget and any pause allow"""
+        now = time.monotonic()
+        self._expire_tokens(now)
+        while self._queue:
+            priority, _, tokens, future = self._queue[0]
+            if future.cancelled():
+                heapq.heappop(self._queue)
+                continue
+            if now < self.paused_until:
+                self._schedule_wakeup(self.paused_until - now)
+                return
+            if self.in_flight >= self.limit:
+                return
+            if not self._tokens_available(tokens):
+                self._schedule_wakeup(self._token_log[0][0] + TOKEN_WINDOW_SECONDS - now)
+                return
+            heapq.heappop(self._queue)
+            self.in_flight += 1
+            if tokens:
+                self._token_log.append((now, tokens))
+                self._tokens_in_window += tokens
+            future.set_result(None)
+
+    def _tokens_available(self, tokens: int) -> bool:
+        if self.tokens_per_minute <= 0 or not self._token_log:
+            # An empty window admits even a call larger than the whole budget
+            return True
+        return self._tokens_in_window + tokens <= self.tokens_per_minute
+
+    def _expire_tokens(self, now: float):
+        while self._token_log and self._token_log[0][0] <= now - TOKEN_WINDOW_SECONDS:
+            self._tokens_in_window -= self._token_log.popleft()[1]
+
+    def _schedule_wakeup(self, delay: float):
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+        self._wakeup = asyncio.get_running_loop().call_later(max(delay, 0.001), self._dispatch)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency_limit": self.limit,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queued": sum(1 for _, _, _, future in self._queue if not future.cancelled()),
+            "tokens_per_minute": self.tokens_per_minute,
+            "tokens_in_window": self._tokens_in_window,
+            "paused_for_seconds": self.paused_for(),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "rate_limited": self.rate_limited,
+            "average_queue_ms": self.total_queue_ms / self.admitted if self.admitted else 0,
+            "max_queue_ms": self.max_queue_ms
+        }
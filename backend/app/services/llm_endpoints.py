@@ -0,0 +1,127 @@
+from typing import Any, Collection, Dict, List, Optional
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import (
+    AZURE_OPENAI_API_KEY,
+    AZURE_OPENAI_ENDPOINT,
+    AZURE_OPENAI_API_VERSION,
+    AZURE_OPENAI_DEPLOYMENT,
+    AZURE_OPENAI_ENDPOINTS,
+    AZURE_OPENAI_TTFT_EWMA_ALPHA,
+    AZURE_OPENAI_BREAKER_FAILURE_THRESHOLD,
+    AZURE_OPENAI_BREAKER_RESET_SECONDS,
+    LLM_MAX_CONCURRENCY,
+    LLM_TOKENS_PER_MINUTE
+)
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.llm_admission import LLMAdmissionController
+
+def endpoint_settings() -> List[Dict[str, Any]]:
+    """
+    Endpoint pool settings from AZURE_OPENAI_ENDPOINTS, with each entry's
+    missing fields taken from the single-endpoint settings. Without
+    AZURE_OPENAI_ENDPOINTS the pool is just the single endpoint.
+    """
+    entries = AZURE_OPENAI_ENDPOINTS or [{}]
+    settings = []
+    for index, entry in enumerate(entries):
+        setting = {
+            "name": entry.get("name") or f"endpoint-{index}",
+            "endpoint": entry.get("endpoint") or AZURE_OPENAI_ENDPOINT,
+            "api_key": entry.get("api_key") or AZURE_OPENAI_API_KEY,
+            "api_version": entry.get("api_version") or AZURE_OPENAI_API_VERSION,
+            "deployment": entry.get("deployment") or AZURE_OPENAI_DEPLOYMENT,
+            "weight": float(entry.get("weight", 1.0)),
+            "max_concurrency": int(entry.get("max_concurrency", LLM_MAX_CONCURRENCY)),
+            "tokens_per_minute": int(entry.get("tokens_per_minute", LLM_TOKENS_PER_MINUTE))
+        }
+        if not setting["endpoint"] or not setting["api_key"]:
+            raise ValueError(f"Azure OpenAI endpoint {setting['name']} needs an endpoint and api_key")
+        if setting["weight"] <= 0:
+            raise ValueError(f"Azure OpenAI endpoint {setting['name']} needs a positive weight")
+        settings.append(setting)
+    return settings
+
+
+class LLMEndpoint:
+    """One Azure OpenAI deployment with its own client, admission control and health"""
+
+    def __init__(self, setting: Dict[str, Any], client: Any):
+        self.name = setting["name"]
+        self.endpoint = setting["endpoint"]
+        self.deployment = setting["deployment"]
+        self.weight = setting["weight"]
+        self.client = client
+        # 429s and quotas are per deployment, so each endpoint has its own limits
+        self.admission = LLMAdmissionController(
+            max_concurrency=setting["max_concurrency"],
+            tokens_per_minute=setting["tokens_per_minute"]
+        )
+        self.breaker = CircuitBreaker(AZURE_OPENAI_BREAKER_FAILURE_THRESHOLD, AZURE_OPENAI_BREAKER_RESET_SECONDS)
+        # Exponentially weighted time to first token (None until measured)
+        self.ttft_ms: Optional[float] = None
+
+        # Metrics
+        self.requests = 0
+        self.failures = 0
+
+    def record_ttft(self, ttft_ms: float):
+        if self.ttft_ms is None:
+            self.ttft_ms = ttft_ms
+        else:
+            self.ttft_ms += AZURE_OPENAI_TTFT_EWMA_ALPHA * (ttft_ms - self.ttft_ms)
+
+    def cost(self, default_ttft_ms: float) -> float:
+        """
+        Expected wait for a first token, relative to the other endpoints:
+        recent TTFT scaled up by how busy the endpoint is (slots in use,
+        queue, spent token budget, a rate-limit pause) and down by weight.
+        """
+        load = self.admission.load()
+        cost = (self.ttft_ms if self.ttft_ms is not None else default_ttft_ms) * (1 + load) / self.weight
+        return cost + self.admission.paused_for() * 1000
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "endpoint": self.endpoint,
+            "deployment": self.deployment,
+            "weight": self.weight,
+            "ttft_ms": self.ttft_ms,
+            "requests": self.requests,
+            "failures": self.failures,
+            "breaker": self.breaker.get_stats(),
+            "admission": self.admission.get_stats()
+        }
+
+
+class EndpointPool:
+    """
+    Routes each LLM call to the endpoint with the lowest expected time to
+    first token. Endpoints not yet measured are costed at the best known TTFT
+    so they get tried; endpoints whose breaker is open are skipped while any
+    other endpoint is available.
+    """
+
+    def __init__(self, endpoints: List[LLMEndpoint]):
+        self.endpoints = endpoints
+        self.failovers = 0
+
+    def choose(self, exclude: Collection[LLMEndpoint] = ()) -> LLMEndpoint:
+        """Best endpoint not in exclude (all endpoints if every one is excluded)"""
+        candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude] or self.endpoints
+        measured = [endpoint.ttft_ms for endpoint in self.endpoints if endpoint.ttft_ms is not None]
+        default_ttft_ms = min(measured) if measured else 1.0
+        ranked = sorted(candidates, key=lambda endpoint: endpoint.cost(default_ttft_ms))
+        for endpoint in ranked:
+            if endpoint.breaker.allow():
+                return endpoint
+        # Every breaker is open: trying the best endpoint beats failing outright
+        return ranked[0]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "failovers": self.failovers,
+            "endpoints": [endpoint.get_stats() for endpoint in self.endpoints]
+        }
@@ -0,0 +1,172 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+import bisect
+
+# Document-level metadata fields tracked by the index and accepted as filters
+FILTER_FIELDS = ("category", "source")
+
+# Sorts after any doc_id, for inclusive upper bounds on (timestamp, doc_id) pairs
+MAX_DOC_ID = chr(0x10FFFF)
+
+def timestamp_of(created_at: Any) -> Optional[float]:
+    """Numeric timestamp for a created_at value (ISO string or datetime)"""
+    if isinstance(created_at, (int, float)):
+        return float(created_at)
+    try:
+        if isinstance(created_at, str):
+            created_at = datetime.fromisoformat(created_at)
+        return created_at.timestamp()
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+def build_where(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Translate search filters into a Chroma where clause.
+
+    filters may hold "category" and "source" (lists of accepted values) and
+    "created_after" / "created_before" (datetimes or ISO strings, inclusive).
+    """
+    if not filters:
+        return None
+
+    clauses = []
+    for field in FILTER_FIELDS:
+        values = filters.get(field)
+        if values:
+            clauses.append({field: {"$in": list(values)}})
+    created_after = timestamp_of(filters.get("created_after"))
+    if created_after is not None:
+        clauses.append({"created_at_ts": {"$gte": created_after}})
+    created_before = timestamp_of(filters.get("created_before"))
+    if created_before is not None:
+        clauses.append({"created_at_ts": {"$lte": created_before}})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def matches(filters: Optional[Dict[str, Any]], metadata: Dict[str, Any]) -> bool:
+    """Whether a vector's metadata satisfies the filters (same semantics as build_where)"""
+    if not filters:
+        return True
+    for field in FILTER_FIELDS:
+        values = filters.get(field)
+        if values and metadata.get(field) not in values:
+            return False
+
+    created_after = timestamp_of(filters.get("created_after"))
+    created_before = timestamp_of(filters.get("created_before"))
+    if created_after is None and created_before is None:
+        return True
+    created_at_ts = metadata.get("created_at_ts")
+    if created_at_ts is None:
+        return False
+    if created_after is not None and created_at_ts < created_after:
+        return False
+    if created_before is not None and created_at_ts > created_before:
+        return False
+    return True
+
+
+class MetadataIndex:
+    """
+    In-memory index of document-level metadata (one entry per parent document).
+
+    Answers filter-only queries without touching the vector store: exact-match
+    fields use value -> doc_id sets, and created_at ranges use a list of
+    timestamps that is re-sorted lazily after changes.
+    """
+
+    def __init__(self):
+        # doc_id -> indexed fields
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        # field -> value -> doc_ids
+        self._values: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in FILTER_FIELDS}
+        # (created_at_ts, doc_id) sorted ascending; None until next needed
+        self._created: Optional[List[Tuple[float, str]]] = None
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_id: str, metadata: Dict[str, Any]):
+        """Index (or re-index) a document from any of its vectors' metadata"""
+        self.remove(doc_id)
+        entry = {field: metadata.get(field) for field in FILTER_FIELDS}
+        entry["created_at_ts"] = metadata.get("created_at_ts")
+        self._documents[doc_id] = entry
+        for field in FILTER_FIELDS:
+            if entry[field] is not None:
+                self._values[field].setdefault(entry[field], set()).add(doc_id)
+        self._created = None
+
+    def remove(self, doc_id: str):
+        entry = self._documents.pop(doc_id, None)
+        if entry is None:
+            return
+        for field in FILTER_FIELDS:
+            doc_ids = self._values[field].get(entry[field])
+            if doc_ids is not None:
+                doc_ids.discard(doc_id)
+                if not doc_ids:
+                    del self._values[field][entry[field]]
+        self._created = None
+
+    def find(self, filters: Optional[Dict[str, Any]], limit: Optional[int] = None) -> List[str]:
+        """Doc IDs matching the filters, newest first (undated documents last)"""
+        filters = filters or {}
+        candidates: Optional[Set[str]] = None
+        for field in FILTER_FIELDS:
+            values = filters.get(field)
+            if values:
+                field_ids = set().union(*(self._values[field].get(value, set()) for value in values))
+                candidates = field_ids if candidates is None else candidates & field_ids
+
+        created_after = timestamp_of(filters.get("created_after"))
+        created_before = timestamp_of(filters.get("created_before"))
+        ranged = created_after is not None or created_before is not None
+
+        if candidates is not None and (limit is None or len(candidates) <= 4 * limit):
+            # Few candidates: check their timestamps directly
+            dated, undated = [], []
+            for doc_id in candidates:
+                created_at_ts = self._documents[doc_id]["created_at_ts"]
+                if created_at_ts is None:
+                    undated.append(doc_id)
+                elif (created_after is None or created_at_ts >= created_after) and \
+                        (created_before is None or created_at_ts <= created_before):
+                    dated.append((created_at_ts, doc_id))
+            doc_ids = [doc_id for _, doc_id in sorted(dated, reverse=True)]
+            if not ranged:
+                doc_ids.extend(sorted(undated))
+            return doc_ids[:limit] if limit is not None else doc_ids
+
+        if self._created is None:
+            self._created = sorted(
+                (entry["created_at_ts"], doc_id)
+                for doc_id, entry in self._documents.items()
+                if entry["created_at_ts"] is not None
+            )
+        low = bisect.bisect_left(self._created, (created_after, "")) if created_after is not None else 0
+        high = bisect.bisect_right(self._created, (created_before, MAX_DOC_ID)) if created_before is not None else len(self._created)
+
+        # Walk newest to oldest so the limit keeps the most recent documents
+        doc_ids = []
+        for index in range(high - 1, low - 1, -1):
+            doc_id = self._created[index][1]
+            if candidates is None or doc_id in candidates:
+                doc_ids.append(doc_id)
+                if limit is not None and len(doc_ids) >= limit:
+                    return doc_ids
+        if not ranged:
+            # Documents without a timestamp still match field-only filters
+            doc_ids.extend(sorted(
+                doc_id for doc_id, entry in self._documents.items()
+                if entry["created_at_ts"] is None and (candidates is None or doc_id in candidates)
+            ))
+        return doc_ids[:limit] if limit is not None else doc_ids
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self._documents),
+            **{f"{field}_values": len(self._values[field]) for field in FILTER_FIELDS}
+        }
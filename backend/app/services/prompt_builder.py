@@ -0,0 +1,216 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import re
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import (
+    PROMPT_TOKEN_BUDGET,
+    PROMPT_HISTORY_TOKEN_BUDGET,
+    PROMPT_HISTORY_SUMMARY_TOKENS,
+    PROMPT_DOCUMENT_MAX_TOKENS,
+    PROMPT_IMAGE_TOKENS
+)
+from app.services.chunking import TOKEN
+
+# Per-message framing overhead in chat completion requests
+MESSAGE_OVERHEAD_TOKENS = 4
+# Documents are dropped rather than squeezed into less than this
+MIN_DOCUMENT_TOKENS = 32
+SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+SUMMARY_HEADER = "Summary of earlier conversation:\n"
+
+def summary_line(message: Dict[str, str]) -> str:
+    """One line of an extractive history summary: the message's first sentence"""
+    first_sentence = SENTENCE_END.split(message["content"].strip(), maxsplit=1)[0]
+    return f"- {message['role']}: {first_sentence}"
+
+class TokenCounter:
+    """
+    Counts tokens with tiktoken when it is installed, otherwise approximates
+    with a word/punctuation count (close to BPE counts for English prose).
+    """
+
+    def __init__(self, model_name: str = "gpt-4o-mini"):
+        self.encoding = None
+        try:
+            import tiktoken
+            try:
+                self.encoding = tiktoken.encoding_for_model(model_name)
+            except KeyError:
+                self.encoding = tiktoken.get_encoding("o200k_base")
+        except ImportError:
+            pass
+
+    @property
+    def backend(self) -> str:
+        return self.encoding.name if self.encoding is not None else "approximate"
+
+    def count(self, text: str) -> int:
+        if self.encoding is not None:
+            return len(self.encoding.encode(text, disallowed_special=()))
+        return len(TOKEN.findall(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to at most max_tokens tokens"""
+        if max_tokens <= 0:
+            return ""
+        if self.encoding is not None:
+            tokens = self.encoding.encode(text, disallowed_special=())
+            if len(tokens) <= max_tokens:
+                return text
+            return self.encoding.decode(tokens[:max_tokens])
+        for index, match in enumerate(TOKEN.finditer(text)):
+            if index == max_tokens:
+                return text[:match.start()].rstrip()
+        return text
+
+
+class PromptBuilder:
+    """
+    Assembles the system prompt and chat history within a token budget.
+
+    The system instructions, the user's query and any images are always sent.
+    History gets up to history_budget tokens, newest messages first; older
+    messages are compressed into a short extractive summary. Context documents,
+    ranked by similarity_score, fill what remains, each capped at
+    document_max_tokens and truncated or dropped once the budget runs out.
+    """
+
+    def __init__(
+        self,
+        counter: Optional[TokenCounter] = None,
+        token_budget: int = PROMPT_TOKEN_BUDGET,
+        history_budget: int = PROMPT_HISTORY_TOKEN_BUDGET,
+        history_summary_tokens: int = PROMPT_HISTORY_SUMMARY_TOKENS,
+        document_max_tokens: int = PROMPT_DOCUMENT_MAX_TOKENS,
+        image_tokens: int = PROMPT_IMAGE_TOKENS
+    ):
+        self.counter = counter or TokenCounter()
+        self.token_budget = token_budget
+        self.history_budget = history_budget
+        self.history_summary_tokens = history_summary_tokens
+        self.document_max_tokens = document_max_tokens
+        self.image_tokens = image_tokens
+
+    def build(
+        self,
+        instructions: str,
+        query: str,
+        context_documents: List[Dict[str, Any]],
+        chat_history: Optional[List[Any]] = None,
+        image_count: int = 0,
+        format_document: Optional[Callable[[int, Dict[str, Any], str], str]] = None,
+        empty_context: str = ""
+    ) -> Dict[str, Any]:
+        """
+        Returns {"system_prompt", "history", "token_breakdown"}, where history is
+        a list of {"role", "content"} messages to place between the system
+        prompt and the user's message.
+        """
+        format_document = format_document or self._format_document
+        count = self.counter.count
+
+        instruction_tokens = count(instructions) + MESSAGE_OVERHEAD_TOKENS
+        query_tokens = count(query) + MESSAGE_OVERHEAD_TOKENS + image_count * self.image_tokens
+        remaining = max(self.token_budget - instruction_tokens - query_tokens, 0)
+
+        history, history_tokens, history_summarized = self._fit_history(
+            chat_history or [], min(self.history_budget, remaining)
+        )
+        remaining -= history_tokens
+
+        context_parts, context_tokens, used, truncated = self._fit_documents(
+            context_documents, remaining, format_document
+        )
+        if not context_parts and empty_context:
+            context_parts = [empty_context]
+            context_tokens = count(empty_context)
+
+        return {
+            "system_prompt": instructions + "".join(context_parts),
+            "history": history,
+            "token_breakdown": {
+                "tokenizer": self.counter.backend,
+                "budget": self.token_budget,
+                "system": instruction_tokens,
+                "context": context_tokens,
+                "history": history_tokens,
+                "query": query_tokens,
+                "total": instruction_tokens + context_tokens + history_tokens + query_tokens,
+                "context_documents_used": used,
+                "context_documents_truncated": truncated,
+                "context_documents_dropped": len(context_documents) - used,
+                "history_messages_used": len(history) - (1 if history_summarized else 0),
+                "history_summarized": history_summarized
+            }
+        }
+
+    def _fit_history(self, chat_history: List[Any], budget: int) -> Tuple[List[Dict[str, str]], int, bool]:
+        """Keep the newest messages that fit; summarize the ones that do not"""
+        messages = []
+        for message in chat_history:
+            if hasattr(message, 'role') and hasattr(message, 'content'):
+                messages.append({"role": message.role, "content": message.content})
+            elif isinstance(message, dict) and 'role' in message and 'content' in message:
+                messages.append({"role": message['role'], "content": message['content']})
+
+        summary_budget = min(self.history_summary_tokens, budget)
+        kept: List[Dict[str, str]] = []
+        used = 0
+        cut = 0
+        for index in range(len(messages) - 1, -1, -1):
+            cost = self.counter.count(messages[index]["content"]) + MESSAGE_OVERHEAD_TOKENS
+            # Reserve room for a summary whenever older messages remain
+            reserve = summary_budget if index > 0 else 0
+            if used + cost + reserve > budget:
+                cut = index + 1
+                break
+            kept.insert(0, messages[index])
+            used += cost
+
+        if not cut:
+            return kept, used, False
+
+        summary = self._summarize(messages[:cut], summary_budget - MESSAGE_OVERHEAD_TOKENS)
+        if not summary:
+            return kept, used, False
+        summary_message = {"role": "system", "content": summary}
+        return [summary_message] + kept, used + self.counter.count(summary) + MESSAGE_OVERHEAD_TOKENS, True
+
+    def _summarize(self, messages: List[Dict[str, str]], max_tokens: int) -> str:
+        """Extractive summary: the first sentence of each older message, oldest first"""
+        if max_tokens <= 0:
+            return ""
+        summary = SUMMARY_HEADER + "\n".join(summary_line(message) for message in messages)
+        return self.counter.truncate(summary, max_tokens)
+
+    def _fit_documents(
+        self,
+        context_documents: List[Dict[str, Any]],
+        budget: int,
+        format_document: Callable[[int, Dict[str, Any], str], str]
+    ) -> Tuple[List[str], int, int, int]:
+        """Most similar documents first, each capped, until the budget runs out"""
+        ranked = sorted(context_documents, key=lambda doc: doc.get("similarity_score", 0), reverse=True)
+        parts = []
+        used = 0
+        truncated = 0
+        for doc in ranked:
+            number = len(parts) + 1
+            header_tokens = self.counter.count(format_document(number, doc, ""))
+            available = min(self.document_max_tokens, budget - used - header_tokens)
+            if available < MIN_DOCUMENT_TOKENS:
+                break
+            content = doc.get("content", "")
+            fitted = self.counter.truncate(content, available)
+            if len(fitted) < len(content):
+                truncated += 1
+            part = format_document(number, doc, fitted)
+            parts.append(part)
+            used += self.counter.count(part)
+        return parts, used, len(parts), truncated
+
+    @staticmethod
+    def _format_document(number: int, doc: Dict[str, Any], content: str) -> str:
+        title = doc.get("metadata", {}).get("title", f"Document {number}")
+        return f"\n--- Document {number}: {title} ---\n{content}\n"
@@ -2,88 +2,359 @@ from typing import List, Dict, Any, Optional
 from app.models.schemas import SearchResponse, SearchResult, Document
 from app.services.vector_store import VectorStoreService
 from app.services.web_search import WebSearchService
+from app.services.cache import TTLCache
+from app.services.reranker import CrossEncoderReranker
+from app.services.single_flight import SingleFlight
 from datetime import datetime
+import asyncio
+import json
+import os
+import time
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import (
+    SEARCH_CACHE_ENABLED,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_TTL_SECONDS,
+    SEARCH_CACHE_MAX_BYTES,
+    RAG_SPECULATIVE_WEB_FALLBACK,
+    RAG_LATENCY_BUDGET_MS,
+    SEARCH_DEFAULT_MODE,
+    RERANK_CANDIDATES,
+    SEARCH_SINGLE_FLIGHT_ENABLED
+)
+
+# Shared across RAGService instances (one is created per request)
+search_cache = TTLCache(
+    max_entries=SEARCH_CACHE_MAX_ENTRIES,
+    ttl_seconds=SEARCH_CACHE_TTL_SECONDS,
+    max_bytes=SEARCH_CACHE_MAX_BYTES
+)
+
+# Searches currently running, keyed like the cache
+search_flights = SingleFlight()
 
 class RAGService:
-    def __init__(self, vector_service: VectorStoreService, web_search_service: WebSearchService):
+    def __init__(
+        self,
+        vector_service: VectorStoreService,
+        web_search_service: WebSearchService,
+        reranker: Optional[CrossEncoderReranker] = None
+    ):
         self.vector_service = vector_service
         self.web_search_service = web_search_service
+        self.reranker = reranker
     
     async def search(
         self, 
         query: str, 
         limit: int = 5, 
         threshold: float = 0.3, 
-        use_web_fallback: bool = True
+        use_web_fallback: bool = True,
+        collapse_chunks: bool = True,
+        search_mode: Optional[str] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        rerank: Optional[bool] = None
     ) -> SearchResponse:
         """
-        Main RAG search method that combines vector search with web search fallback
+        Main RAG search method that combines vector search with web search fallback.
+        Responses are served from the shared search cache when possible, and
+        identical searches already in flight are joined rather than repeated.
+        With a reranker, rerank defaults to on.
+        """
+        search_mode = search_mode or SEARCH_DEFAULT_MODE
+        rerank = self._should_rerank(query, rerank)
+        if not query.strip():
+            # Filter-only listing: the web has nothing to add
+            use_web_fallback = False
+        cache_key = self._cache_key({
+            "query": query,
+            "limit": limit,
+            "threshold": threshold,
+            "use_web_fallback": use_web_fallback,
+            "collapse_chunks": collapse_chunks,
+            "search_mode": search_mode,
+            "filters": filters,
+            "rerank": rerank
+        })
+        generation = self.vector_service.generation
+        if SEARCH_CACHE_ENABLED:
+            # Any change to the stored documents invalidates every cached response
+            search_cache.sync_version(generation)
+            cached = search_cache.get(cache_key)
+            if cached is not None:
+                return cached.model_copy(update={"query": query}, deep=True)
+        
+        async def run_search() -> SearchResponse:
+            response = await self._search_uncached(
+                query, limit, threshold, use_web_fallback, collapse_chunks, search_mode, filters, rerank
+            )
+            # An ingest during the search may have made its results stale
+            if SEARCH_CACHE_ENABLED and not response.partial and self.vector_service.generation == generation:
+                search_cache.set(cache_key, response, size=len(response.model_dump_json()))
+            return response
+        
+        if SEARCH_SINGLE_FLIGHT_ENABLED:
+            # Identical concurrent searches share one execution
+            response, _ = await search_flights.do((generation, cache_key), run_search)
+        else:
+            response = await run_search()
+        return response.model_copy(update={"query": query}, deep=True)
+    
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        return " ".join(query.lower().split())
+    
+    def _should_rerank(self, query: str, rerank: Optional[bool]) -> bool:
+        return self.reranker is not None and rerank is not False and bool(query.strip())
+    
+    async def _rerank(
+        self,
+        query: str,
+        vector_results: List[Dict[str, Any]],
+        limit: int,
+        deadline: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Rerank over-fetched vector results down to the limit, within what is left of the deadline"""
+        budget_ms = None
+        if deadline is not None:
+            budget_ms = (deadline - asyncio.get_running_loop().time()) * 1000
+        results, _ = await self.reranker.rerank(query, vector_results, limit, budget_ms)
+        return results
+    
+    async def _search_uncached(
+        self,
+        query: str,
+        limit: int,
+        threshold: float,
+        use_web_fallback: bool,
+        collapse_chunks: bool,
+        search_mode: str,
+        filters: Optional[Dict[str, Any]] = None,
+        rerank: bool = False
+    ) -> SearchResponse:
         """
+        Vector search with web fallback under a total latency budget.
+        
+        In speculative mode the web lookup starts alongside the vector search
+        and is cancelled if the vector store alone satisfies the limit. Once the
+        budget is spent, whatever results exist are returned with partial=True.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + RAG_LATENCY_BUDGET_MS / 1000 if RAG_LATENCY_BUDGET_MS > 0 else None
+        partial = False
+        
+        # Reranking over-fetches candidates and keeps the best `limit` of them
+        fetch_limit = max(limit, RERANK_CANDIDATES) if rerank else limit
+        vector_task = asyncio.create_task(self.vector_service.search(
+            query, fetch_limit, threshold, collapse_chunks, search_mode, filters
+        ))
+        web_task = None
+        if use_web_fallback and RAG_SPECULATIVE_WEB_FALLBACK:
+            web_task = asyncio.create_task(self.web_search_service.search(query, limit))
+        
         try:
             # Step 1: Search vector store
-            vector_results = await self.vector_service.search(query, limit, threshold)
+            try:
+                vector_results = await self._await_within(vector_task, deadline)
+            except asyncio.TimeoutError:
+                vector_results = []
+                partial = True
+            if rerank:
+                vector_results = await self._rerank(query, vector_results, limit, deadline)
             
             # Step 2: Check if we have sufficient results
             if len(vector_results) >= limit or not use_web_fallback:
-                return SearchResponse(
-                    query=query,
-                    results=[self._format_search_result(result) for result in vector_results],
-                    total_found=len(vector_results),
-                    used_web_fallback=False,
-                    web_results=None
-                )
+                if web_task:
+                    web_task.cancel()
+                return self._combine_results(query, vector_results, None, partial)
             
             # Step 3: Use web search as fallback
-            web_results = await self.web_search_service.search(query, limit - len(vector_results))
+            if web_task is None:
+                web_task = asyncio.create_task(self.web_search_service.search(query, limit - len(vector_results)))
+            try:
+                web_results = await self._await_within(web_task, deadline)
+            except asyncio.TimeoutError:
+                web_results = []
+                partial = True
+            web_results = web_results[:limit - len(vector_results)]
             
             # Step 4: Combine results
-            all_results = vector_results.copy()
-            
-            # Add web results as additional context
-            for web_result in web_results:
-                web_document = Document(
-                    id=f"web_{len(all_results)}",
-                    content=web_result["content"],
-                    metadata={
-                        "title": web_result["title"],
-                        "source": web_result["source"],
-                        "url": web_result.get("url", ""),
-                        "type": "web_search"
-                    },
-                    source=web_result["source"],
-                    created_at=datetime.now().isoformat()
-                )
-                
-                all_results.append({
-                    "document": web_document,
-                    "similarity_score": 0.5,  # Default score for web results
-                    "source": "web_search"
-                })
-            
-            return SearchResponse(
-                query=query,
-                results=[self._format_search_result(result) for result in all_results],
-                total_found=len(all_results),
-                used_web_fallback=len(web_results) > 0,
-                web_results=web_results
-            )
+            return self._combine_results(query, vector_results, web_results, partial)
             
         except Exception as e:
             # Fallback to web search only if vector search fails
             if use_web_fallback:
                 try:
-                    web_results = await self.web_search_service.search(query, limit)
+                    if web_task is None or web_task.cancelled():
+                        web_task = asyncio.create_task(self.web_search_service.search(query, limit))
+                    try:
+                        web_results = await self._await_within(web_task, deadline)
+                    except asyncio.TimeoutError:
+                        web_results = []
+                        partial = True
                     return SearchResponse(
                         query=query,
                         results=[self._format_web_result(result) for result in web_results],
                         total_found=len(web_results),
                         used_web_fallback=True,
-                        web_results=web_results
+                        web_results=web_results,
+                        partial=partial
                     )
                 except Exception as web_error:
                     raise Exception(f"Both vector search and web search failed: {str(e)}, {str(web_error)}")
             else:
                 raise Exception(f"Vector search failed: {str(e)}")
+        finally:
+            for task in (vector_task, web_task):
+                if task and not task.done():
+                    task.cancel()
+    
+    async def search_batch(self, searches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Run many searches in one pass, returning for each (in order) a dict with
+        "response", "elapsed_ms" (from batch start until that search finished),
+        "cached" and "error".
+        
+        Cache misses share one embedding batch and multi-query vector store
+        calls; web fallbacks for searches short of their limit run concurrently.
+        Meant for offline workloads, so no latency budget is applied.
+        """
+        started = time.perf_counter()
+        elapsed_ms = lambda: round((time.perf_counter() - started) * 1000, 2)
+        searches = list(searches)
+        outcomes: List[Optional[Dict[str, Any]]] = [None] * len(searches)
+        
+        generation = self.vector_service.generation
+        if SEARCH_CACHE_ENABLED:
+            search_cache.sync_version(generation)
+        cache_keys, misses = {}, []
+        for i, search in enumerate(searches):
+            search = {
+                **search,
+                "search_mode": search.get("search_mode") or SEARCH_DEFAULT_MODE,
+                "rerank": self._should_rerank(search["query"], search.get("rerank"))
+            }
+            if not search["query"].strip():
+                search["use_web_fallback"] = False
+            searches[i] = search
+            if SEARCH_CACHE_ENABLED:
+                cache_keys[i] = self._cache_key(search)
+                cached = search_cache.get(cache_keys[i])
+                if cached is not None:
+                    outcomes[i] = {
+                        "response": cached.model_copy(update={"query": search["query"]}, deep=True),
+                        "elapsed_ms": elapsed_ms(),
+                        "cached": True,
+                        "error": None
+                    }
+                    continue
+            misses.append(i)
+        
+        if not misses:
+            return outcomes
+        
+        try:
+            vector_results = await self.vector_service.search_batch([
+                {
+                    **{key: searches[i][key] for key in (
+                        "query", "threshold", "collapse_chunks", "search_mode", "filters"
+                    )},
+                    "limit": max(searches[i]["limit"], RERANK_CANDIDATES) if searches[i]["rerank"] else searches[i]["limit"]
+                }
+                for i in misses
+            ])
+        except Exception as e:
+            for i in misses:
+                outcomes[i] = {"response": None, "elapsed_ms": elapsed_ms(), "cached": False, "error": str(e)}
+            return outcomes
+        
+        async def finish(i: int, results: List[Dict[str, Any]]):
+            search = searches[i]
+            limit = search["limit"]
+            try:
+                if search["rerank"]:
+                    results = await self._rerank(search["query"], results, limit)
+                if len(results) >= limit or not search["use_web_fallback"]:
+                    response = self._combine_results(search["query"], results, None, False)
+                else:
+                    web_results = await self.web_search_service.search(search["query"], limit - len(results))
+                    response = self._combine_results(
+                        search["query"], results, web_results[:limit - len(results)], False
+                    )
+                if SEARCH_CACHE_ENABLED and self.vector_service.generation == generation:
+                    search_cache.set(cache_keys[i], response, size=len(response.model_dump_json()))
+                    response = response.model_copy(deep=True)
+                outcomes[i] = {"response": response, "elapsed_ms": elapsed_ms(), "cached": False, "error": None}
+            except Exception as e:
+                outcomes[i] = {"response": None, "elapsed_ms": elapsed_ms(), "cached": False, "error": str(e)}
+        
+        await asyncio.gather(*(finish(i, results) for i, results in zip(misses, vector_results)))
+        return outcomes
+    
+    def _cache_key(self, search: Dict[str, Any]) -> tuple:
+        filters = search.get("filters")
+        return (
+            self._normalize_query(search["query"]),
+            search["limit"],
+            search["threshold"],
+            search["use_web_fallback"],
+            search["collapse_chunks"],
+            search["search_mode"],
+            json.dumps(filters, sort_keys=True, default=str) if filters else None,
+            search.get("rerank", False)
+        )
+    
+    def _combine_results(
+        self,
+        query: str,
+        vector_results: List[Dict[str, Any]],
+        web_results: Optional[List[Dict[str, Any]]],
+        partial: bool
+    ) -> SearchResponse:
+        """Build a response from vector results plus web results (None when the web was not consulted)"""
+        all_results = vector_results.copy()
+        
+        # Add web results as additional context
+        for web_result in web_results or []:
+            web_document = Document(
+                id=f"web_{len(all_results)}",
+                content=web_result["content"],
+                metadata={
+                    "title": web_result["title"],
+                    "source": web_result["source"],
+                    "url": web_result.get("url", ""),
+                    "type": "web_search"
+                },
+                source=web_result["source"],
+                created_at=datetime.now().isoformat()
+            )
+            
+            all_results.append({
+                "document": web_document,
+                "similarity_score": 0.5,  # Default score for web results
+                "source": "web_search"
+            })
+        
+        return SearchResponse(
+            query=query,
+            results=[self._format_search_result(result) for result in all_results],
+            total_found=len(all_results),
+            used_web_fallback=bool(web_results),
+            web_results=web_results,
+            partial=partial
+        )
+    
+    @staticmethod
+    async def _await_within(task: asyncio.Task, deadline: Optional[float]) -> Any:
+        """Await a task until the deadline, cancelling it and raising TimeoutError past it"""
+        if deadline is None:
+            return await task
+        remaining = deadline - asyncio.get_running_loop().time()
+        if remaining <= 0:
+            task.cancel()
+            raise asyncio.TimeoutError()
+        return await asyncio.wait_for(task, remaining)
     
     def _format_search_result(self, result: Dict[str, Any]) -> SearchResult:
         """Format a search result from vector store"""
@@ -0,0 +1,122 @@
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import time
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import (
+    RERANK_MODEL_NAME,
+    RERANK_BATCH_SIZE,
+    RERANK_BUDGET_MS,
+    RERANK_MIN_SCORE
+)
+from app.services.executor import BlockingExecutor, QUERY_LANE
+
+class CrossEncoderReranker:
+    """
+    Re-scores retrieved candidates with a small cross-encoder and keeps the best.
+
+    Scoring runs batched on the executor's query lane. If it does not finish
+    within the time budget the candidates are returned in their original
+    order, so reranking can only ever cost budget_ms of extra latency.
+    """
+
+    def __init__(
+        self,
+        model_name: str = RERANK_MODEL_NAME,
+        batch_size: int = RERANK_BATCH_SIZE,
+        budget_ms: float = RERANK_BUDGET_MS,
+        min_score: Optional[float] = RERANK_MIN_SCORE,
+        executor: Optional[BlockingExecutor] = None
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.min_score = min_score
+        self.executor = executor
+        self.model = None
+
+        # Metrics
+        self.reranked = 0
+        self.over_budget = 0
+        self.failed = 0
+        self.candidates_scored = 0
+        self.results_dropped = 0
+        self.total_ms = 0.0
+
+    def load(self):
+        """Load the cross-encoder model"""
+        if self.model is None:
+            from sentence_transformers import CrossEncoder
+            self.model = CrossEncoder(self.model_name)
+
+    def score(self, query: str, contents: List[str]) -> List[float]:
+        scores = self.model.predict(
+            [(query, content) for content in contents],
+            batch_size=self.batch_size,
+            show_progress_bar=False
+        )
+        return [float(score) for score in scores]
+
+    async def rerank(
+        self,
+        query: str,
+        results: List[Dict[str, Any]],
+        top_k: int,
+        budget_ms: Optional[float] = None
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Reorder search results by cross-encoder score and keep the top_k.
+        Returns (results, reranked); reranked is False when the budget ran out
+        or scoring failed, in which case the first top_k results are returned.
+        """
+        if self.model is None or len(results) <= 1:
+            return results[:top_k], False
+
+        budget_ms = self.budget_ms if budget_ms is None else min(budget_ms, self.budget_ms)
+        contents = [result["document"]["content"] for result in results]
+        started_at = time.perf_counter()
+        try:
+            if self.executor is None:
+                scores = self.score(query, contents)
+            else:
+                # The worker thread finishes on its own if the budget runs out
+                scores = await asyncio.wait_for(
+                    self.executor.run(QUERY_LANE, self.score, query, contents),
+                    max(budget_ms, 0) / 1000
+                )
+        except asyncio.TimeoutError:
+            self.over_budget += 1
+            return results[:top_k], False
+        except Exception as e:
+            self.failed += 1
+            print(f"Error reranking results: {e}")
+            return results[:top_k], False
+        finally:
+            self.total_ms += (time.perf_counter() - started_at) * 1000
+
+        ranked = sorted(zip(scores, range(len(results))), key=lambda pair: pair[0], reverse=True)
+        reranked = []
+        for score, index in ranked:
+            if self.min_score is not None and score < self.min_score:
+                self.results_dropped += 1
+                continue
+            result = results[index]
+            result["document"]["metadata"]["rerank_score"] = score
+            reranked.append(result)
+
+        self.reranked += 1
+        self.candidates_scored += len(results)
+        return reranked[:top_k], True
+
+    def get_stats(self) -> Dict[str, Any]:
+        attempts = self.reranked + self.over_budget + self.failed
+        return {
+            "model": self.model_name,
+            "reranked": self.reranked,
+            "over_budget": self.over_budget,
+            "failed": self.failed,
+            "average_candidates": self.candidates_scored / self.reranked if self.reranked else 0,
+            "results_dropped": self.results_dropped,
+            "average_ms": self.total_ms / attempts if attempts else 0
+        }
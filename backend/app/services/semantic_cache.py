@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import re
+import time
+import numpy as np
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import (
+    SEMANTIC_CACHE_SIMILARITY_THRESHOLD,
+    SEMANTIC_CACHE_MAX_ENTRIES,
+    SEMANTIC_CACHE_TTL_SECONDS
+)
+from app.services.embedding_service import EmbeddingService
+
+REPLAY_CHUNK = re.compile(r'\S+\s*|\s+')
+
+class SemanticAnswerCache:
+    """
+    Caches chat answers by query embedding.
+
+    A cached answer is reused when a new query's embedding has a cosine
+    similarity of at least similarity_threshold to a previously answered query
+    and the retrieved context documents are exactly the same set.
+    """
+
+    def __init__(
+        self,
+        embedding_service: EmbeddingService,
+        similarity_threshold: float = SEMANTIC_CACHE_SIMILARITY_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS
+    ):
+        self.embedding_service = embedding_service
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max(max_entries, 1)
+        self.ttl_seconds = ttl_seconds
+        # entry id -> (context key, normalized embedding, query, answer, expires at)
+        self._entries: "OrderedDict[int, Tuple[str, np.ndarray, str, str, float]]" = OrderedDict()
+        self._by_context: Dict[str, List[int]] = {}
+        self._next_id = 0
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+
+    async def embed(self, query: str) -> np.ndarray:
+        embedding = await self.embedding_service.encode_query(query)
+        return np.asarray(embedding, dtype=np.float32)
+
+    @staticmethod
+    def context_key(context_documents: List[Dict[str, Any]]) -> str:
+        """Order-independent fingerprint of the context documents' content"""
+        digests = sorted(
+            hashlib.sha256(doc.get("content", "").encode("utf-8")).hexdigest()
+            for doc in context_documents
+        )
+        return hashlib.sha256("".join(digests).encode("utf-8")).hexdigest()
+
+    def lookup(self, embedding: np.ndarray, context_documents: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Find the most similar cached answer for the same context, if close enough"""
+        now = time.monotonic()
+        best = None
+        best_similarity = self.similarity_threshold
+
+        for entry_id in list(self._by_context.get(self.context_key(context_documents), [])):
+            _, cached_embedding, cached_query, answer, expires_at = self._entries[entry_id]
+            if expires_at <= now:
+                self._remove(entry_id)
+                continue
+            # Embeddings are normalized, so the dot product is the cosine similarity
+            similarity = float(np.dot(embedding, cached_embedding))
+            if similarity >= best_similarity:
+                best_similarity = similarity
+                best = (entry_id, cached_query, answer)
+
+        if best is None:
+            self.misses += 1
+            return None
+
+        entry_id, cached_query, answer = best
+        self._entries.move_to_end(entry_id)
+        self.hits += 1
+        return {"answer": answer, "cached_query": cached_query, "similarity": best_similarity}
+
+    def store(self, query: str, embedding: np.ndarray, context_documents: List[Dict[str, Any]], answer: str):
+        if not answer:
+            return
+
+        context_key = self.context_key(context_documents)
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (context_key, embedding, query, answer, time.monotonic() + self.ttl_seconds)
+        self._by_context.setdefault(context_key, []).append(entry_id)
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, entry_id: int):
+        context_key = self._entries.pop(entry_id)[0]
+        ids = self._by_context[context_key]
+        ids.remove(entry_id)
+        if not ids:
+            del self._by_context[context_key]
+
+    @staticmethod
+    def replay_chunks(answer: str) -> List[str]:
+        """Split a cached answer into word-sized chunks to replay as a token stream"""
+        return REPLAY_CHUNK.findall(answer)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0
+        }
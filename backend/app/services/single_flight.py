@@ -0,0 +1,147 @@
+from typing import Any, AsyncGenerator, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+import asyncio
+
+class SingleFlight:
+    """
+    Runs at most one call per key at a time; concurrent callers with the same
+    key wait for and share its result (or exception).
+
+    The call runs as its own task, so a caller that is cancelled (e.g. a
+    client disconnecting) does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+        # Metrics
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Returns (result, shared); shared is True when another caller's call was joined"""
+        call = self._calls.get(key)
+        shared = call is not None
+        if shared:
+            self.shared += 1
+        else:
+            self.executions += 1
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(lambda _: self._forget(key, call))
+        return await asyncio.shield(call), shared
+
+    def _forget(self, key: Hashable, call: asyncio.Future):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.cancelled():
+            # Mark the exception retrieved so unjoined failures are not logged twice
+            call.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        calls = self.executions + self.shared
+        return {
+            "in_flight": len(self._calls),
+            "executions": self.executions,
+            "shared": self.shared,
+            "shared_rate": self.shared / calls if calls else 0
+        }
+
+
+class SharedStream:
+    """
+    One source stream read by a single task and replayed to any number of
+    subscribers. Chunks are kept until the stream ends, so a subscriber that
+    joins late still receives the stream from its first chunk.
+    """
+
+    def __init__(self, source: AsyncIterator[Any], on_finish: Callable[["SharedStream"], None]):
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self._on_finish = on_finish
+        self._reader = asyncio.ensure_future(self._read(source))
+
+    async def _read(self, source: AsyncIterator[Any]):
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._notify()
+        except asyncio.CancelledError:
+            self.error = RuntimeError("Shared stream stopped: every subscriber left")
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._notify()
+            self._on_finish(self)
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def subscribe(self) -> AsyncGenerator[Any, None]:
+        # Counted now rather than on first read, so the source is not stopped
+        # between joining and starting to read
+        self.subscribers += 1
+        return self._replay()
+
+    async def _replay(self) -> AsyncGenerator[Any, None]:
+        index = 0
+        try:
+            while True:
+                changed = self._changed
+                if index < len(self.chunks):
+                    yield self.chunks[index]
+                    index += 1
+                elif self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                else:
+                    await changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                # Nobody is listening any more: stop reading the source
+                self._on_finish(self)
+                self._reader.cancel()
+
+
+class StreamFanout:
+    """
+    Shares one in-flight stream between identical requests: the first
+    subscriber for a key starts the source, later ones join it while it is
+    still running.
+    """
+
+    def __init__(self):
+        self._streams: Dict[Hashable, SharedStream] = {}
+
+        # Metrics
+        self.streams_started = 0
+        self.subscribers_joined = 0
+
+    def subscribe(self, key: Hashable, open_stream: Callable[[], AsyncIterator[Any]]) -> Tuple[AsyncGenerator[Any, None], bool]:
+        """Returns (chunks, shared); shared is True when an in-flight stream was joined"""
+        stream = self._streams.get(key)
+        shared = stream is not None
+        if shared:
+            self.subscribers_joined += 1
+        else:
+            self.streams_started += 1
+            stream = SharedStream(open_stream(), lambda finished: self._forget(key, finished))
+            self._streams[key] = stream
+        return stream.subscribe(), shared
+
+    def _forget(self, key: Hashable, stream: SharedStream):
+        if self._streams.get(key) is stream:
+            del self._streams[key]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._streams),
+            "streams_started": self.streams_started,
+            "subscribers_joined": self.subscribers_joined
+        }
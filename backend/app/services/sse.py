@@ -0,0 +1,124 @@
+from typing import Any, AsyncGenerator, AsyncIterable, Dict
+import asyncio
+import json
+import time
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import CHAT_STREAM_FLUSH_CHARS, CHAT_STREAM_FLUSH_MS
+from app.services.single_flight import StreamFanout
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def dumps(value: Any) -> str:
+    """JSON-encode a value, with orjson when it is installed"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode("utf-8")
+        except TypeError:
+            # Types orjson does not handle (e.g. numpy scalars) go through json
+            pass
+    return json.dumps(value, default=str)
+
+def event_frame(event_type: str, data: Any) -> str:
+    """One server-sent event frame"""
+    return f"data: {dumps({'type': event_type, 'data': data})}\n\n"
+
+async def coalesce(
+    chunks: AsyncIterable[str],
+    max_chars: int = CHAT_STREAM_FLUSH_CHARS,
+    max_delay_ms: float = CHAT_STREAM_FLUSH_MS
+) -> AsyncGenerator[str, None]:
+    """
+    Merge small text chunks (LLM tokens) into larger ones.
+
+    Buffered text is flushed once it reaches max_chars or when max_delay_ms
+    have passed since its first chunk arrived, whichever comes first, so
+    coalescing never holds text back for longer than max_delay_ms even if the
+    source stalls. max_delay_ms <= 0 passes chunks through unchanged.
+    """
+    if max_delay_ms <= 0:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    # The source is read by a separate task so waiting for the next chunk can
+    # time out without cancelling the source iterator
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+
+    async def pump():
+        try:
+            async for chunk in chunks:
+                await queue.put(chunk)
+            await queue.put(done)
+        except Exception as e:
+            await queue.put(e)
+
+    reader = asyncio.create_task(pump())
+    buffer = []
+    buffered = 0
+    deadline = None
+    try:
+        while True:
+            timeout = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield "".join(buffer)
+                buffer, buffered, deadline = [], 0, None
+                continue
+
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            if not item:
+                continue
+            if deadline is None:
+                deadline = time.perf_counter() + max_delay_ms / 1000
+            buffer.append(item)
+            buffered += len(item)
+            if buffered >= max_chars:
+                yield "".join(buffer)
+                buffer, buffered, deadline = [], 0, None
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        if not reader.done():
+            reader.cancel()
+
+class StreamStats:
+    """Frames and bytes sent per streamed chat response"""
+
+    def __init__(self):
+        self.responses = 0
+        self.content_frames = 0
+        self.content_chunks = 0
+        self.bytes_sent = 0
+
+    def record(self, content_frames: int, content_chunks: int, bytes_sent: int):
+        self.responses += 1
+        self.content_frames += content_frames
+        self.content_chunks += content_chunks
+        self.bytes_sent += bytes_sent
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "encoder": "orjson" if orjson is not None else "json",
+            "flush_chars": CHAT_STREAM_FLUSH_CHARS,
+            "flush_ms": CHAT_STREAM_FLUSH_MS,
+            "responses": self.responses,
+            "average_content_frames": self.content_frames / self.responses if self.responses else 0,
+            "average_chunks_per_frame": self.content_chunks / self.content_frames if self.content_frames else 0,
+            "average_bytes": self.bytes_sent / self.responses if self.responses else 0
+        }
+
+stream_stats = StreamStats()
+
+# LLM answer streams currently being generated, shared by identical chat requests
+chat_stream_fanout = StreamFanout()
@@ -1,73 +1,218 @@
 import chromadb
 from chromadb.config import Settings
-from sentence_transformers import SentenceTransformer
-import uuid
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import asyncio
+import hashlib
 import json
 import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import (
+    CHROMA_PERSISTENT,
+    CHROMA_PERSIST_DIRECTORY,
+    CHUNK_SEARCH_OVERFETCH,
+    LEXICAL_INDEX_ENABLED,
+    BM25_K1,
+    BM25_B,
+    HYBRID_RRF_K,
+    LEXICAL_FAST_PATH_MAX_TERMS
+)
+from app.services.embedding_service import EmbeddingService
+from app.services.chunking import DocumentChunker, reassemble
+from app.services.lexical_index import LexicalIndex, tokenize
+from app.services.metadata_index import MetadataIndex, build_where, matches, timestamp_of
+from app.services.executor import BlockingExecutor, QUERY_LANE, INGEST_LANE
+
+# Per-vector metadata describing where a chunk sits in its parent document
+CHUNK_FIELDS = ("chunk_index", "chunk_count", "chunk_start", "chunk_end")
+
+SEARCH_MODES = ("vector", "hybrid", "lexical")
+
+# Page size when reading the whole collection back (index rebuilds)
+SCAN_PAGE_SIZE = 1000
+
+# Bump when the stored metadata layout changes so the seed corpus is re-ingested
+# (2: numeric created_at_ts for date range filters)
+METADATA_VERSION = 2
 
 class VectorStoreService:
     def __init__(self):
         self.client = None
         self.collection = None
-        self.embedding_model = None
+        self.executor = BlockingExecutor()
+        self.embedding_service = EmbeddingService(executor=self.executor)
+        self.chunker = DocumentChunker(count_tokens=self.embedding_service.count_tokens)
         self.collection_name = "healthcare_docs"
+        self.persistent = CHROMA_PERSISTENT
+        self.persist_directory = CHROMA_PERSIST_DIRECTORY
+        self.startup_report: Dict[str, Any] = {}
+        # Bumped whenever stored documents change, so caches can invalidate
+        self.generation = 0
+        # BM25 index over the default collection, kept in step by add_documents
+        self.lexical_index = LexicalIndex(BM25_K1, BM25_B) if LEXICAL_INDEX_ENABLED else None
+        self.lexical_fast_path_searches = 0
+        # Document-level metadata for filter-only queries
+        self.metadata_index = MetadataIndex()
+        # Per-collection locks serializing add_documents
+        self._ingest_locks: Dict[str, asyncio.Lock] = {}
         
     async def initialize(self):
         """Initialize ChromaDB client and embedding model"""
         try:
+            started = time.perf_counter()
+            
             # Initialize ChromaDB client
-            self.client = chromadb.Client(Settings(
-                persist_directory="./data/chroma_db",
-                anonymized_telemetry=False
-            ))
+            settings = Settings(anonymized_telemetry=False)
+            if self.persistent:
+                os.makedirs(self.persist_directory, exist_ok=True)
+                self.client = chromadb.PersistentClient(path=self.persist_directory, settings=settings)
+            else:
+                self.client = chromadb.Client(settings)
+            client_ready = time.perf_counter()
             
-            # Initialize embedding model
-            self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+            # Initialize embedding model (the only one loaded; Chroma's default
+            # embedding function is disabled and embeddings are always passed in)
+            self.embedding_service.load()
+            model_ready = time.perf_counter()
             
             # Create or get collection
             try:
-                self.collection = self.client.get_collection(name=self.collection_name)
+                self.collection = self.client.get_collection(
+                    name=self.collection_name,
+                    embedding_function=None
+                )
                 print(f"Loaded existing collection: {self.collection_name}")
             except:
                 self.collection = self.client.create_collection(
                     name=self.collection_name,
-                    metadata={"description": "Healthcare documents collection"}
+                    metadata={"description": "Healthcare documents collection"},
+                    embedding_function=None
                 )
                 print(f"Created new collection: {self.collection_name}")
             
-            # Load initial healthcare data if collection is empty
-            await self._load_initial_data()
+            # Load initial healthcare data unless the persisted seed is current
+            seed_action = await self._load_initial_data()
+            seed_ready = time.perf_counter()
+            
+            # Build the in-memory indexes from what the collection now holds
+            await self._rebuild_indexes()
+            finished = time.perf_counter()
+            
+            self.startup_report = {
+                "persistent": self.persistent,
+                "persist_directory": self.persist_directory if self.persistent else None,
+                "seed_action": seed_action,
+                "client_init_ms": round((client_ready - started) * 1000, 1),
+                "model_load_ms": round((model_ready - client_ready) * 1000, 1),
+                "seed_load_ms": round((seed_ready - model_ready) * 1000, 1),
+                "index_build_ms": round((finished - seed_ready) * 1000, 1),
+                "total_ms": round((finished - started) * 1000, 1)
+            }
+            print(
+                f"Vector store ready in {self.startup_report['total_ms']:.0f}ms "
+                f"(seed: {seed_action}, model load: {self.startup_report['model_load_ms']:.0f}ms, "
+                f"seed load: {self.startup_report['seed_load_ms']:.0f}ms)"
+            )
             
         except Exception as e:
             print(f"Error initializing vector store: {e}")
             raise
     
-    async def _load_initial_data(self):
-        """Load initial healthcare documents if collection is empty"""
+    async def _load_initial_data(self) -> str:
+        """
+        Load the seed healthcare documents unless the collection already holds
+        the current seed corpus. Returns the action taken.
+        """
         try:
-            count = self.collection.count()
-            if count == 0:
-                print("Loading initial healthcare documents...")
-                await self._load_healthcare_datasets()
+            healthcare_docs, origin = self._read_seed_documents()
+            fingerprint = self._seed_fingerprint(healthcare_docs)
+            stored_fingerprint = (self.collection.metadata or {}).get("seed_fingerprint")
+            count = await self.executor.run(QUERY_LANE, self.collection.count)
+            
+            if count > 0 and stored_fingerprint == fingerprint:
+                print("Seed corpus unchanged, skipping re-embedding")
+                return "skipped"
+            
+            if count > 0 and stored_fingerprint is None:
+                # Store created before fingerprinting: keep it and start tracking
+                await self._store_seed_fingerprint(fingerprint)
+                return "adopted"
+            
+            action = "loaded"
+            if count > 0:
+                print("Seed corpus changed, replacing seed documents...")
+                await self.executor.run(INGEST_LANE, self.collection.delete, where={"seed": True})
+                action = "reloaded"
+            
+            print("Loading initial healthcare documents...")
+            seed_docs = [
+                {**doc, "metadata": {**doc.get("metadata", {}), "seed": True}}
+                for doc in healthcare_docs
+            ]
+            await self.add_documents(seed_docs)
+            await self._store_seed_fingerprint(fingerprint)
+            print(f"Loaded {len(healthcare_docs)} healthcare documents from {origin}")
+            return action
         except Exception as e:
             print(f"Error loading initial data: {e}")
+            return "error"
+    
+    async def _rebuild_indexes(self):
+        """Rebuild the lexical and metadata indexes from every vector in the collection"""
+        try:
+            lexical_index = LexicalIndex(BM25_K1, BM25_B) if self.lexical_index is not None else None
+            metadata_index = MetadataIndex()
+            offset = 0
+            while True:
+                page = await self.executor.run(
+                    INGEST_LANE,
+                    self.collection.get,
+                    include=["documents", "metadatas"] if lexical_index is not None else ["metadatas"],
+                    limit=SCAN_PAGE_SIZE,
+                    offset=offset
+                )
+                if not page["ids"]:
+                    break
+                await self.executor.run(INGEST_LANE, self._index_page, page, lexical_index, metadata_index)
+                offset += len(page["ids"])
+            self.lexical_index = lexical_index
+            self.metadata_index = metadata_index
+            print(f"Indexes built over {offset} vectors ({len(metadata_index)} documents)")
+        except Exception as e:
+            print(f"Error building indexes: {e}")
+    
+    @staticmethod
+    def _index_page(page: Dict[str, Any], lexical_index: Optional[LexicalIndex], metadata_index: MetadataIndex):
+        if lexical_index is not None:
+            lexical_index.add(page["ids"], page["documents"], page["metadatas"])
+        for metadata in page["metadatas"]:
+            # One entry per parent document, taken from its first chunk
+            if metadata.get("chunk_index", 0) == 0 and "doc_id" in metadata:
+                metadata_index.add(metadata["doc_id"], metadata)
     
-    async def _load_healthcare_datasets(self):
-        """Load healthcare datasets from various sources"""
+    def _seed_fingerprint(self, healthcare_docs: List[Dict[str, Any]]) -> str:
+        """Fingerprint of the seed corpus and the model and chunking used to embed it"""
+        digest = hashlib.sha256()
+        digest.update(self.embedding_service.model_name.encode("utf-8"))
+        digest.update(f"{self.chunker.max_tokens}:{self.chunker.overlap_tokens}".encode("utf-8"))
+        digest.update(f"metadata-v{METADATA_VERSION}".encode("utf-8"))
+        digest.update(json.dumps(healthcare_docs, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+    
+    async def _store_seed_fingerprint(self, fingerprint: str):
+        metadata = {**(self.collection.metadata or {}), "seed_fingerprint": fingerprint}
+        await self.executor.run(INGEST_LANE, self.collection.modify, metadata=metadata)
+    
+    def _read_seed_documents(self) -> Tuple[List[Dict[str, Any]], str]:
+        """Read healthcare datasets from various sources"""
         # Try to load from JSON file first
         try:
-            import json
-            import os
             json_path = os.path.join(os.path.dirname(__file__), "..", "..", "data", "healthcare_documents.json")
             if os.path.exists(json_path):
                 with open(json_path, 'r') as f:
-                    healthcare_docs = json.load(f)
-                    await self.add_documents(healthcare_docs)
-                    print(f"Loaded {len(healthcare_docs)} healthcare documents from JSON file")
-                    return
+                    return json.load(f), "JSON file"
         except Exception as e:
             print(f"Error loading from JSON file: {e}")
         
@@ -147,104 +292,516 @@ class VectorStoreService:
             }
         ]
         
-        await self.add_documents(healthcare_docs)
-        print(f"Loaded {len(healthcare_docs)} initial healthcare documents")
+        return healthcare_docs, "built-in defaults"
     
-    async def add_documents(self, documents: List[Dict[str, Any]], collection_name: Optional[str] = None) -> int:
-        """Add documents to the vector store"""
+    async def add_documents(self, documents: List[Dict[str, Any]], collection_name: Optional[str] = None) -> Dict[str, int]:
+        """
+        Idempotently upsert documents into the vector store.
+        
+        Document IDs are derived from a hash of the content (unless the document
+        carries its own "id"), so re-ingesting the same payload does not create
+        duplicates. Unchanged documents are skipped and metadata-only changes are
+        applied without re-embedding. Returns inserted/updated/skipped counts.
+        
+        Long documents are split into overlapping chunks, each stored as its own
+        vector that references the parent document through "doc_id".
+        """
         try:
-            if collection_name:
-                try:
-                    collection = self.client.get_collection(name=collection_name)
-                except:
-                    collection = self.client.create_collection(name=collection_name)
-            else:
+            # Only the default collection is covered by the in-memory indexes. It
+            # may also be named explicitly (IngestRequest.collection_name defaults
+            # to it), and get_or_create_collection would return a new handle
+            is_default = not collection_name or collection_name == self.collection_name
+            if is_default:
                 collection = self.collection
+            else:
+                collection = await self.executor.run(
+                    INGEST_LANE,
+                    self.client.get_or_create_collection,
+                    name=collection_name,
+                    embedding_function=None
+                )
+            lexical_index = self.lexical_index if is_default else None
             
-            # Prepare documents for ingestion
-            ids = []
-            contents = []
-            metadatas = []
-            
+            # Prepare documents for ingestion (later duplicates in the payload win)
+            prepared: Dict[str, Tuple[str, Dict[str, Any]]] = {}
             for doc in documents:
-                doc_id = str(uuid.uuid4())
-                ids.append(doc_id)
-                contents.append(doc["content"])
+                content = doc["content"]
+                content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+                doc_id = str(doc.get("id") or f"doc_{content_hash[:32]}")
                 
-                metadata = doc.get("metadata", {})
-                metadata["created_at"] = datetime.now().isoformat()
+                metadata = dict(doc.get("metadata", {}))
                 metadata["doc_id"] = doc_id
+                metadata["content_hash"] = content_hash
                 
                 # Convert list values to strings for ChromaDB compatibility
                 for key, value in metadata.items():
                     if isinstance(value, list):
                         metadata[key] = ", ".join(str(item) for item in value)
                 
-                metadatas.append(metadata)
+                prepared[doc_id] = (content, metadata)
             
-            # Add to collection
-            collection.add(
-                ids=ids,
-                documents=contents,
-                metadatas=metadatas
-            )
+            counts = {"inserted": 0, "updated": 0, "skipped": len(documents) - len(prepared)}
+            if not prepared:
+                return counts
+            
+            # Ingests into one collection run one at a time: each computes stale
+            # chunks from what is stored, so interleaved upserts of a document
+            # would leave the loser's chunks behind
+            async with self._ingest_lock(collection_name or self.collection_name):
+                # Existing vectors (all chunks) for these documents, grouped by parent
+                existing = await self.executor.run(
+                    INGEST_LANE,
+                    collection.get,
+                    where={"doc_id": {"$in": list(prepared.keys())}},
+                    include=["metadatas"]
+                )
+                existing_vectors: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+                for vector_id, vector_metadata in zip(existing["ids"], existing["metadatas"]):
+                    existing_vectors.setdefault(vector_metadata["doc_id"], []).append((vector_id, vector_metadata))
             
-            return len(documents)
+                now = datetime.now().isoformat()
+                to_embed: List[Tuple[str, str, Dict[str, Any]]] = []
+                stale_vector_ids: List[str] = []
+                metadata_ids, metadata_updates = [], []
+            
+                for doc_id, (content, metadata) in prepared.items():
+                    previous = existing_vectors.get(doc_id)
+                    if not previous:
+                        metadata["created_at"] = now
+                        metadata["created_at_ts"] = timestamp_of(now)
+                        to_embed.append((doc_id, content, metadata))
+                        counts["inserted"] += 1
+                        continue
+                
+                    previous_metadata = previous[0][1]
+                    metadata["created_at"] = previous_metadata.get("created_at", now)
+                    metadata["created_at_ts"] = timestamp_of(metadata["created_at"])
+                    metadata_changed = self._comparable_metadata(previous_metadata) != self._comparable_metadata(metadata)
+                    if previous_metadata.get("content_hash") != metadata["content_hash"]:
+                        # Content changed: the old chunks are replaced wholesale
+                        metadata["updated_at"] = now
+                        stale_vector_ids.extend(vector_id for vector_id, _ in previous)
+                        to_embed.append((doc_id, content, metadata))
+                        counts["updated"] += 1
+                    elif metadata_changed or "created_at_ts" not in previous_metadata:
+                        if metadata_changed:
+                            metadata["updated_at"] = now
+                            counts["updated"] += 1
+                        else:
+                            # Stored before created_at_ts existed: backfill it, nothing else changed
+                            if "updated_at" in previous_metadata:
+                                metadata["updated_at"] = previous_metadata["updated_at"]
+                            counts["skipped"] += 1
+                        for vector_id, vector_metadata in previous:
+                            chunk_fields = {k: vector_metadata[k] for k in CHUNK_FIELDS if k in vector_metadata}
+                            metadata_ids.append(vector_id)
+                            metadata_updates.append({**metadata, **chunk_fields})
+                    else:
+                        counts["skipped"] += 1
+            
+                if to_embed:
+                    ids, contents, metadatas = await self.executor.run(INGEST_LANE, self._chunk_documents, to_embed)
+                
+                    # Embed in batches with the shared model, only for new or changed content
+                    embeddings = await self.embedding_service.encode_documents(contents)
+                    if stale_vector_ids:
+                        await self.executor.run(INGEST_LANE, collection.delete, ids=stale_vector_ids)
+                    await self.executor.run(
+                        INGEST_LANE,
+                        collection.upsert,
+                        ids=ids,
+                        embeddings=embeddings,
+                        documents=contents,
+                        metadatas=metadatas
+                    )
+                    if lexical_index is not None:
+                        # Tokenizing a large batch would stall queries on the event loop
+                        await self.executor.run(
+                            INGEST_LANE, lexical_index.replace, stale_vector_ids, ids, contents, metadatas
+                        )
+            
+                if metadata_ids:
+                    await self.executor.run(
+                        INGEST_LANE,
+                        collection.update,
+                        ids=metadata_ids,
+                        metadatas=metadata_updates
+                    )
+                    if lexical_index is not None:
+                        await self.executor.run(INGEST_LANE, lexical_index.update_metadata, metadata_ids, metadata_updates)
+            
+                if is_default:
+                    for doc_id, (_, metadata) in prepared.items():
+                        self.metadata_index.add(doc_id, metadata)
+            
+                if to_embed or metadata_ids:
+                    self.generation += 1
+            
+            return counts
             
         except Exception as e:
             print(f"Error adding documents: {e}")
             raise
     
-    async def search(self, query: str, limit: int = 5, threshold: float = 0.3) -> List[Dict[str, Any]]:
-        """Search for similar documents"""
+    def _ingest_lock(self, collection_name: str) -> asyncio.Lock:
+        return self._ingest_locks.setdefault(collection_name, asyncio.Lock())
+    
+    def _chunk_documents(
+        self,
+        documents: List[Tuple[str, str, Dict[str, Any]]]
+    ) -> Tuple[List[str], List[str], List[Dict[str, Any]]]:
+        """Split (doc_id, content, metadata) documents into chunk vectors"""
+        ids, contents, metadatas = [], [], []
+        for doc_id, content, metadata in documents:
+            spans = self.chunker.chunk(content)
+            for index, (start, end) in enumerate(spans):
+                # Single-chunk documents keep the document ID as their vector ID
+                ids.append(doc_id if len(spans) == 1 else f"{doc_id}#chunk-{index}")
+                contents.append(content[start:end])
+                metadatas.append({
+                    **metadata,
+                    "chunk_index": index,
+                    "chunk_count": len(spans),
+                    "chunk_start": start,
+                    "chunk_end": end
+                })
+        return ids, contents, metadatas
+    
+    @staticmethod
+    def _comparable_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Document metadata without timestamps or chunk bookkeeping, for change detection"""
+        ignored = ("created_at", "created_at_ts", "updated_at") + CHUNK_FIELDS
+        return {k: v for k, v in metadata.items() if k not in ignored}
+    
+    async def search(
+        self,
+        query: str,
+        limit: int = 5,
+        threshold: float = 0.3,
+        collapse_chunks: bool = True,
+        search_mode: str = "vector",
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for similar documents.
+        
+        filters (category / source lists, created_after / created_before) are
+        pushed into the vector store query. A blank query with filters lists
+        the newest matching documents from the metadata index, without any
+        similarity search.
+        
+        search_mode is "vector" (dense similarity), "lexical" (BM25 over content
+        and keywords) or "hybrid" (both rankings fused with reciprocal rank
+        fusion). Without a lexical index every mode falls back to vector.
+        
+        With collapse_chunks, chunk hits are grouped by parent document and only
+        the best-matching chunk of each document is returned.
+        """
         try:
-            results = self.collection.query(
-                query_texts=[query],
-                n_results=limit,
-                include=["documents", "metadatas", "distances"]
-            )
+            if not query.strip():
+                return await self._filter_search(filters, limit, collapse_chunks)
+            
+            n_results, hits, lexical_hits = self._plan_search(query, limit, threshold, collapse_chunks, search_mode, filters)
+            if hits is None:
+                vector_hits = await self._vector_search(query, n_results, threshold, filters)
+                hits = self._fuse_rankings(vector_hits, lexical_hits) if lexical_hits is not None else vector_hits
             
-            search_results = []
-            for i, (doc, metadata, distance) in enumerate(zip(
-                results["documents"][0],
-                results["metadatas"][0],
-                results["distances"][0]
-            )):
-                # Convert distance to similarity score (ChromaDB uses cosine distance)
-                # Handle cases where distance > 1 by using a different formula
-                if distance <= 1:
-                    similarity_score = 1 - distance
+            return self._finish_search(hits, limit, collapse_chunks)
+            
+        except Exception as e:
+            print(f"Error searching vector store: {e}")
+            raise
+    
+    async def search_batch(self, searches: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Run many searches together, returning each one's results in order.
+        
+        Each search is a dict of search() keyword arguments. All queries that
+        need a vector search are embedded in one encode call, and queries with
+        the same filters share one multi-query collection.query call.
+        """
+        try:
+            results: List[Optional[List[Dict[str, Any]]]] = [None] * len(searches)
+            pending: Dict[int, Tuple[int, Optional[List[Tuple[str, Dict[str, Any]]]]]] = {}
+            
+            for i, search in enumerate(searches):
+                query = search["query"]
+                limit = search.get("limit", 5)
+                collapse_chunks = search.get("collapse_chunks", True)
+                if not query.strip():
+                    results[i] = await self._filter_search(search.get("filters"), limit, collapse_chunks)
+                    continue
+                n_results, hits, lexical_hits = self._plan_search(
+                    query,
+                    limit,
+                    search.get("threshold", 0.3),
+                    collapse_chunks,
+                    search.get("search_mode", "vector"),
+                    search.get("filters")
+                )
+                if hits is None:
+                    pending[i] = (n_results, lexical_hits)
                 else:
-                    # For distances > 1, use a normalized similarity
-                    similarity_score = max(0, 1 / (1 + distance))
+                    results[i] = self._finish_search(hits, limit, collapse_chunks)
+            
+            if pending:
+                # One embedding batch for every distinct query text
+                texts = list(dict.fromkeys(searches[i]["query"] for i in pending))
+                embeddings = await self.embedding_service.encode_on(QUERY_LANE, texts)
+                embedding_of = {text: embeddings[j].tolist() for j, text in enumerate(texts)}
                 
-                if similarity_score >= threshold:
-                    search_results.append({
-                        "document": {
-                            "id": metadata.get("doc_id", f"doc_{i}"),
-                            "content": doc,
-                            "metadata": metadata,
-                            "source": metadata.get("source", "Unknown"),
-                            "created_at": metadata.get("created_at", datetime.now().isoformat())
-                        },
-                        "similarity_score": similarity_score,
-                        "source": "vector_store"
-                    })
+                # One multi-query call per distinct filter
+                groups: Dict[str, List[int]] = {}
+                for i in pending:
+                    key = json.dumps(searches[i].get("filters"), sort_keys=True, default=str)
+                    groups.setdefault(key, []).append(i)
+                
+                async def query_group(indexes: List[int]):
+                    group_results = await self.executor.run(
+                        QUERY_LANE,
+                        self.collection.query,
+                        query_embeddings=[embedding_of[searches[i]["query"]] for i in indexes],
+                        n_results=max(pending[i][0] for i in indexes),
+                        where=build_where(searches[indexes[0]].get("filters")),
+                        include=["documents", "metadatas", "distances"]
+                    )
+                    for row, i in enumerate(indexes):
+                        n_results, lexical_hits = pending[i]
+                        search = searches[i]
+                        vector_hits = self._vector_hits(group_results, row, search.get("threshold", 0.3))[:n_results]
+                        hits = self._fuse_rankings(vector_hits, lexical_hits) if lexical_hits is not None else vector_hits
+                        results[i] = self._finish_search(hits, search.get("limit", 5), search.get("collapse_chunks", True))
+                
+                await asyncio.gather(*(query_group(indexes) for indexes in groups.values()))
             
-            return search_results
+            return results
             
         except Exception as e:
-            print(f"Error searching vector store: {e}")
+            print(f"Error running batch search: {e}")
             raise
     
+    def _plan_search(
+        self,
+        query: str,
+        limit: int,
+        threshold: float,
+        collapse_chunks: bool,
+        search_mode: str,
+        filters: Optional[Dict[str, Any]]
+    ) -> Tuple[int, Optional[List[Tuple[str, Dict[str, Any]]]], Optional[List[Tuple[str, Dict[str, Any]]]]]:
+        """
+        Do the parts of a search that need no embedding. Returns (n_results,
+        hits, lexical_hits): hits is set when the search is already answered,
+        otherwise a vector search of n_results is needed, fused with
+        lexical_hits when those are set (hybrid mode).
+        """
+        n_results = limit * max(CHUNK_SEARCH_OVERFETCH, 1) if collapse_chunks else limit
+        if filters and not self.metadata_index.find(filters, limit=1):
+            # Nothing can match: skip the embedding and the vector query
+            return n_results, [], None
+        if self.lexical_index is None:
+            search_mode = "vector"
+        
+        if search_mode == "lexical":
+            return n_results, self._lexical_search(query, n_results, threshold, filters), None
+        if search_mode == "hybrid":
+            lexical_hits = self._lexical_search(query, n_results, threshold, filters)
+            if self._use_lexical_fast_path(query, lexical_hits, limit, collapse_chunks):
+                # Exact-term query fully answered by the index: skip the embedding
+                self.lexical_fast_path_searches += 1
+                return n_results, lexical_hits, None
+            return n_results, None, lexical_hits
+        return n_results, None, None
+    
+    def _finish_search(
+        self,
+        hits: List[Tuple[str, Dict[str, Any]]],
+        limit: int,
+        collapse_chunks: bool
+    ) -> List[Dict[str, Any]]:
+        search_results = [result for _, result in hits]
+        if collapse_chunks:
+            search_results = self._collapse_chunks(search_results)
+        return search_results[:limit]
+    
+    async def _vector_search(
+        self,
+        query: str,
+        n_results: int,
+        threshold: float,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        """Dense search, returning (vector_id, result) pairs in rank order"""
+        query_embedding = await self.embedding_service.encode_query(query)
+        results = await self.executor.run(
+            QUERY_LANE,
+            self.collection.query,
+            query_embeddings=[query_embedding],
+            n_results=n_results,
+            where=build_where(filters),
+            include=["documents", "metadatas", "distances"]
+        )
+        return self._vector_hits(results, 0, threshold)
+    
+    def _vector_hits(self, results: Dict[str, Any], row: int, threshold: float) -> List[Tuple[str, Dict[str, Any]]]:
+        """(vector_id, result) pairs above the threshold for one query of a collection.query result"""
+        hits = []
+        for i, (vector_id, doc, metadata, distance) in enumerate(zip(
+            results["ids"][row],
+            results["documents"][row],
+            results["metadatas"][row],
+            results["distances"][row]
+        )):
+            # Convert distance to similarity score (ChromaDB uses cosine distance)
+            # Handle cases where distance > 1 by using a different formula
+            if distance <= 1:
+                similarity_score = 1 - distance
+            else:
+                # For distances > 1, use a normalized similarity
+                similarity_score = max(0, 1 / (1 + distance))
+            
+            if similarity_score >= threshold:
+                hits.append((vector_id, self._format_hit(doc, metadata, similarity_score, i)))
+        return hits
+    
+    def _lexical_search(
+        self,
+        query: str,
+        n_results: int,
+        threshold: float,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[str, Dict[str, Any]]]:
+        """BM25 search, returning (vector_id, result) pairs in rank order"""
+        predicate = (lambda metadata: matches(filters, metadata)) if filters else None
+        return [
+            (hit["id"], self._format_hit(hit["content"], dict(hit["metadata"]), hit["score"], i))
+            for i, hit in enumerate(self.lexical_index.search(query, n_results, threshold, predicate))
+        ]
+    
+    async def _filter_search(
+        self,
+        filters: Optional[Dict[str, Any]],
+        limit: int,
+        collapse_chunks: bool
+    ) -> List[Dict[str, Any]]:
+        """Newest documents matching the filters; every result scores 1.0"""
+        doc_ids = self.metadata_index.find(filters, limit)
+        if not doc_ids:
+            return []
+        
+        results = await self.executor.run(
+            QUERY_LANE,
+            self.collection.get,
+            where={"doc_id": {"$in": doc_ids}},
+            include=["documents", "metadatas"]
+        )
+        
+        order = {doc_id: position for position, doc_id in enumerate(doc_ids)}
+        vectors = sorted(
+            zip(results["documents"], results["metadatas"]),
+            key=lambda vector: (order.get(vector[1].get("doc_id"), len(order)), vector[1].get("chunk_index", 0))
+        )
+        search_results = [self._format_hit(doc, metadata, 1.0, i) for i, (doc, metadata) in enumerate(vectors)]
+        if collapse_chunks:
+            # Each document is represented by its first chunk
+            search_results = self._collapse_chunks(search_results)
+        return search_results[:limit]
+    
+    @staticmethod
+    def _format_hit(content: str, metadata: Dict[str, Any], similarity_score: float, rank: int) -> Dict[str, Any]:
+        return {
+            "document": {
+                "id": metadata.get("doc_id", f"doc_{rank}"),
+                "content": content,
+                "metadata": metadata,
+                "source": metadata.get("source", "Unknown"),
+                "created_at": metadata.get("created_at", datetime.now().isoformat())
+            },
+            "similarity_score": similarity_score,
+            "source": "vector_store"
+        }
+    
+    @staticmethod
+    def _use_lexical_fast_path(
+        query: str,
+        lexical_hits: List[Tuple[str, Dict[str, Any]]],
+        limit: int,
+        collapse_chunks: bool
+    ) -> bool:
+        """Short exact-term queries whose lexical hits already fill the limit"""
+        if LEXICAL_FAST_PATH_MAX_TERMS <= 0 or len(set(tokenize(query))) > LEXICAL_FAST_PATH_MAX_TERMS:
+            return False
+        if collapse_chunks:
+            return len({result["document"]["id"] for _, result in lexical_hits}) >= limit
+        return len(lexical_hits) >= limit
+    
+    @staticmethod
+    def _fuse_rankings(*rankings: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Reciprocal rank fusion: each vector scores sum(1 / (k + rank)) over the
+        rankings it appears in. A vector's similarity_score is the best score any
+        ranking gave it; the order follows the fused score.
+        """
+        fused: Dict[str, float] = {}
+        results: Dict[str, Dict[str, Any]] = {}
+        for ranking in rankings:
+            for rank, (vector_id, result) in enumerate(ranking, start=1):
+                fused[vector_id] = fused.get(vector_id, 0.0) + 1 / (HYBRID_RRF_K + rank)
+                if vector_id not in results or result["similarity_score"] > results[vector_id]["similarity_score"]:
+                    results[vector_id] = result
+        ordered = sorted(fused, key=fused.get, reverse=True)
+        return [(vector_id, results[vector_id]) for vector_id in ordered]
+    
+    @staticmethod
+    def _collapse_chunks(search_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep the best-scoring chunk per parent document, preserving rank order"""
+        collapsed: Dict[str, Dict[str, Any]] = {}
+        for result in search_results:
+            doc_id = result["document"]["id"]
+            if doc_id in collapsed:
+                collapsed[doc_id]["document"]["metadata"]["matched_chunks"] += 1
+            else:
+                result["document"]["metadata"]["matched_chunks"] = 1
+                collapsed[doc_id] = result
+        return list(collapsed.values())
+    
+    async def get_document(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """
+        A whole stored document by ID, reassembled from its chunks, or None.
+        metadata is the document-level metadata (without chunk bookkeeping).
+        """
+        results = await self.executor.run(
+            QUERY_LANE,
+            self.collection.get,
+            where={"doc_id": doc_id},
+            include=["documents", "metadatas"]
+        )
+        if not results["ids"]:
+            return None
+        
+        chunks = [
+            (metadata.get("chunk_start", 0), content)
+            for content, metadata in zip(results["documents"], results["metadatas"])
+        ]
+        first = min(results["metadatas"], key=lambda metadata: metadata.get("chunk_index", 0))
+        metadata = {k: v for k, v in first.items() if k not in CHUNK_FIELDS}
+        return {
+            "id": doc_id,
+            "content": reassemble(chunks),
+            "metadata": metadata,
+            "source": metadata.get("source", "Unknown"),
+            "created_at": metadata.get("created_at", datetime.now().isoformat())
+        }
+    
     async def get_collection_status(self) -> Dict[str, Any]:
         """Get status of the collection"""
         try:
-            count = self.collection.count()
+            count = await self.executor.run(QUERY_LANE, self.collection.count)
             return {
                 "collection_name": self.collection_name,
                 "document_count": count,
-                "status": "active"
+                "status": "active",
+                "startup": self.startup_report
             }
         except Exception as e:
             return {
@@ -254,8 +811,22 @@ class VectorStoreService:
                 "error": str(e)
             }
     
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get executor and embedding metrics"""
+        return {
+            "executor": self.executor.get_metrics(),
+            "query_batching": self.embedding_service.query_batcher.get_stats(),
+            "query_embedding_cache": self.embedding_service.get_query_cache_stats(),
+            "lexical_index": {
+                **self.lexical_index.get_stats(),
+                "fast_path_searches": self.lexical_fast_path_searches
+            } if self.lexical_index is not None else None,
+            "metadata_index": self.metadata_index.get_stats()
+        }
+    
     async def close(self):
         """Close the vector store connection"""
+        self.executor.shutdown()
         if self.client:
             # ChromaDB client doesn't have an explicit close method
             pass
@@ -1,10 +1,61 @@
 import requests
-from bs4 import BeautifulSoup
 import asyncio
 import aiohttp
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Awaitable, Callable
 import json
-import re
+import time
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+from config import (
+    WEB_SEARCH_DUCKDUCKGO_URL,
+    WEB_SEARCH_GENERAL_URL,
+    WEB_SEARCH_HEALTHCARE_SOURCES,
+    WEB_SEARCH_SOURCE_TIMEOUT_SECONDS,
+    WEB_SEARCH_CONNECT_TIMEOUT_SECONDS,
+    WEB_SEARCH_TOTAL_TIMEOUT_SECONDS,
+    WEB_SEARCH_MAX_CONNECTIONS,
+    WEB_SEARCH_MAX_CONNECTIONS_PER_HOST,
+    WEB_SEARCH_BREAKER_FAILURE_THRESHOLD,
+    WEB_SEARCH_BREAKER_RESET_SECONDS,
+    HTML_PARSE_WORKERS,
+    HTML_PARSE_MAX_BYTES,
+    HTML_PARSER,
+    WEB_SEARCH_CACHE_ENABLED,
+    WEB_SEARCH_CACHE_MAX_ENTRIES,
+    WEB_SEARCH_CACHE_TTL_SECONDS,
+    WEB_SEARCH_CACHE_STALE_SECONDS,
+    WEB_SEARCH_CACHE_PATH
+)
+from app.services.cache import StaleWhileRevalidateCache
+from app.services.circuit_breaker import CircuitBreaker
+from app.services.html_extract import HtmlExtractor, extract_general_results, extract_source_results
+
+class SourceStats:
+    """Latency and error counters for one upstream source"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.total_latency_ms = 0.0
+        self.max_latency_ms = 0.0
+
+    def record(self, latency_ms: float, error: bool = False, timeout: bool = False):
+        self.calls += 1
+        self.errors += int(error)
+        self.timeouts += int(timeout)
+        self.total_latency_ms += latency_ms
+        self.max_latency_ms = max(self.max_latency_ms, latency_ms)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "average_latency_ms": self.total_latency_ms / self.calls if self.calls else 0,
+            "max_latency_ms": self.max_latency_ms
+        }
 
 class WebSearchService:
     def __init__(self):
@@ -12,10 +63,44 @@ class WebSearchService:
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        self.duckduckgo_url = WEB_SEARCH_DUCKDUCKGO_URL
+        self.general_url = WEB_SEARCH_GENERAL_URL
+        self.healthcare_sources = list(WEB_SEARCH_HEALTHCARE_SOURCES)
+        self.source_timeout = WEB_SEARCH_SOURCE_TIMEOUT_SECONDS
+        self.breakers = {
+            source: CircuitBreaker(WEB_SEARCH_BREAKER_FAILURE_THRESHOLD, WEB_SEARCH_BREAKER_RESET_SECONDS)
+            for source in self.healthcare_sources
+        }
+        self.source_stats = {source: SourceStats() for source in self.healthcare_sources}
+        self.html_extractor = HtmlExtractor(
+            workers=HTML_PARSE_WORKERS,
+            max_bytes=HTML_PARSE_MAX_BYTES,
+            parser=HTML_PARSER or None
+        )
+        self.cache = StaleWhileRevalidateCache(
+            max_entries=WEB_SEARCH_CACHE_MAX_ENTRIES,
+            fresh_seconds=WEB_SEARCH_CACHE_TTL_SECONDS,
+            stale_seconds=WEB_SEARCH_CACHE_STALE_SECONDS,
+            persist_path=WEB_SEARCH_CACHE_PATH
+        ) if WEB_SEARCH_CACHE_ENABLED else None
     
     async def initialize(self):
         """Initialize the web search service"""
-        self.session = aiohttp.ClientSession(headers=self.headers)
+        # Bounded timeouts so a hanging upstream cannot stall a request, and a
+        # per-host connection cap so one slow site cannot hog the pool
+        self.session = aiohttp.ClientSession(
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(
+                total=WEB_SEARCH_TOTAL_TIMEOUT_SECONDS,
+                connect=WEB_SEARCH_CONNECT_TIMEOUT_SECONDS
+            ),
+            connector=aiohttp.TCPConnector(
+                limit=WEB_SEARCH_MAX_CONNECTIONS,
+                limit_per_host=WEB_SEARCH_MAX_CONNECTIONS_PER_HOST
+            )
+        )
+        if self.cache:
+            self.cache.load()
     
     async def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """
@@ -24,11 +109,15 @@ class WebSearchService:
         """
         try:
             # Use DuckDuckGo instant answer API for healthcare queries
-            results = await self._search_duckduckgo(query, limit)
+            results = await self._cached("duckduckgo", query, limit, self._search_duckduckgo)
+            
+            if not results:
+                # Then the healthcare-specific sources, searched concurrently
+                results = await self._cached("healthcare", query, limit, self._search_healthcare_sources)
             
             if not results:
                 # Fallback to general web search
-                results = await self._search_general(query, limit)
+                results = await self._cached("general", query, limit, self._search_general)
             
             return results
             
@@ -36,10 +125,23 @@ class WebSearchService:
             print(f"Web search error: {e}")
             return []
     
+    async def _cached(
+        self,
+        source: str,
+        query: str,
+        limit: int,
+        search: Callable[[str, int], Awaitable[List[Dict[str, Any]]]]
+    ) -> List[Dict[str, Any]]:
+        """Serve an upstream search through the stale-while-revalidate cache"""
+        if not self.cache:
+            return await search(query, limit)
+        key = f"{source}|{limit}|{' '.join(query.lower().split())}"
+        return await self.cache.get_or_fetch(key, lambda: search(query, limit))
+    
     async def _search_duckduckgo(self, query: str, limit: int) -> List[Dict[str, Any]]:
         """Search using DuckDuckGo instant answer API"""
         try:
-            url = "https://api.duckduckgo.com/"
+            url = self.duckduckgo_url
             params = {
                 'q': query,
                 'format': 'json',
@@ -85,42 +187,12 @@ class WebSearchService:
         try:
             # Use a simple web search approach
             search_query = f"{query} healthcare medical"
-            url = f"https://www.google.com/search?q={search_query}&num={limit}"
+            params = {'q': search_query, 'num': limit}
             
-            async with self.session.get(url) as response:
+            async with self.session.get(self.general_url, params=params) as response:
                 if response.status == 200:
                     html = await response.text()
-                    soup = BeautifulSoup(html, 'html.parser')
-                    
-                    results = []
-                    
-                    # Extract search results (this is a simplified approach)
-                    search_results = soup.find_all('div', class_='g')
-                    
-                    for result in search_results[:limit]:
-                        try:
-                            title_elem = result.find('h3')
-                            link_elem = result.find('a')
-                            snippet_elem = result.find('span', class_='aCOpRe')
-                            
-                            if title_elem and link_elem:
-                                title = title_elem.get_text().strip()
-                                url = link_elem.get('href', '')
-                                snippet = snippet_elem.get_text().strip() if snippet_elem else ''
-                                
-                                # Filter for healthcare-related content
-                                if any(keyword in title.lower() or keyword in snippet.lower() 
-                                      for keyword in ['health', 'medical', 'medicine', 'healthcare', 'clinical']):
-                                    results.append({
-                                        'title': title,
-                                        'content': snippet,
-                                        'url': url,
-                                        'source': 'Web Search'
-                                    })
-                        except:
-                            continue
-                    
-                    return results
+                    return await self.html_extractor.extract(extract_general_results, html, limit)
             
             return []
             
@@ -129,47 +201,81 @@ class WebSearchService:
             return []
     
     async def _search_healthcare_sources(self, query: str, limit: int) -> List[Dict[str, Any]]:
-        """Search specific healthcare sources"""
-        healthcare_sources = [
-            "https://www.cdc.gov",
-            "https://www.nih.gov",
-            "https://www.mayoclinic.org",
-            "https://www.webmd.com",
-            "https://www.healthline.com"
-        ]
+        """Search specific healthcare sources concurrently, skipping sources whose breaker is open"""
+        # Worst case is the slowest source's timeout rather than the sum of all sources
+        source_results = await asyncio.gather(
+            *(self._search_source(source, query) for source in self.healthcare_sources)
+        )
         
         results = []
+        for source_result in source_results:
+            results.extend(source_result)
+        return results[:limit]
+    
+    async def _search_source(self, source: str, query: str) -> List[Dict[str, Any]]:
+        """
+        Search one healthcare source under its timeout, updating its breaker and
+        stats. Sources whose breaker is open are skipped. The breaker is checked
+        here rather than before the searches are scheduled, so a search
+        cancelled before it starts never holds a half-open probe.
+        """
+        breaker = self.breakers[source]
+        if not breaker.allow():
+            return []
+        stats = self.source_stats[source]
+        started_at = time.perf_counter()
+        try:
+            results = await asyncio.wait_for(self._fetch_source(source, query), self.source_timeout)
+        except asyncio.CancelledError:
+            # Cancelled by the caller (speculative search or latency budget): no
+            # verdict on the source, but a half-open probe must be given back
+            breaker.abandon()
+            raise
+        except asyncio.TimeoutError:
+            stats.record((time.perf_counter() - started_at) * 1000, error=True, timeout=True)
+            breaker.record_failure()
+            print(f"Timed out searching {source} after {self.source_timeout}s")
+            return []
+        except Exception as e:
+            stats.record((time.perf_counter() - started_at) * 1000, error=True)
+            breaker.record_failure()
+            print(f"Error searching {source}: {e}")
+            return []
         
-        for source in healthcare_sources[:2]:  # Limit to avoid rate limiting
-            try:
-                search_url = f"{source}/search?q={query}"
-                async with self.session.get(search_url) as response:
-                    if response.status == 200:
-                        html = await response.text()
-                        soup = BeautifulSoup(html, 'html.parser')
-                        
-                        # Extract relevant content (implementation depends on site structure)
-                        # This is a simplified example
-                        content_elements = soup.find_all(['p', 'div'], string=re.compile(query, re.I))
-                        
-                        for elem in content_elements[:2]:
-                            content = elem.get_text().strip()
-                            if len(content) > 50:  # Filter out very short content
-                                results.append({
-                                    'title': f"Content from {source}",
-                                    'content': content[:500],  # Limit content length
-                                    'url': source,
-                                    'source': f'Healthcare Source: {source}'
-                                })
-                                
-            except Exception as e:
-                print(f"Error searching {source}: {e}")
-                continue
+        stats.record((time.perf_counter() - started_at) * 1000)
+        breaker.record_success()
+        return results
+    
+    async def _fetch_source(self, source: str, query: str) -> List[Dict[str, Any]]:
+        search_url = f"{source}/search"
+        async with self.session.get(search_url, params={'q': query}) as response:
+            # Server errors and throttling count against the source's breaker
+            if response.status >= 500 or response.status == 429:
+                raise RuntimeError(f"HTTP {response.status}")
+            if response.status != 200:
+                return []
+            html = await response.text()
         
-        return results[:limit]
+        return await self.html_extractor.extract(extract_source_results, html, source, query)
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            "cache": self.cache.get_stats() if self.cache else None,
+            "html_extraction": self.html_extractor.get_stats(),
+            "healthcare_sources": {
+                source: {
+                    **self.source_stats[source].get_stats(),
+                    "breaker": self.breakers[source].get_stats()
+                }
+                for source in self.healthcare_sources
+            }
+        }
     
     async def close(self):
         """Close the web search service"""
+        if self.cache:
+            await self.cache.close()
         if self.session:
             await self.session.close()
+        self.html_extractor.shutdown()
 
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Measure how long HTML extraction stalls the event loop.
+
+Parses synthetic search result pages concurrently while a heartbeat task
+ticks every millisecond, and reports the worst and total heartbeat delay.
+Runs once parsing inline on the loop (the old behaviour) and once on the
+HtmlExtractor process pool.
+
+Usage: python benchmarks/html_extract_stall.py [--pages 20] [--results 400]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from app.services.html_extract import HtmlExtractor, default_parser, extract_general_results
+
+TICK_SECONDS = 0.001
+
+def build_page(results: int) -> str:
+    blocks = []
+    for i in range(results):
+        blocks.append(
+            f'<div class="g"><a href="https://example.org/{i}"><h3>Medical guideline {i}</h3></a>'
+            f'<span class="aCOpRe">Clinical healthcare summary number {i} with some filler text.</span></div>'
+        )
+    return f"<html><body>{''.join(blocks)}</body></html>"
+
+async def heartbeat(stop: asyncio.Event, delays: list):
+    expected = time.perf_counter() + TICK_SECONDS
+    while not stop.is_set():
+        await asyncio.sleep(TICK_SECONDS)
+        now = time.perf_counter()
+        delays.append(max(now - expected, 0))
+        expected = now + TICK_SECONDS
+
+async def run(label: str, extractor: HtmlExtractor, page: str, pages: int):
+    stop = asyncio.Event()
+    delays = []
+    ticker = asyncio.create_task(heartbeat(stop, delays))
+    await asyncio.sleep(0.05)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(extractor.extract(extract_general_results, page, 10) for _ in range(pages)))
+    elapsed = time.perf_counter() - started_at
+
+    stop.set()
+    await ticker
+    print(
+        f"{label:<10} wall {elapsed * 1000:8.1f} ms | "
+        f"max loop stall {max(delays) * 1000:8.1f} ms | "
+        f"total loop stall {sum(delays) * 1000:8.1f} ms"
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20, help="pages parsed concurrently")
+    parser.add_argument("--results", type=int, default=400, help="result blocks per page")
+    parser.add_argument("--workers", type=int, default=2, help="process pool size")
+    args = parser.parse_args()
+
+    page = build_page(args.results)
+    print(f"parser={default_parser()} pages={args.pages} page_size={len(page) // 1024} KiB")
+
+    inline = HtmlExtractor(workers=0, max_bytes=0)
+    await run("inline", inline, page, args.pages)
+
+    pool = HtmlExtractor(workers=args.workers, max_bytes=0)
+    # Warm the pool so process start-up is not counted
+    await asyncio.gather(*(pool.extract(extract_general_results, "<html></html>", 1) for _ in range(args.workers)))
+    await run("pool", pool, page, args.pages)
+    pool.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Drive AzureOpenAIService against a local mock OpenAI-compatible server that
+rate-limits above a fixed number of concurrent requests.
+
+Sends a burst of streaming (interactive) and non-streaming (batch) chat
+calls, once without admission control (unbounded concurrency, no retries,
+the old behaviour) and once with the adaptive LLMAdmissionController, and
+reports failures, 429s, wall time and queue wait per priority.
+
+Usage: python benchmarks/llm_admission.py [--requests 60] [--capacity 8]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from aiohttp import web
+
+MOCK_PORT = 8765
+os.environ["AZURE_OPENAI_ENDPOINT"] = f"http://127.0.0.1:{MOCK_PORT}"
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "benchmark")
+os.environ["AZURE_OPENAI_HTTP2"] = "false"
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from app.services import azure_openai_service as service_module
+from app.services.azure_openai_service import AzureOpenAIService
+from app.services.llm_admission import LLMAdmissionController
+
+class MockOpenAI:
+    """Chat completions endpoint answering 429 above `capacity` concurrent calls"""
+
+    def __init__(self, capacity: int, tokens: int, token_ms: float, retry_after_ms: int):
+        self.capacity = capacity
+        self.tokens = tokens
+        self.token_ms = token_ms
+        self.retry_after_ms = retry_after_ms
+        self.active = 0
+        self.rate_limited = 0
+
+    async def completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        if self.active >= self.capacity:
+            self.rate_limited += 1
+            return web.json_response(
+                {"error": {"code": "429", "message": "Rate limit exceeded"}},
+                status=429,
+                headers={"retry-after-ms": str(self.retry_after_ms), "retry-after": "1"}
+            )
+        self.active += 1
+        try:
+            if not body.get("stream"):
+                await asyncio.sleep(self.tokens * self.token_ms / 1000)
+                return web.json_response({
+                    "id": "mock", "object": "chat.completion", "created": 0, "model": "mock",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": "word " * self.tokens}}]
+                })
+            response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+            await response.prepare(request)
+            for _ in range(self.tokens):
+                await asyncio.sleep(self.token_ms / 1000)
+                chunk = {
+                    "id": "mock", "object": "chat.completion.chunk", "created": 0, "model": "mock",
+                    "choices": [{"index": 0, "delta": {"content": "word "}, "finish_reason": None}]
+                }
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            await response.write(b"data: [DONE]\n\n")
+            return response
+        finally:
+            self.active -= 1
+
+async def one_call(service: AzureOpenAIService, streaming: bool, results: dict):
+    prepared = service.prepare_messages("What is hypertension?", [], None, None)
+    if streaming:
+        text = "".join([chunk async for chunk in service.generate_response("", [], prepared=prepared)])
+    else:
+        text = await service.generate_non_streaming_response("", [], prepared=prepared)
+    kind = "interactive" if streaming else "batch"
+    results.setdefault(kind, []).append(prepared.get("llm_queue_ms", 0.0))
+    if text.startswith("Error generating response"):
+        results["failed"] = results.get("failed", 0) + 1
+
+async def run(label: str, service: AzureOpenAIService, mock: MockOpenAI, requests: int):
+    mock.rate_limited = 0
+    results: dict = {}
+    started_at = time.perf_counter()
+    await asyncio.gather(*(one_call(service, i % 3 != 0, results) for i in range(requests)))
+    elapsed = time.perf_counter() - started_at
+
+    def average(values):
+        return sum(values) / len(values) if values else 0
+
+    print(
+        f"{label:<10} wall {elapsed * 1000:8.1f} ms | failed {results.get('failed', 0):3d}/{requests} | "
+        f"429s {mock.rate_limited:4d} | queue ms interactive {average(results.get('interactive', [])):7.1f} "
+        f"batch {average(results.get('batch', [])):7.1f}"
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=60, help="concurrent chat calls (2/3 streaming)")
+    parser.add_argument("--capacity", type=int, default=8, help="concurrent calls the mock accepts")
+    parser.add_argument("--tokens", type=int, default=20, help="tokens per answer")
+    parser.add_argument("--token-ms", type=float, default=5, help="delay between tokens")
+    parser.add_argument("--retry-after-ms", type=int, default=200)
+    args = parser.parse_args()
+
+    mock = MockOpenAI(args.capacity, args.tokens, args.token_ms, args.retry_after_ms)
+    app = web.Application()
+    app.router.add_post("/openai/deployments/{deployment}/chat/completions", mock.completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", MOCK_PORT).start()
+
+    service = AzureOpenAIService()
+    try:
+        # Old behaviour: every call goes straight to the endpoint, no retries
+        endpoint = service.pool.endpoints[0]
+        endpoint.admission = LLMAdmissionController(max_concurrency=100000)
+        max_retries = service_module.LLM_MAX_RETRIES
+        service_module.LLM_MAX_RETRIES = 0
+        await run("unbounded", service, mock, args.requests)
+
+        service_module.LLM_MAX_RETRIES = max_retries
+        endpoint.admission = LLMAdmissionController()
+        await run("admission", service, mock, args.requests)
+        print(f"final concurrency limit {endpoint.admission.limit} (capacity {args.capacity})")
+    finally:
+        await service.close()
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Measure how long a streamed chat answer takes to send and how many frames it uses.
+
+Feeds a simulated LLM token stream through the old per-token framing
+(json.dumps plus a 10 ms sleep per token) and through the coalescing
+framing used by generate_chat_stream, and reports total stream duration,
+content frames and bytes per response.
+
+Usage: python benchmarks/sse_stream.py [--tokens 400] [--token-interval-ms 2]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from app.services.sse import coalesce, event_frame, orjson
+
+async def token_stream(tokens: int, interval_ms: float):
+    for i in range(tokens):
+        if interval_ms > 0:
+            await asyncio.sleep(interval_ms / 1000)
+        yield f" token{i % 10}"
+
+async def per_token(tokens: int, interval_ms: float):
+    async for chunk in token_stream(tokens, interval_ms):
+        yield f"data: {json.dumps({'type': 'content', 'data': chunk})}\n\n"
+        await asyncio.sleep(0.01)
+
+async def coalesced(tokens: int, interval_ms: float, max_chars: int, max_delay_ms: float):
+    async for text in coalesce(token_stream(tokens, interval_ms), max_chars, max_delay_ms):
+        yield event_frame("content", text)
+
+async def run(label: str, frames):
+    started_at = time.perf_counter()
+    count = 0
+    size = 0
+    async for frame in frames:
+        count += 1
+        size += len(frame)
+    elapsed = time.perf_counter() - started_at
+    print(f"{label:<10} duration {elapsed * 1000:8.1f} ms | frames {count:5d} | bytes {size:7d}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=400, help="tokens per simulated answer")
+    parser.add_argument("--token-interval-ms", type=float, default=2, help="delay between LLM tokens")
+    parser.add_argument("--flush-chars", type=int, default=64)
+    parser.add_argument("--flush-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    print(f"encoder={'orjson' if orjson is not None else 'json'} tokens={args.tokens} interval={args.token_interval_ms} ms")
+    await run("per-token", per_token(args.tokens, args.token_interval_ms))
+    await run("coalesced", coalesced(args.tokens, args.token_interval_ms, args.flush_chars, args.flush_ms))
+
+if __name__ == "__main__":
+    asyncio.run(main())
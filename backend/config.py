@@ -3,6 +3,7 @@ Configuration file for the backend application.
 Set these environment variables in your .env file or system environment.
 """
 
+import json
 import os
 from dotenv import load_dotenv
 
@@ -15,8 +16,227 @@ AZURE_OPENAI_API_VERSION = os.getenv("AZURE_OPENAI_API_VERSION", "2024-04-01-pre
 AZURE_OPENAI_MODEL_NAME = os.getenv("AZURE_OPENAI_MODEL_NAME", "gpt-4o-mini")
 AZURE_OPENAI_DEPLOYMENT = os.getenv("AZURE_OPENAI_DEPLOYMENT", "gpt-4o-mini")
 
-# Validate required environment variables
-required_vars = [
+# Azure OpenAI Endpoint Pool
+# Optional JSON list of endpoints to spread chat traffic over, e.g.
+# [{"name": "eastus", "endpoint": "https://...", "api_key": "...", "deployment": "gpt-4o-mini", "weight": 2}]
+# Missing fields fall back to the settings above (plus LLM_MAX_CONCURRENCY and
+# LLM_TOKENS_PER_MINUTE per endpoint); when unset, the single endpoint is used
+AZURE_OPENAI_ENDPOINTS = json.loads(os.getenv("AZURE_OPENAI_ENDPOINTS") or "[]")
+# Smoothing for each endpoint's time-to-first-token average used for routing
+AZURE_OPENAI_TTFT_EWMA_ALPHA = float(os.getenv("AZURE_OPENAI_TTFT_EWMA_ALPHA", "0.3"))
+# Endpoints failing this many calls in a row are avoided until the reset period passes
+AZURE_OPENAI_BREAKER_FAILURE_THRESHOLD = int(os.getenv("AZURE_OPENAI_BREAKER_FAILURE_THRESHOLD", "3"))
+AZURE_OPENAI_BREAKER_RESET_SECONDS = float(os.getenv("AZURE_OPENAI_BREAKER_RESET_SECONDS", "30"))
+
+# Azure OpenAI HTTP connection pool (one client is shared by all requests)
+AZURE_OPENAI_MAX_CONNECTIONS = int(os.getenv("AZURE_OPENAI_MAX_CONNECTIONS", "100"))
+AZURE_OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("AZURE_OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20"))
+AZURE_OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("AZURE_OPENAI_KEEPALIVE_EXPIRY", "60"))
+AZURE_OPENAI_CONNECT_TIMEOUT = float(os.getenv("AZURE_OPENAI_CONNECT_TIMEOUT", "5"))
+AZURE_OPENAI_READ_TIMEOUT = float(os.getenv("AZURE_OPENAI_READ_TIMEOUT", "60"))
+# HTTP/2 requires the h2 package (httpx[http2]); falls back to HTTP/1.1 without it
+AZURE_OPENAI_HTTP2 = os.getenv("AZURE_OPENAI_HTTP2", "true").lower() == "true"
+
+# LLM Admission Control Configuration
+# Shared limits on Azure OpenAI calls. Streaming chat is admitted ahead of
+# /api/chat; concurrency halves on a 429 and grows back after successes
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+# Prompt plus max completion tokens admitted per minute (0 disables the budget)
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "200"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "30"))
+# Retries of rate-limited or failed calls, re-queued behind the Retry-After pause
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_DEFAULT_RETRY_AFTER_SECONDS = float(os.getenv("LLM_DEFAULT_RETRY_AFTER_SECONDS", "1"))
+
+# Chat Image Preprocessing Configuration
+# Images are downscaled to fit IMAGE_MAX_DIMENSION pixels and recompressed
+# before being sent to the model (requires Pillow; sent unchanged without it)
+IMAGE_PREPROCESS_ENABLED = os.getenv("IMAGE_PREPROCESS_ENABLED", "true").lower() == "true"
+IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1024"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+# Processed images are cached by content hash
+IMAGE_CACHE_MAX_ENTRIES = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "256"))
+IMAGE_CACHE_TTL_SECONDS = float(os.getenv("IMAGE_CACHE_TTL_SECONDS", "3600"))
+IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Prompt Assembly Configuration
+# Token budget for the whole chat prompt (system text, context, history, query)
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "6000"))
+# Share of the budget chat history may use; older messages are summarized
+PROMPT_HISTORY_TOKEN_BUDGET = int(os.getenv("PROMPT_HISTORY_TOKEN_BUDGET", "1500"))
+PROMPT_HISTORY_SUMMARY_TOKENS = int(os.getenv("PROMPT_HISTORY_SUMMARY_TOKENS", "200"))
+# Longer context documents are truncated to this many tokens
+PROMPT_DOCUMENT_MAX_TOKENS = int(os.getenv("PROMPT_DOCUMENT_MAX_TOKENS", "800"))
+# Estimated prompt cost of one attached image
+PROMPT_IMAGE_TOKENS = int(os.getenv("PROMPT_IMAGE_TOKENS", "765"))
+
+# Embedding Configuration
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# Concurrent queries arriving within this window are encoded together
+EMBEDDING_MICROBATCH_WINDOW_MS = float(os.getenv("EMBEDDING_MICROBATCH_WINDOW_MS", "5"))
+EMBEDDING_MICROBATCH_MAX_SIZE = int(os.getenv("EMBEDDING_MICROBATCH_MAX_SIZE", "32"))
+# Recent query embeddings kept, so a chat turn's retrieval and answer cache encode once (0 disables)
+EMBEDDING_QUERY_CACHE_SIZE = int(os.getenv("EMBEDDING_QUERY_CACHE_SIZE", "256"))
+
+# Document Chunking Configuration
+# Long documents are split into overlapping sentence-aligned windows at ingest
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "200"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "40"))
+# Extra candidates fetched per result when collapsing chunks back to documents
+CHUNK_SEARCH_OVERFETCH = int(os.getenv("CHUNK_SEARCH_OVERFETCH", "3"))
+
+# Batch Search Configuration
+# Maximum number of searches accepted by one /api/search/batch request
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "256"))
+
+# Lexical (BM25) Search Configuration
+# In-memory inverted index over content and keywords, used by the "lexical"
+# and "hybrid" search modes
+LEXICAL_INDEX_ENABLED = os.getenv("LEXICAL_INDEX_ENABLED", "true").lower() == "true"
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Search mode used when a request does not specify one: vector, hybrid or lexical
+SEARCH_DEFAULT_MODE = os.getenv("SEARCH_DEFAULT_MODE", "vector")
+# Reciprocal rank fusion constant for hybrid search
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+# Hybrid queries of at most this many terms that the lexical index alone can
+# answer in full skip the embedding call (0 disables the fast path)
+LEXICAL_FAST_PATH_MAX_TERMS = int(os.getenv("LEXICAL_FAST_PATH_MAX_TERMS", "2"))
+
+# Reranking Configuration
+# Optional cross-encoder stage: over-fetch RERANK_CANDIDATES results, re-score
+# them and keep the requested number. Skipped when scoring exceeds the budget
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL_NAME = os.getenv("RERANK_MODEL_NAME", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "32"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "300"))
+# Drop reranked results scoring below this (model-specific scale; empty keeps all)
+RERANK_MIN_SCORE = float(os.getenv("RERANK_MIN_SCORE")) if os.getenv("RERANK_MIN_SCORE") else None
+
+# Chat Retrieval Configuration
+# Context documents retrieved for each chat request and their minimum similarity
+CHAT_CONTEXT_LIMIT = int(os.getenv("CHAT_CONTEXT_LIMIT", "5"))
+CHAT_CONTEXT_THRESHOLD = float(os.getenv("CHAT_CONTEXT_THRESHOLD", "0.3"))
+
+# Chat Streaming Configuration
+# Streamed tokens are merged into one SSE frame until it holds this many
+# characters or its first token is this many milliseconds old (0 disables)
+CHAT_STREAM_FLUSH_CHARS = int(os.getenv("CHAT_STREAM_FLUSH_CHARS", "64"))
+CHAT_STREAM_FLUSH_MS = float(os.getenv("CHAT_STREAM_FLUSH_MS", "20"))
+# Send context document references (IDs, titles, scores) instead of full content
+CHAT_COMPACT_CONTEXT = os.getenv("CHAT_COMPACT_CONTEXT", "false").lower() == "true"
+
+# Chat Session Configuration
+# Conversations a client opts into (session_id "new") are kept server-side so
+# it sends only the new message.
+# Idle sessions expire after CHAT_SESSION_TTL_SECONDS; beyond
+# CHAT_SESSION_MAX_SESSIONS the least recently used are evicted from memory
+# (to CHAT_SESSION_DB_PATH when set, dropped otherwise)
+CHAT_SESSIONS_ENABLED = os.getenv("CHAT_SESSIONS_ENABLED", "true").lower() == "true"
+CHAT_SESSION_MAX_SESSIONS = int(os.getenv("CHAT_SESSION_MAX_SESSIONS", "1000"))
+CHAT_SESSION_TTL_SECONDS = float(os.getenv("CHAT_SESSION_TTL_SECONDS", "86400"))
+CHAT_SESSION_DB_PATH = os.getenv("CHAT_SESSION_DB_PATH", "")
+# Messages kept verbatim per session; older ones are folded into a rolling summary
+CHAT_SESSION_MAX_MESSAGES = int(os.getenv("CHAT_SESSION_MAX_MESSAGES", "20"))
+CHAT_SESSION_SUMMARY_TOKENS = int(os.getenv("CHAT_SESSION_SUMMARY_TOKENS", "300"))
+
+# Search Result Cache Configuration
+# Shared LRU + TTL cache of RAG search responses, cleared whenever documents change
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1000"))
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+SEARCH_CACHE_MAX_BYTES = int(os.getenv("SEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Request Coalescing Configuration
+# Identical concurrent searches share one execution, and identical concurrent
+# chat streams without history or images share one LLM token stream
+SEARCH_SINGLE_FLIGHT_ENABLED = os.getenv("SEARCH_SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+CHAT_STREAM_FANOUT_ENABLED = os.getenv("CHAT_STREAM_FANOUT_ENABLED", "true").lower() == "true"
+
+# RAG Retrieval Configuration
+# Start the web fallback alongside the vector search instead of after it
+RAG_SPECULATIVE_WEB_FALLBACK = os.getenv("RAG_SPECULATIVE_WEB_FALLBACK", "true").lower() == "true"
+# Total retrieval budget per request; results found so far are returned
+# (marked partial) once it is spent. 0 disables the budget.
+RAG_LATENCY_BUDGET_MS = float(os.getenv("RAG_LATENCY_BUDGET_MS", "3000"))
+
+# Web Search Configuration
+# Upstream URLs are configurable so a local stub server can stand in for them
+WEB_SEARCH_DUCKDUCKGO_URL = os.getenv("WEB_SEARCH_DUCKDUCKGO_URL", "https://api.duckduckgo.com/")
+WEB_SEARCH_GENERAL_URL = os.getenv("WEB_SEARCH_GENERAL_URL", "https://www.google.com/search")
+# Healthcare sites searched concurrently during the web fallback (comma-separated)
+WEB_SEARCH_HEALTHCARE_SOURCES = [
+    source.strip() for source in os.getenv(
+        "WEB_SEARCH_HEALTHCARE_SOURCES",
+        "https://www.cdc.gov,https://www.nih.gov,https://www.mayoclinic.org,https://www.webmd.com,https://www.healthline.com"
+    ).split(",") if source.strip()
+]
+# Per-source timeout for the healthcare fan-out, and session-wide HTTP timeouts
+WEB_SEARCH_SOURCE_TIMEOUT_SECONDS = float(os.getenv("WEB_SEARCH_SOURCE_TIMEOUT_SECONDS", "3"))
+WEB_SEARCH_CONNECT_TIMEOUT_SECONDS = float(os.getenv("WEB_SEARCH_CONNECT_TIMEOUT_SECONDS", "3"))
+WEB_SEARCH_TOTAL_TIMEOUT_SECONDS = float(os.getenv("WEB_SEARCH_TOTAL_TIMEOUT_SECONDS", "10"))
+WEB_SEARCH_MAX_CONNECTIONS = int(os.getenv("WEB_SEARCH_MAX_CONNECTIONS", "50"))
+WEB_SEARCH_MAX_CONNECTIONS_PER_HOST = int(os.getenv("WEB_SEARCH_MAX_CONNECTIONS_PER_HOST", "4"))
+# A source is skipped after this many consecutive failures, then probed again
+# once the reset period has passed
+WEB_SEARCH_BREAKER_FAILURE_THRESHOLD = int(os.getenv("WEB_SEARCH_BREAKER_FAILURE_THRESHOLD", "3"))
+WEB_SEARCH_BREAKER_RESET_SECONDS = float(os.getenv("WEB_SEARCH_BREAKER_RESET_SECONDS", "60"))
+# Result pages are parsed in a process pool (0 parses inline) and capped
+# at this many bytes. HTML_PARSER defaults to lxml when installed, else html.parser
+HTML_PARSE_WORKERS = int(os.getenv("HTML_PARSE_WORKERS", "2"))
+HTML_PARSE_MAX_BYTES = int(os.getenv("HTML_PARSE_MAX_BYTES", str(512 * 1024)))
+HTML_PARSER = os.getenv("HTML_PARSER", "")
+# Web results cache with stale-while-revalidate: fresh entries are served
+# directly, stale ones are served while a background refresh runs
+WEB_SEARCH_CACHE_ENABLED = os.getenv("WEB_SEARCH_CACHE_ENABLED", "true").lower() == "true"
+WEB_SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("WEB_SEARCH_CACHE_MAX_ENTRIES", "2000"))
+WEB_SEARCH_CACHE_TTL_SECONDS = float(os.getenv("WEB_SEARCH_CACHE_TTL_SECONDS", "3600"))
+WEB_SEARCH_CACHE_STALE_SECONDS = float(os.getenv("WEB_SEARCH_CACHE_STALE_SECONDS", "86400"))
+# Optional JSON file to keep the cache across restarts (disabled when empty)
+WEB_SEARCH_CACHE_PATH = os.getenv("WEB_SEARCH_CACHE_PATH", "")
+
+# Semantic Answer Cache Configuration
+# Reuses a chat answer for a near-identical question with the same context
+# documents instead of calling the LLM. Off unless enabled here or per request.
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_SIMILARITY_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_SIMILARITY_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+
+# Bulk Ingest Configuration
+# NDJSON bulk ingests are embedded and written in batches of this size
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "256"))
+INGEST_STREAM_MAX_LINE_BYTES = int(os.getenv("INGEST_STREAM_MAX_LINE_BYTES", str(8 * 1024 * 1024)))
+# Background ingest jobs are tracked (and their documents spooled) in SQLite
+INGEST_JOB_DB_PATH = os.getenv(
+    "INGEST_JOB_DB_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ingest_jobs.sqlite3")
+)
+INGEST_JOB_WORKERS = int(os.getenv("INGEST_JOB_WORKERS", "2"))
+
+# Blocking work executor (Chroma and embedding calls run off the event loop)
+# Separate lanes keep bulk ingestion from starving interactive searches
+EXECUTOR_QUERY_WORKERS = int(os.getenv("EXECUTOR_QUERY_WORKERS", "4"))
+EXECUTOR_INGEST_WORKERS = int(os.getenv("EXECUTOR_INGEST_WORKERS", "2"))
+# Maximum queued + running tasks per lane before callers wait for admission
+EXECUTOR_QUERY_MAX_PENDING = int(os.getenv("EXECUTOR_QUERY_MAX_PENDING", "256"))
+EXECUTOR_INGEST_MAX_PENDING = int(os.getenv("EXECUTOR_INGEST_MAX_PENDING", "16"))
+
+# Vector Store Configuration
+# When persistent, the Chroma store survives restarts and the seed corpus is
+# only re-embedded when data/healthcare_documents.json changes
+CHROMA_PERSISTENT = os.getenv("CHROMA_PERSISTENT", "true").lower() == "true"
+CHROMA_PERSIST_DIRECTORY = os.getenv(
+    "CHROMA_PERSIST_DIRECTORY",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "chroma_db")
+)
+
+# Validate required environment variables (an endpoint pool supplies its own)
+required_vars = [] if AZURE_OPENAI_ENDPOINTS else [
     "AZURE_OPENAI_API_KEY",
     "AZURE_OPENAI_ENDPOINT"
 ]
@@ -33,4 +253,146 @@ AZURE_OPENAI_ENDPOINT=https://your-resource.cognitiveservices.azure.com/
 AZURE_OPENAI_API_VERSION=2024-04-01-preview
 AZURE_OPENAI_MODEL_NAME=gpt-4o-mini
 AZURE_OPENAI_DEPLOYMENT=gpt-4o-mini
+
+# Azure OpenAI Endpoint Pool (optional)
+AZURE_OPENAI_ENDPOINTS=
+AZURE_OPENAI_TTFT_EWMA_ALPHA=0.3
+AZURE_OPENAI_BREAKER_FAILURE_THRESHOLD=3
+AZURE_OPENAI_BREAKER_RESET_SECONDS=30
+
+# Azure OpenAI Connection Pool (optional)
+AZURE_OPENAI_MAX_CONNECTIONS=100
+AZURE_OPENAI_MAX_KEEPALIVE_CONNECTIONS=20
+AZURE_OPENAI_KEEPALIVE_EXPIRY=60
+AZURE_OPENAI_CONNECT_TIMEOUT=5
+AZURE_OPENAI_READ_TIMEOUT=60
+AZURE_OPENAI_HTTP2=true
+
+# LLM Admission Control (optional)
+LLM_MAX_CONCURRENCY=16
+LLM_MIN_CONCURRENCY=1
+LLM_TOKENS_PER_MINUTE=0
+LLM_MAX_QUEUE=200
+LLM_QUEUE_TIMEOUT_SECONDS=30
+LLM_MAX_RETRIES=2
+LLM_DEFAULT_RETRY_AFTER_SECONDS=1
+
+# Chat Image Preprocessing (optional)
+IMAGE_PREPROCESS_ENABLED=true
+IMAGE_MAX_DIMENSION=1024
+IMAGE_JPEG_QUALITY=85
+IMAGE_CACHE_MAX_ENTRIES=256
+IMAGE_CACHE_TTL_SECONDS=3600
+IMAGE_CACHE_MAX_BYTES=67108864
+
+# Prompt Assembly (optional)
+PROMPT_TOKEN_BUDGET=6000
+PROMPT_HISTORY_TOKEN_BUDGET=1500
+PROMPT_HISTORY_SUMMARY_TOKENS=200
+PROMPT_DOCUMENT_MAX_TOKENS=800
+PROMPT_IMAGE_TOKENS=765
+
+# Embedding Configuration (optional)
+EMBEDDING_MODEL_NAME=all-MiniLM-L6-v2
+EMBEDDING_BATCH_SIZE=64
+EMBEDDING_MICROBATCH_WINDOW_MS=5
+EMBEDDING_MICROBATCH_MAX_SIZE=32
+EMBEDDING_QUERY_CACHE_SIZE=256
+
+# Document Chunking (optional)
+CHUNK_MAX_TOKENS=200
+CHUNK_OVERLAP_TOKENS=40
+CHUNK_SEARCH_OVERFETCH=3
+
+# Batch Search (optional)
+SEARCH_BATCH_MAX_QUERIES=256
+
+# Lexical / Hybrid Search (optional)
+LEXICAL_INDEX_ENABLED=true
+BM25_K1=1.2
+BM25_B=0.75
+SEARCH_DEFAULT_MODE=vector
+HYBRID_RRF_K=60
+LEXICAL_FAST_PATH_MAX_TERMS=2
+
+# Reranking (optional)
+RERANK_ENABLED=false
+RERANK_MODEL_NAME=cross-encoder/ms-marco-MiniLM-L-6-v2
+RERANK_CANDIDATES=20
+RERANK_BATCH_SIZE=32
+RERANK_BUDGET_MS=300
+RERANK_MIN_SCORE=
+
+# Chat Retrieval (optional)
+CHAT_CONTEXT_LIMIT=5
+CHAT_CONTEXT_THRESHOLD=0.3
+
+# Chat Streaming (optional)
+CHAT_STREAM_FLUSH_CHARS=64
+CHAT_STREAM_FLUSH_MS=20
+CHAT_COMPACT_CONTEXT=false
+
+# Chat Sessions (optional)
+CHAT_SESSIONS_ENABLED=true
+CHAT_SESSION_MAX_SESSIONS=1000
+CHAT_SESSION_TTL_SECONDS=86400
+CHAT_SESSION_DB_PATH=./data/chat_sessions.sqlite3
+CHAT_SESSION_MAX_MESSAGES=20
+CHAT_SESSION_SUMMARY_TOKENS=300
+
+# Search Result Cache (optional)
+SEARCH_CACHE_ENABLED=true
+SEARCH_CACHE_MAX_ENTRIES=1000
+SEARCH_CACHE_TTL_SECONDS=300
+SEARCH_CACHE_MAX_BYTES=67108864
+
+# Request Coalescing (optional)
+SEARCH_SINGLE_FLIGHT_ENABLED=true
+CHAT_STREAM_FANOUT_ENABLED=true
+
+# RAG Retrieval (optional)
+RAG_SPECULATIVE_WEB_FALLBACK=true
+RAG_LATENCY_BUDGET_MS=3000
+
+# Web Search (optional)
+WEB_SEARCH_DUCKDUCKGO_URL=https://api.duckduckgo.com/
+WEB_SEARCH_GENERAL_URL=https://www.google.com/search
+WEB_SEARCH_HEALTHCARE_SOURCES=https://www.cdc.gov,https://www.nih.gov,https://www.mayoclinic.org,https://www.webmd.com,https://www.healthline.com
+WEB_SEARCH_SOURCE_TIMEOUT_SECONDS=3
+WEB_SEARCH_CONNECT_TIMEOUT_SECONDS=3
+WEB_SEARCH_TOTAL_TIMEOUT_SECONDS=10
+WEB_SEARCH_MAX_CONNECTIONS=50
+WEB_SEARCH_MAX_CONNECTIONS_PER_HOST=4
+WEB_SEARCH_BREAKER_FAILURE_THRESHOLD=3
+WEB_SEARCH_BREAKER_RESET_SECONDS=60
+HTML_PARSE_WORKERS=2
+HTML_PARSE_MAX_BYTES=524288
+HTML_PARSER=
+WEB_SEARCH_CACHE_ENABLED=true
+WEB_SEARCH_CACHE_MAX_ENTRIES=2000
+WEB_SEARCH_CACHE_TTL_SECONDS=3600
+WEB_SEARCH_CACHE_STALE_SECONDS=86400
+WEB_SEARCH_CACHE_PATH=./data/web_search_cache.json
+
+# Semantic Answer Cache (optional)
+SEMANTIC_CACHE_ENABLED=false
+SEMANTIC_CACHE_SIMILARITY_THRESHOLD=0.92
+SEMANTIC_CACHE_MAX_ENTRIES=2000
+SEMANTIC_CACHE_TTL_SECONDS=3600
+
+# Bulk Ingest (optional)
+INGEST_BATCH_SIZE=256
+INGEST_STREAM_MAX_LINE_BYTES=8388608
+INGEST_JOB_DB_PATH=./data/ingest_jobs.sqlite3
+INGEST_JOB_WORKERS=2
+
+# Blocking Work Executor (optional)
+EXECUTOR_QUERY_WORKERS=4
+EXECUTOR_INGEST_WORKERS=2
+EXECUTOR_QUERY_MAX_PENDING=256
+EXECUTOR_INGEST_MAX_PENDING=16
+
+# Vector Store (optional)
+CHROMA_PERSISTENT=true
+CHROMA_PERSIST_DIRECTORY=./data/chroma_db
 """
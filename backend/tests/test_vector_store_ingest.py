@@ -0,0 +1,86 @@
+"""
+Ingesting into the default collection keeps the in-memory indexes in step,
+whether the collection is named explicitly (as IngestRequest does by default)
+or left out, and overlapping ingests of one document store a single version.
+
+Run from backend/: python -m pytest -q tests
+"""
+
+import asyncio
+import hashlib
+import os
+import sys
+import numpy as np
+
+os.environ.setdefault("AZURE_OPENAI_API_KEY", "test")
+os.environ.setdefault("AZURE_OPENAI_ENDPOINT", "https://test.openai.azure.com")
+os.environ["CHROMA_PERSISTENT"] = "false"
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from app.models.schemas import IngestRequest
+from app.services.executor import INGEST_LANE
+from app.services.vector_store import VectorStoreService
+
+class HashingModel:
+    """Stands in for the sentence transformer: a hashed bag of words"""
+
+    dimensions = 64
+
+    def encode(self, texts, **kwargs):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, int(hashlib.md5(word.encode("utf-8")).hexdigest(), 16) % self.dimensions] += 1
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+XENO_DOCUMENT = {
+    "content": "Zorblax syndrome is a fictional xenological condition used for testing.",
+    "metadata": {"title": "Zorblax Syndrome", "category": "Xenology"}
+}
+
+async def ingest_and_search(collection_name):
+    service = VectorStoreService()
+    service.embedding_service.model = HashingModel()
+    await service.initialize()
+    try:
+        await service.add_documents([XENO_DOCUMENT], collection_name=collection_name)
+        lexical = await service.search("zorblax", limit=3, threshold=0.0, search_mode="lexical")
+        filtered = await service.search("", limit=3, threshold=0.0, filters={"category": ["Xenology"]})
+        return lexical, filtered
+    finally:
+        await service.close()
+
+def assert_indexed(lexical, filtered):
+    assert [hit["document"]["metadata"]["title"] for hit in lexical][:1] == ["Zorblax Syndrome"]
+    assert [hit["document"]["metadata"]["title"] for hit in filtered] == ["Zorblax Syndrome"]
+
+def test_ingest_with_schema_default_collection_updates_indexes():
+    collection_name = IngestRequest(documents=[]).collection_name
+    assert collection_name == "healthcare_docs"
+    assert_indexed(*asyncio.run(ingest_and_search(collection_name)))
+
+def test_ingest_without_collection_name_updates_indexes():
+    assert_indexed(*asyncio.run(ingest_and_search(None)))
+
+async def ingest_concurrently(versions):
+    service = VectorStoreService()
+    service.embedding_service.model = HashingModel()
+    await service.initialize()
+    try:
+        await asyncio.gather(*(
+            service.add_documents([{"id": "doc_race", "content": content}]) for content in versions
+        ))
+        stored = await service.executor.run(
+            INGEST_LANE, service.collection.get, where={"doc_id": "doc_race"}, include=["metadatas"]
+        )
+        return stored["metadatas"]
+    finally:
+        await service.close()
+
+def test_concurrent_ingests_of_one_document_leave_one_version():
+    # One single-chunk version and one multi-chunk version, whose vector IDs differ
+    short_version = "A short retried document."
+    long_version = " ".join(f"Sentence {i} of a long retried document." for i in range(150))
+    stored = asyncio.run(ingest_concurrently([short_version, long_version]))
+    assert len({metadata["content_hash"] for metadata in stored}) == 1
+    assert len(stored) == stored[0]["chunk_count"]
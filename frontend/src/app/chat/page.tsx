@@ -17,6 +17,7 @@ export default function ChatPage() {
   const messagesEndRef = useRef<HTMLDivElement>(null)
   const fileInputRef = useRef<HTMLInputElement>(null)
   const currentResponseRef = useRef('')
+  const sessionIdRef = useRef<string | null>(null) // Server-side conversation, set by the first reply
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' })
@@ -75,7 +76,15 @@ export default function ChatPage() {
         },
         body: JSON.stringify({
           query: input,
-          chat_history: messages.slice(-10), // Send last 10 messages for context
+          // The server keeps the conversation once it has started a session;
+          // until then ask for one, sending the last 10 messages (text only)
+          // for servers with sessions disabled
+          ...(sessionIdRef.current
+            ? { session_id: sessionIdRef.current }
+            : {
+                session_id: 'new',
+                chat_history: messages.slice(-10).map(({ role, content, timestamp }) => ({ role, content, timestamp }))
+              }),
           use_web_fallback: true,
           stream: true,
           images: uploadedImages.length > 0 ? uploadedImages : undefined
@@ -112,6 +121,9 @@ export default function ChatPage() {
               switch (event.type) {
                 case 'metadata':
                   setContextInfo(event.data)
+                  if (event.data?.session_id) {
+                    sessionIdRef.current = event.data.session_id
+                  }
                   break
                 case 'start':
                   // Start of response
@@ -55,6 +55,7 @@ export interface ChatRequest {
   use_web_fallback?: boolean
   stream?: boolean
   images?: string[] // Base64 encoded images
+  session_id?: string // Server-side conversation to continue instead of chat_history, or 'new' to start one
 }
 
 export interface ChatResponse {
@@ -64,6 +65,7 @@ export interface ChatResponse {
   used_web_fallback: boolean
   images: string[]
   total_context_found: number
+  session_id?: string
   timestamp: string
 }
 